@@ -1,7 +1,6 @@
 "use server"
 
-import { exec } from "child_process"
-import { promisify } from "util"
+import { spawn } from "child_process"
 import fs from "fs/promises"
 import path from "path"
 import { randomUUID } from "crypto"
@@ -9,28 +8,33 @@ import { redirect } from "next/navigation"
 
 import { getAccounts, getWorkspaces, getPosts, uploadMedia, schedulePost, PublerCredentials } from "@/lib/publer"
 
-const execAsync = promisify(exec)
-const DB_PATH = path.join(process.cwd(), "data", "jobs.json")
+// One file per job; the monolithic jobs.json is only read as a legacy fallback
+const JOBS_DIR = path.join(process.cwd(), "data", "jobs")
+// Listing cache maintained by scripts/job_store.py (JobStore.load_index); only read here
+const JOB_INDEX_PATH = path.join(JOBS_DIR, "index.json")
+const LEGACY_DB_PATH = path.join(process.cwd(), "data", "jobs.json")
 const PRESET_PATH = path.join(process.cwd(), "data", "presets.json")
 const PERSISTED_LOGO_PATH = path.join(process.cwd(), "public", "persistent", "logo.png")
 
-// Track active child processes by jobId
+// Track active child processes by jobId (only used when the worker daemon isn't running)
 const activeJobs = new Map<string, any>()
 
+// File queue read by scripts/worker_daemon.py
+const QUEUE_DIR = path.join(process.cwd(), "data", "queue")
+const WORKER_STATE_PATH = path.join(QUEUE_DIR, "state.json")
+// Queue priorities: lower runs first
+const PRIORITY_CORRECTION = 0
+const PRIORITY_BATCH = 10
+// How long to wait for a running job to be stopped (the daemon's SIGTERM grace is 5s)
+const STOP_TIMEOUT_MS = 10000
+
 // Ensure data directory exists
 async function ensureDb() {
     // DB Directory
-    const dir = path.dirname(DB_PATH)
-    try {
-        await fs.access(dir)
-    } catch {
-        await fs.mkdir(dir, { recursive: true })
-    }
-
     try {
-        await fs.access(DB_PATH)
+        await fs.access(JOBS_DIR)
     } catch {
-        await fs.writeFile(DB_PATH, "{}", "utf-8")
+        await fs.mkdir(JOBS_DIR, { recursive: true })
     }
 
     // Public Downloads Directory
@@ -48,6 +52,212 @@ async function atomicWriteJson(filePath: string, data: any) {
     await fs.rename(tempPath, filePath)
 }
 
+// Daemon state if its heartbeat is recent, else null
+async function readWorkerState(): Promise<any | null> {
+    try {
+        const state = JSON.parse(await fs.readFile(WORKER_STATE_PATH, "utf-8"))
+        return Date.now() / 1000 - state.heartbeat < 5 ? state : null
+    } catch {
+        return null
+    }
+}
+
+async function workerHasJob(jobId: string) {
+    const state = await readWorkerState()
+    if (!state) return false
+    return [...state.running, ...state.pending].some((entry: any) => entry.jobId === jobId)
+}
+
+// Hands the job to the worker daemon when it's up; otherwise runs process_batch.py directly
+// in its own process group, so cancel can stop its ffmpeg children too
+async function submitProcessing(jobId: string, priority: number) {
+    jobPath(jobId) // validates the id before it becomes a file name
+    if (await readWorkerState()) {
+        await fs.mkdir(path.join(QUEUE_DIR, "pending"), { recursive: true })
+        await atomicWriteJson(path.join(QUEUE_DIR, "pending", `${jobId}.json`), {
+            jobId,
+            priority,
+            submittedAt: new Date().toISOString()
+        })
+        console.log(`[Job ${jobId}] Queued for worker (priority ${priority})`)
+        return
+    }
+
+    const scriptPath = path.join(process.cwd(), "scripts", "process_batch.py")
+    console.log(`Spawning processing script: ${scriptPath} for ${jobId}`)
+
+    const venvPython = path.join(process.cwd(), ".venv", "bin", "python3")
+    const child = spawn(venvPython, [scriptPath, jobId], { detached: true })
+    let stderr = ""
+    child.stdout.on("data", (data) => console.log(`[Job ${jobId}] ${data.toString().trimEnd()}`))
+    child.stderr.on("data", (data) => { stderr += data.toString() })
+    child.on("close", (code) => {
+        if (activeJobs.get(jobId) === child) activeJobs.delete(jobId) // Remove when finished
+        if (code !== 0) console.error(`Processing script error for ${jobId}:`, stderr)
+        else console.log(`Processing script success for ${jobId}`)
+    })
+    activeJobs.set(jobId, child)
+}
+
+// Resolves once the job's process has exited, so the caller's writes can't be overwritten
+// by the job saving its in-memory copy
+async function killJobProcess(jobId: string) {
+    const child = activeJobs.get(jobId)
+    if (!child) return false
+    const exited = new Promise<void>((resolve) => child.once("close", () => resolve()))
+    const signalGroup = (signal: NodeJS.Signals) => {
+        try {
+            // Negative pid: the whole process group (python, its pool workers and ffmpeg)
+            process.kill(-child.pid, signal)
+        } catch {
+            child.kill(signal)
+        }
+    }
+    signalGroup("SIGTERM")
+    const escalate = setTimeout(() => signalGroup("SIGKILL"), STOP_TIMEOUT_MS / 2)
+    await exited
+    clearTimeout(escalate)
+    activeJobs.delete(jobId)
+    return true
+}
+
+// Has the worker daemon stop a job (running or queued) and waits until it has reaped the
+// job's process group; the daemon removes the cancel file then. "cancel" also has the daemon
+// mark the job canceled; "restart" leaves the job for the caller to rewrite and resubmit
+async function stopWorkerJob(jobId: string, reason: "cancel" | "restart") {
+    jobPath(jobId) // validates the id before it becomes a file name
+    const cancelPath = path.join(QUEUE_DIR, "cancel", jobId)
+    await fs.mkdir(path.dirname(cancelPath), { recursive: true })
+    await fs.writeFile(cancelPath, reason)
+    const deadline = Date.now() + STOP_TIMEOUT_MS
+    while (Date.now() < deadline) {
+        try {
+            await fs.access(cancelPath)
+        } catch {
+            return
+        }
+        await new Promise((resolve) => setTimeout(resolve, 200))
+    }
+    throw new Error("The worker did not stop the job in time. Try again in a moment.")
+}
+
+// A resubmitted job's zip holds the outputs being replaced: drop it before the new run starts
+async function dropJobArchive(job: any) {
+    if (job.archive?.file) {
+        await fs.rm(path.join(process.cwd(), "public", "downloads", job.id, path.basename(job.archive.file)), { force: true })
+    }
+    delete job.archive
+}
+
+function jobPath(jobId: string) {
+    // Job ids are UUIDs; refuse anything that could escape the jobs dir
+    if (!/^[\w-]+$/.test(jobId)) throw new Error("Invalid job id")
+    return path.join(JOBS_DIR, `${jobId}.json`)
+}
+
+async function readJob(jobId: string): Promise<any | null> {
+    try {
+        return JSON.parse(await fs.readFile(jobPath(jobId), "utf-8"))
+    } catch {
+        // Not migrated yet: fall back to the legacy monolithic file
+        try {
+            const legacy = JSON.parse(await fs.readFile(LEGACY_DB_PATH, "utf-8"))
+            return legacy[jobId] || null
+        } catch {
+            return null
+        }
+    }
+}
+
+async function writeJob(job: any) {
+    await ensureDb()
+    // Only the job's own file: listings are derived from the job files (JobStore.load_index)
+    await atomicWriteJson(jobPath(job.id), job)
+    await retireLegacyJob(job.id)
+}
+
+// Same stamp as JobStore.stamp: mtime_ns and size, as a string to keep the nanoseconds
+async function fileStamp(filePath: string) {
+    const st = await fs.stat(filePath, { bigint: true })
+    return `${st.mtimeNs}:${st.size}`
+}
+
+// Ids in the legacy jobs.json, re-read only when the file changes
+let legacyIds: { stamp: string | null, ids: Set<string> } = { stamp: null, ids: new Set() }
+
+// A job that has its own file is dropped from the legacy jobs.json (readers prefer the file anyway)
+async function retireLegacyJob(jobId: string) {
+    let stamp: string
+    try {
+        stamp = await fileStamp(LEGACY_DB_PATH)
+    } catch {
+        return
+    }
+    try {
+        if (legacyIds.stamp !== stamp) {
+            legacyIds = { stamp, ids: new Set(Object.keys(JSON.parse(await fs.readFile(LEGACY_DB_PATH, "utf-8")))) }
+        }
+        if (!legacyIds.ids.has(jobId)) return
+        const legacy = JSON.parse(await fs.readFile(LEGACY_DB_PATH, "utf-8"))
+        delete legacy[jobId]
+        await atomicWriteJson(LEGACY_DB_PATH, legacy)
+        legacyIds = { stamp: null, ids: new Set() }
+    } catch (e) {
+        console.error(`Could not retire legacy entry for job ${jobId}:`, e)
+    }
+}
+
+function summarizeJob(job: any) {
+    // Same fields as JobStore.summarize
+    const summary: Record<string, any> = {}
+    for (const key of ["id", "url", "createdAt", "status", "isMock"]) {
+        if (job[key] !== undefined && job[key] !== null) summary[key] = job[key]
+    }
+    const reels = job.reels || []
+    summary.reelCount = reels.length
+    if (reels.length > 0) summary.username = reels[0].username
+    return summary
+}
+
+// Job summaries, newest first. Uses JobStore's index cache for job files that haven't changed
+// since it was written and summarizes the rest; the cache itself is left to the Python side
+export async function listJobs() {
+    await ensureDb()
+    let cached: Record<string, any> = {}
+    try {
+        cached = JSON.parse(await fs.readFile(JOB_INDEX_PATH, "utf-8"))
+    } catch { }
+
+    const summaries = new Map<string, any>()
+    for (const name of await fs.readdir(JOBS_DIR)) {
+        const filePath = path.join(JOBS_DIR, name)
+        if (!name.endsWith(".json") || filePath === JOB_INDEX_PATH) continue
+        const jobId = name.slice(0, -".json".length)
+        try {
+            const stamp = await fileStamp(filePath)
+            let entry = cached[jobId]
+            if (!entry || entry._stamp !== stamp) {
+                entry = summarizeJob({ id: jobId, ...JSON.parse(await fs.readFile(filePath, "utf-8")) })
+            }
+            const summary = { ...entry }
+            delete summary._stamp
+            summaries.set(jobId, summary)
+        } catch {
+            // Removed or half-written: shows up on the next listing
+        }
+    }
+
+    // Not migrated yet; a legacy entry with its own job file is stale
+    try {
+        const legacy = JSON.parse(await fs.readFile(LEGACY_DB_PATH, "utf-8"))
+        for (const [jobId, job] of Object.entries<any>(legacy)) {
+            if (!summaries.has(jobId)) summaries.set(jobId, summarizeJob({ id: jobId, ...job }))
+        }
+    } catch { }
+
+    return [...summaries.values()].sort((a: any, b: any) => (b.createdAt || "").localeCompare(a.createdAt || ""))
+}
+
 interface ScrapedReel {
     id: string
     url: string // This might be a direct Googlevideo link (expiring) or similar. For robust apps, we'd act differently.
@@ -66,6 +276,55 @@ function extractInt(val: FormDataEntryValue | null, def: number): number {
     return isNaN(parsed) ? def : parsed
 }
 
+// Runs scrape_profile.py in --ndjson mode. Each reel is handed to onReel (in arrival order,
+// one at a time) as soon as its files are downloaded; non-JSON stdout lines are ignored.
+function runScraper(args: string[], onReel: (reel: any, position: number) => Promise<void>) {
+    const scriptPath = path.join(process.cwd(), "scripts", "scrape_profile.py")
+    const venvPython = path.join(process.cwd(), ".venv", "bin", "python3")
+
+    return new Promise<{ count: number, errors: string[] }>((resolve, reject) => {
+        const child = spawn(venvPython, [scriptPath, ...args, "--ndjson"])
+        const errors: string[] = []
+        let count = 0
+        let buffer = ""
+        let chain = Promise.resolve()
+
+        const handleLine = (line: string) => {
+            if (!line.trim()) return
+            let event: any
+            try {
+                event = JSON.parse(line)
+            } catch {
+                console.log(`[scraper] ${line}`)
+                return
+            }
+            if (event.type === "reel") {
+                count++
+                chain = chain.then(() => onReel(event.reel, event.position ?? count))
+            } else if (event.type === "error") {
+                errors.push(event.message)
+            } else if (event.type === "progress") {
+                console.log(`[scraper] ${event.stage}: ${event.found}/${event.target}`)
+            }
+        }
+
+        child.stdout.on("data", (chunk) => {
+            buffer += chunk.toString()
+            let newline
+            while ((newline = buffer.indexOf("\n")) !== -1) {
+                handleLine(buffer.slice(0, newline))
+                buffer = buffer.slice(newline + 1)
+            }
+        })
+        child.stderr.on("data", (chunk) => console.error(`[scraper] ${chunk.toString().trim()}`))
+        child.on("error", reject)
+        child.on("close", () => {
+            handleLine(buffer)
+            chain.then(() => resolve({ count, errors }), reject)
+        })
+    })
+}
+
 export async function createScrapeJob(formData: FormData) {
     const url = formData.get("url") as string
     if (!url) throw new Error("URL is required")
@@ -73,6 +332,31 @@ export async function createScrapeJob(formData: FormData) {
     const jobId = randomUUID()
 
     const reelsCount = extractInt(formData.get("reelsCount"), 12)
+    // "top" ranks a window of recent posts by score and downloads only the best reelsCount
+    const selectMode = formData.get("selectMode") === "top" ? "top" : "feed"
+    const scanWindow = extractInt(formData.get("scanWindow"), 200)
+
+    // The job exists from the start and gains reels as the scraper streams them in; the job
+    // page polls it while the status is 'scraping', so thumbnails show up as they land
+    const job: any = {
+        id: jobId,
+        url,
+        createdAt: new Date().toISOString(),
+        status: "scraping",
+        reels: []
+    }
+    await writeJob(job)
+
+    // Not awaited: the user goes to the job page straight away
+    scrapeIntoJob(job, url, reelsCount, selectMode, scanWindow).catch((error) => {
+        console.error(`[Job ${jobId}] Scrape bookkeeping failed:`, error)
+    })
+
+    redirect(`/jobs/${jobId}`)
+}
+
+async function scrapeIntoJob(job: any, url: string, reelsCount: number, selectMode: string, scanWindow: number) {
+    const jobId = job.id
 
     try {
         console.log(`Starting scrape for ${url} (Limit: ${reelsCount})...`)
@@ -83,36 +367,8 @@ export async function createScrapeJob(formData: FormData) {
         const jobDirAbs = path.join(process.cwd(), "public", "downloads", jobDirName)
         await fs.mkdir(jobDirAbs, { recursive: true })
 
-        // Execute python script with output dir AND max_count
-        console.log(`Running python script: ${scriptPath} for ${url} -> ${jobDirAbs} (Max: ${reelsCount})`)
-        const venvPython = path.join(process.cwd(), ".venv", "bin", "python3")
-        const { stdout } = await execAsync(`"${venvPython}" "${scriptPath}" "${url}" "${jobDirAbs}" "${reelsCount}"`)
-
-        // Parse result
-        let mappedReels = []
-        try {
-            // Find the start of the JSON array (in case of other stdout logs)
-            const jsonStartIndex = stdout.indexOf('[')
-            if (jsonStartIndex === -1) {
-                throw new Error("No JSON array found in output")
-            }
-            const jsonContent = stdout.slice(jsonStartIndex)
-            mappedReels = JSON.parse(jsonContent)
-        } catch (e) {
-            console.error("Failed to parse script output:", stdout)
-            throw new Error(stdout || "Failed to parse script output")
-        }
-
-        if (mappedReels.error) {
-            throw new Error(mappedReels.error)
-        }
-
-        if (mappedReels.length === 0) {
-            throw new Error("No reels found (Scraper blocked or private profile)")
-        }
-
         // Map python results to local URLs
-        mappedReels = mappedReels.map((r: any) => ({
+        const toLocalReel = (r: any) => ({
             ...r,
             status: "approved" as const,
             // Construct the public URL: /downloads/{jobId}/{filename}
@@ -125,19 +381,27 @@ export async function createScrapeJob(formData: FormData) {
             playable_url: r.local_video_path
                 ? `/downloads/${jobDirName}/${path.basename(r.local_video_path)}`
                 : r.playable_url
-        }))
+        })
 
-        await ensureDb()
-        const db = JSON.parse(await fs.readFile(DB_PATH, "utf-8"))
+        const positions = new Map<string, number>()
 
-        db[jobId] = {
-            id: jobId,
-            url,
-            createdAt: new Date().toISOString(),
-            reels: mappedReels
+        // Execute python script with output dir AND max_count
+        console.log(`Running python script: ${scriptPath} for ${url} -> ${jobDirAbs} (Max: ${reelsCount})`)
+        const scraperArgs = [url, jobDirAbs, String(reelsCount), "--select", selectMode]
+        if (selectMode === "top") scraperArgs.push("--window", String(scanWindow))
+        const { errors } = await runScraper(scraperArgs, async (reel, position) => {
+            positions.set(reel.id, position)
+            job.reels.push(toLocalReel(reel))
+            job.reels.sort((a: any, b: any) => (positions.get(a.id) ?? 0) - (positions.get(b.id) ?? 0))
+            await writeJob(job)
+        })
+
+        if (job.reels.length === 0) {
+            throw new Error(errors[0] || "No reels found (Scraper blocked or private profile)")
         }
 
-        await atomicWriteJson(DB_PATH, db)
+        delete job.status
+        await writeJob(job)
 
     } catch (error: any) {
         console.error("Scraping failed:", error)
@@ -158,28 +422,21 @@ export async function createScrapeJob(formData: FormData) {
             playable_url: "https://storage.googleapis.com/gtv-videos-bucket/sample/ForBiggerEscapes.mp4"
         }))
 
-        await ensureDb()
-        const db = JSON.parse(await fs.readFile(DB_PATH, "utf-8"))
-        db[jobId] = {
+        await writeJob({
             id: jobId,
             url,
-            createdAt: new Date().toISOString(),
+            createdAt: job.createdAt,
             reels: mockReels,
             isMock: true
-        }
-        await atomicWriteJson(DB_PATH, db)
+        })
     }
-
-    redirect(`/jobs/${jobId}`)
 }
 
 export async function updateJobReelCaptions(jobId: string, captions: Record<string, string>) {
-    await ensureDb()
-    const db = JSON.parse(await fs.readFile(DB_PATH, "utf-8"))
+    const job = await readJob(jobId)
 
-    if (!db[jobId]) throw new Error("Job not found")
+    if (!job) throw new Error("Job not found")
 
-    const job = db[jobId]
     job.reels = job.reels.map((r: any) => {
         if (captions[r.id] !== undefined) {
             return { ...r, generated_caption: captions[r.id] }
@@ -187,14 +444,53 @@ export async function updateJobReelCaptions(jobId: string, captions: Record<stri
         return r
     })
 
-    await atomicWriteJson(DB_PATH, db)
+    await writeJob(job)
+    return { success: true }
+}
+
+// Overrides a 'skip' from duplicate detection: process_batch only flags reels with duplicate_ok
+export async function keepDuplicateReel(jobId: string, reelId: string) {
+    const job = await readJob(jobId)
+    if (!job) throw new Error("Job not found")
+
+    const reel = job.reels.find((r: any) => r.id === reelId)
+    if (!reel) throw new Error("Reel not found")
+    reel.duplicate_ok = true
+    delete reel.duplicate_of
+
+    await writeJob(job)
     return { success: true }
 }
 
 export async function getJob(id: string) {
     await ensureDb()
-    const db = JSON.parse(await fs.readFile(DB_PATH, "utf-8"))
-    return db[id] || null
+    return await readJob(id)
+}
+
+// Latest progress from process_batch's JSON-lines event log, without reading the job file
+export async function getJobProgress(id: string) {
+    const eventsPath = jobPath(id).replace(/\.json$/, ".events.jsonl")
+    let lines: string[]
+    try {
+        lines = (await fs.readFile(eventsPath, "utf-8")).trimEnd().split("\n")
+    } catch {
+        return null
+    }
+    // Only the most recent run counts
+    const runStart = lines.map((line) => line.includes('"event": "job_start"')).lastIndexOf(true)
+    let progress: any = null
+    for (const line of lines.slice(Math.max(0, runStart))) {
+        let event: any
+        try {
+            event = JSON.parse(line)
+        } catch {
+            continue
+        }
+        if (event.event === "job_start") progress = { done: 0, total: event.total, finished: false }
+        else if (event.event === "reel" && progress) progress = { ...progress, done: event.done, lastReel: event.reel_id }
+        else if (event.event === "job_done" && progress) progress = { ...progress, finished: true, summary: event }
+    }
+    return progress
 }
 
 export async function startProcessingJob(formData: FormData) {
@@ -209,17 +505,19 @@ export async function startProcessingJob(formData: FormData) {
     await fs.mkdir(jobDirAbs, { recursive: true })
 
     await ensureDb()
-    const db = JSON.parse(await fs.readFile(DB_PATH, "utf-8"))
+    const job = await readJob(jobId)
 
     const config: any = {
         headerHeight: headerHeight === 'auto' ? 'auto' : parseInt(headerHeight || "15"),
         mode: mode,
-        autoDetectPosition: formData.get("autoDetectPosition") === 'true'
+        autoDetectPosition: formData.get("autoDetectPosition") === 'true',
+        // fast-preview | publish | archive | hardware (see scripts/encode_profiles.py)
+        encodeProfile: (formData.get("encodeProfile") as string) || job?.config?.encodeProfile || undefined
     }
 
     if (mode === 'upload') {
         const headerImage = formData.get("headerImage") as File
-        if (!headerImage && !db[jobId]?.config?.hasHeader) {
+        if (!headerImage && !job?.config?.hasHeader) {
             // Check if file exists maybe? For now require upload if not stored
             throw new Error("Header image required")
         }
@@ -275,34 +573,21 @@ export async function startProcessingJob(formData: FormData) {
 
     console.log(`[Job ${jobId}] Generated Context:`, JSON.stringify(config, null, 2))
 
-    if (db[jobId]) {
+    if (job) {
         // Idempotency: Don't start if already processing or completed
-        if (db[jobId].status === "processing" && activeJobs.has(jobId)) {
+        if (job.status === "processing" && (activeJobs.has(jobId) || await workerHasJob(jobId))) {
             console.log(`[Job ${jobId}] Already processing. Skipping spawn.`)
             return { success: true }
         }
 
-        db[jobId].status = "processing"
-        db[jobId].config = config
+        job.status = "processing"
+        job.config = config
+        await dropJobArchive(job)
+        await writeJob(job)
     }
 
-    await atomicWriteJson(DB_PATH, db)
-
-    // FIRE AND FORGET - Spawn the python processing script
-    const scriptPath = path.join(process.cwd(), "scripts", "process_batch.py")
-    console.log(`Spawning processing script: ${scriptPath} for ${jobId}`)
-
-    const venvPython = path.join(process.cwd(), ".venv", "bin", "python3")
-    const child = exec(`"${venvPython}" "${scriptPath}" "${jobId}"`, (error, stdout, stderr) => {
-        activeJobs.delete(jobId) // Remove when finished
-        if (error) {
-            console.error(`Processing script error for ${jobId}:`, stderr)
-        } else {
-            console.log(`Processing script success for ${jobId}:`, stdout)
-        }
-    })
-
-    activeJobs.set(jobId, child)
+    // FIRE AND FORGET - queue (or spawn) the python processing script
+    await submitProcessing(jobId, PRIORITY_BATCH)
 
     // SAVE PRESET for next time
     if (mode === 'design') {
@@ -319,38 +604,66 @@ export async function startProcessingJob(formData: FormData) {
     return { success: true }
 }
 
+// Still-frame JPEG per reel with the overlay composited, for trying a config or correction
+// before a full encode. `overrides` is merged over the job's stored config and not saved.
+export async function previewJob(jobId: string, overrides: Record<string, any> = {}, reelIds?: string[]) {
+    jobPath(jobId) // validates the id before it reaches the command line
+    const scriptPath = path.join(process.cwd(), "scripts", "preview.py")
+    const venvPython = path.join(process.cwd(), ".venv", "bin", "python3")
+    const args = [scriptPath, jobId, "--config", "-"]
+    if (reelIds?.length) args.push("--reels", reelIds.join(","))
+
+    return new Promise<{ previews: any[], ms: number }>((resolve, reject) => {
+        const child = spawn(venvPython, args)
+        let stdout = ""
+        let stderr = ""
+        child.stdout.on("data", (data) => { stdout += data.toString() })
+        child.stderr.on("data", (data) => { stderr += data.toString() })
+        child.on("error", reject)
+        child.on("close", (code) => {
+            if (code !== 0) return reject(new Error(stderr.trim().split("\n").pop() || `Preview failed (${code})`))
+            try {
+                resolve(JSON.parse(stdout))
+            } catch {
+                reject(new Error("Preview returned invalid output"))
+            }
+        })
+        child.stdin.end(JSON.stringify(overrides))
+    })
+}
+
 export async function applyHeaderCorrection(jobId: string, correction: number) {
     try {
-        const dbContent = await fs.readFile(DB_PATH, "utf-8")
-        const db = JSON.parse(dbContent)
+        // Stop a run still in progress first: it would save its copy of the job over the new config
+        if (await readWorkerState()) {
+            await stopWorkerJob(jobId, "restart")
+        } else {
+            await killJobProcess(jobId)
+        }
+
+        const job = await readJob(jobId)
 
-        if (!db[jobId]) throw new Error("Job not found")
+        if (!job) throw new Error("Job not found")
 
         // Update config
-        if (!db[jobId].config) db[jobId].config = {}
-        db[jobId].config.verticalCorrection = correction
+        if (!job.config) job.config = {}
+        job.config.verticalCorrection = correction
 
         // Reset processed status to force re-generation
-        db[jobId].status = 'processing'
-        db[jobId].reels = db[jobId].reels.map((r: any) => ({
+        job.status = 'processing'
+        job.reels = job.reels.map((r: any) => ({
             ...r,
             processed_path: null, // Clear this so UI knows it's working
+            preview_path: null,
+            poster_path: null,
             // Generated captions/headlines can stay
         }))
+        await dropJobArchive(job)
 
-        await atomicWriteJson(DB_PATH, db)
+        await writeJob(job)
 
-        // Trigger processing
-        const scriptPath = path.join(process.cwd(), "scripts", "process_batch.py")
-        console.log(`[Correction] Spawning processing script: ${scriptPath} for ${jobId}`)
-
-        const venvPython = path.join(process.cwd(), ".venv", "bin", "python3")
-        const child = exec(`"${venvPython}" "${scriptPath}" "${jobId}"`, (error, stdout, stderr) => {
-            activeJobs.delete(jobId)
-            if (error) console.error(`Processing script error for ${jobId}:`, stderr)
-            else console.log(`Processing script success for ${jobId}:`, stdout)
-        })
-        activeJobs.set(jobId, child)
+        // Trigger processing ahead of new batches
+        await submitProcessing(jobId, PRIORITY_CORRECTION)
 
         return { success: true }
     } catch (e) {
@@ -363,24 +676,26 @@ export async function applyHeaderCorrection(jobId: string, correction: number) {
 export async function cancelJob(jobId: string) {
     console.log(`Cancelling job ${jobId}...`)
 
-    // 1. Kill the process if it's running
-    const child = activeJobs.get(jobId)
-    if (child) {
-        // We use SIGTERM. For FFmpeg/Python, we might need a more aggressive 
-        // approach like tree-kill if it doesn't stop, but let's start with this.
-        child.kill('SIGTERM')
-        activeJobs.delete(jobId)
+    // The daemon writes 'canceled' itself, once the job's process group is gone
+    if (await readWorkerState()) {
+        await stopWorkerJob(jobId, "cancel")
+        console.log(`Job ${jobId} canceled by worker.`)
+        return { success: true }
+    }
+
+    // 1. Stop the job's process group if it's running, and wait for it to exit
+    if (await killJobProcess(jobId)) {
         console.log(`Process for job ${jobId} killed.`)
     }
 
     // 2. Update status in DB
     await ensureDb()
-    const db = JSON.parse(await fs.readFile(DB_PATH, "utf-8"))
-    if (db[jobId]) {
+    const job = await readJob(jobId)
+    if (job) {
         // Only mark as canceled if it wasn't already completed
-        if (db[jobId].status !== 'completed') {
-            db[jobId].status = 'canceled'
-            await atomicWriteJson(DB_PATH, db)
+        if (job.status !== 'completed') {
+            job.status = 'canceled'
+            await writeJob(job)
         }
     }
 
@@ -388,32 +703,40 @@ export async function cancelJob(jobId: string) {
 }
 
 export async function createJobZip(jobId: string) {
+    const job = await readJob(jobId)
+    if (!job) throw new Error("Job not found")
     const jobDirAbs = path.join(process.cwd(), "public", "downloads", jobId)
-    const zipName = `batch_output_${jobId.slice(0, 8)}.zip`
-    const zipPath = path.join(jobDirAbs, zipName)
 
-    // Check if any processed files exist
-    try {
-        await fs.access(jobDirAbs)
-    } catch {
-        throw new Error("Job directory not found")
+    if (job.status === "processing") {
+        throw new Error("Still processing. The download is ready when the last reel finishes.")
     }
 
-    // Zip command: zip -j (junk paths) -r (recursive) zipPath sourceFiles
-    // We want only processed_*.mp4
-    // Command: cd jobDir && zip zipName processed_*.mp4
+    // process_batch fills a store-only archive as reels finish; reuse it when it's there
+    if (job.archive?.file) {
+        try {
+            await fs.access(path.join(jobDirAbs, job.archive.file))
+            return `/downloads/${jobId}/${job.archive.file}`
+        } catch { }
+    }
 
+    // No archive from the batch (older job, or outputs changed since): build one from the
+    // processed files on disk, stored without recompression
+    const scriptPath = path.join(process.cwd(), "scripts", "job_archive.py")
+    const venvPython = path.join(process.cwd(), ".venv", "bin", "python3")
     return new Promise<string>((resolve, reject) => {
-        exec(`cd "${jobDirAbs}" && zip -j "${zipName}" processed_*.mp4`, (error, stdout, stderr) => {
-            if (error) {
-                // If 12, it means no files found usually
+        const child = spawn(venvPython, [scriptPath, jobId])
+        let stdout = ""
+        let stderr = ""
+        child.stdout.on("data", (data) => { stdout += data.toString() })
+        child.stderr.on("data", (data) => { stderr += data.toString() })
+        child.on("error", reject)
+        child.on("close", (code) => {
+            if (code !== 0) {
                 console.error("Zip Error:", stderr)
-                // If no processed files, try zipping ANY mp4? 
-                // No, sticking to specific requirement.
                 reject(new Error("No processed videos found to zip. Did processing succeed?"))
                 return
             }
-            resolve(`/downloads/${jobId}/${zipName}`)
+            resolve(stdout.trim().split("\n").pop() as string)
         })
     })
 }
@@ -220,7 +220,8 @@ export default function CaptionsClient({ job, jobId, initialConfigured }: Captio
                             {/* Video Preview Header */}
                             <div className="h-48 bg-black relative">
                                 <video
-                                    src={`/downloads/${jobId}/${reel.processed_path}`}
+                                    src={`/downloads/${jobId}/${reel.preview_path || reel.processed_path}`}
+                                    poster={reel.poster_path ? `/downloads/${jobId}/${reel.poster_path}` : undefined}
                                     className="w-full h-full object-cover opacity-60 group-hover:opacity-80 transition-opacity"
                                     onMouseOver={e => e.currentTarget.play()}
                                     onMouseOut={e => {
@@ -10,7 +10,7 @@ import { VideoCard, type Reel } from "@/components/video-card"
 import { cn } from "@/lib/utils"
 import { SiteHeader } from "@/components/site-header"
 // We import the server action to fetch data
-import { getJob } from "@/app/actions"
+import { getJob, keepDuplicateReel } from "@/app/actions"
 
 export default function JobPage() {
     const params = useParams()
@@ -18,14 +18,26 @@ export default function JobPage() {
     const [reels, setReels] = useState<Reel[]>([])
     const [loading, setLoading] = useState(true)
     const [isProcessing, setIsProcessing] = useState(false)
+    // The scraper is still adding reels (see createScrapeJob)
+    const [isScraping, setIsScraping] = useState(false)
 
     useEffect(() => {
+        let timer: NodeJS.Timeout | undefined
+        let cancelled = false
         async function fetchData() {
             try {
                 const job = await getJob(params.id as string)
+                if (cancelled) return
                 if (job && job.reels) {
-                    setReels(job.reels)
+                    // Keep approve/remove choices already made on reels shown earlier
+                    setReels(prev => {
+                        const local = new Map(prev.map(r => [r.id, r]))
+                        return job.reels.map((r: Reel) => local.get(r.id) ?? r)
+                    })
                 }
+                const scraping = job?.status === "scraping"
+                setIsScraping(scraping)
+                if (scraping) timer = setTimeout(fetchData, 2000)
             } catch (err) {
                 console.error("Failed to fetch job", err)
             } finally {
@@ -33,12 +45,25 @@ export default function JobPage() {
             }
         }
         fetchData()
+        return () => {
+            cancelled = true
+            clearTimeout(timer)
+        }
     }, [params.id])
 
     const handleStatusChange = (id: string, status: "approved" | "rejected" | "pending") => {
         setReels(prev => prev.map(r => r.id === id ? { ...r, status } : r))
     }
 
+    const handleKeepDuplicate = async (id: string) => {
+        try {
+            await keepDuplicateReel(params.id as string, id)
+            setReels(prev => prev.map(r => r.id === id ? { ...r, duplicate_ok: true, duplicate_of: undefined } : r))
+        } catch (err) {
+            console.error("Failed to keep reel", err)
+        }
+    }
+
     const approvedCount = reels.filter(r => r.status === "approved").length
     const rejectedCount = reels.filter(r => r.status === "rejected").length
 
@@ -71,7 +96,7 @@ export default function JobPage() {
 
                         <Button
                             variant={approvedCount === 0 ? "secondary" : "default"}
-                            disabled={approvedCount === 0 || isProcessing}
+                            disabled={approvedCount === 0 || isProcessing || isScraping}
                             onClick={handleProcessConfirm}
                             size="sm"
                             className={cn(
@@ -98,6 +123,9 @@ export default function JobPage() {
                                 <span className="mx-1">•</span>
                                 {reels.length} Reels
                             </p>
+                            {isScraping && (
+                                <span className="bg-sky-500/10 text-sky-400 text-[10px] px-2 py-0.5 rounded-full border border-sky-500/20 font-medium tracking-wide animate-pulse">SCRAPING</span>
+                            )}
                             {reels.length > 0 && reels[0].id.startsWith('mock-') && (
                                 <span className="bg-amber-500/10 text-amber-500 text-[10px] px-2 py-0.5 rounded-full border border-amber-500/20 font-medium tracking-wide">SIMULATION</span>
                             )}
@@ -110,6 +138,7 @@ export default function JobPage() {
                             key={reel.id}
                             reel={reel}
                             onStatusChange={handleStatusChange}
+                            onKeepDuplicate={handleKeepDuplicate}
                             jobId={params.id as string}
                         />
                     ))}
@@ -44,7 +44,8 @@ export default function ProcessingPage() {
                     setJob(latestJob)
                     setStatus(latestJob.status || "processing")
 
-                    const approved = latestJob.reels.filter((r: any) => r.status === "approved")
+                    // Reposts skipped by process_batch (config.duplicates = "skip") are never encoded
+                    const approved = latestJob.reels.filter((r: any) => r.status === "approved" && r.duplicate_of?.action !== "skipped")
                     const processed = approved.filter((r: any) => r.processed_path)
                     const pending = approved.filter((r: any) => !r.processed_path)
 
@@ -102,7 +103,7 @@ export default function ProcessingPage() {
 
             // Optimistic update: Move all to pending immediately so skeletons show
             if (job && job.reels) {
-                const approved = job.reels.filter((r: any) => r.status === "approved")
+                const approved = job.reels.filter((r: any) => r.status === "approved" && r.duplicate_of?.action !== "skipped")
                 setPendingReels(approved)
             }
 
@@ -519,7 +519,8 @@ export default function SchedulePage() {
                                             >
                                                 <div className="aspect-[9/16] relative bg-black">
                                                     <video
-                                                        src={`/downloads/${jobId}/${reel.processed_path}`}
+                                                        src={`/downloads/${jobId}/${reel.preview_path || reel.processed_path}`}
+                                                        poster={reel.poster_path ? `/downloads/${jobId}/${reel.poster_path}` : undefined}
                                                         className="w-full h-full object-cover"
                                                         muted
                                                         loop
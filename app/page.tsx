@@ -1,19 +1,27 @@
 "use client"
 
+import Link from "next/link"
 import { motion } from "framer-motion"
 import { ArrowRight, Instagram, Layers, Zap, Shield, Sparkles, Loader2 } from "lucide-react"
 import { Button } from "@/components/ui/button"
 import { Input } from "@/components/ui/input"
 import { Card, CardContent } from "@/components/ui/card"
 import { SiteHeader } from "@/components/site-header"
-import { createScrapeJob } from "./actions"
-import { useState, useTransition } from "react"
+import { createScrapeJob, listJobs } from "./actions"
+import { useEffect, useState, useTransition } from "react"
 import { cn } from "@/lib/utils"
 
 export default function Home() {
   const [url, setUrl] = useState("")
   const [reelsCount, setReelsCount] = useState(12)
   const [isPending, startTransition] = useTransition()
+  const [recentJobs, setRecentJobs] = useState<any[]>([])
+
+  useEffect(() => {
+    listJobs()
+      .then((jobs) => setRecentJobs(jobs.slice(0, 6)))
+      .catch((error) => console.error("Failed to list jobs:", error))
+  }, [])
 
   return (
     <main className="min-h-screen bg-black text-slate-50 flex flex-col items-center justify-center p-6 relative overflow-hidden pt-24">
@@ -181,6 +189,27 @@ export default function Home() {
             <Sparkles className="w-3 h-3 text-emerald-500" /> AI Detection
           </div>
         </div>
+
+        {/* Recent Jobs */}
+        {recentJobs.length > 0 && (
+          <div className="mt-10 space-y-3">
+            <p className="text-[10px] font-black uppercase tracking-[0.3em] text-slate-600 text-center">Recent Jobs</p>
+            <div className="grid gap-2">
+              {recentJobs.map((job) => (
+                <Link
+                  key={job.id}
+                  href={`/jobs/${job.id}`}
+                  className="flex items-center justify-between px-5 py-3 rounded-2xl bg-white/5 border border-white/10 text-xs text-slate-400 hover:bg-emerald-500/10 hover:text-emerald-400 hover:border-emerald-500/20 transition-all"
+                >
+                  <span className="font-bold truncate">@{job.username || "user"}</span>
+                  <span className="font-mono text-[10px] uppercase tracking-wider text-slate-500">
+                    {job.reelCount} reels{job.status ? ` · ${job.status}` : ""}
+                  </span>
+                </Link>
+              ))}
+            </div>
+          </div>
+        )}
       </motion.div>
     </main>
   )
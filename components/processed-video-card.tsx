@@ -11,6 +11,8 @@ interface Reel {
     username: string
     local_video_path?: string
     processed_path?: string
+    preview_path?: string // Small faststart rendition written alongside processed_path
+    poster_path?: string
     caption?: string
     layout?: { y: number, h: number, correction: number, width?: number, height?: number }
     generated_headline?: string
@@ -35,8 +37,13 @@ export function ProcessedVideoCard({ reel, jobId, className, previewCorrection =
         ? `/downloads/${jobId}/${reel.local_video_path}`
         : `/downloads/${jobId}/${reel.processed_path || reel.local_video_path}`
 
+    // Play the lightweight preview rendition when there is one; downloads still get the publish file
+    const playbackSrc = !isPreview && reel.preview_path ? `/downloads/${jobId}/${reel.preview_path}` : baseVideoSrc
+    const posterSrc = !isPreview && reel.poster_path ? `/downloads/${jobId}/${reel.poster_path}` : undefined
+
     // Add cache-buster to ensure we see the latest processed version
-    const videoSrc = `${baseVideoSrc}?t=${new Date().getTime()}`
+    const cacheBuster = `?t=${new Date().getTime()}`
+    const videoSrc = `${playbackSrc}${cacheBuster}`
 
     // Calculate simulated overlay position
     // Use stored layout if available, otherwise guess generic 15%
@@ -99,6 +106,8 @@ export function ProcessedVideoCard({ reel, jobId, className, previewCorrection =
                 <video
                     ref={videoRef}
                     src={videoSrc}
+                    poster={posterSrc && `${posterSrc}${cacheBuster}`}
+                    preload={posterSrc ? "none" : "metadata"}
                     className="w-full h-full object-cover opacity-90 group-hover/card:opacity-100 transition-opacity duration-500"
                     muted
                     loop
@@ -117,7 +126,7 @@ export function ProcessedVideoCard({ reel, jobId, className, previewCorrection =
                             fontFamily: 'sans-serif' // Fallback, we'd need to load fonts but standard sans is close enough for preview
                         }}
                     >
-                        {/* This structure mimics generate_design_overlay roughly */}
+                        {/* This structure mimics scripts/layout_engine.py roughly */}
                         <div className="flex items-center gap-3 w-full" style={{ paddingTop: '2%' }}>
                             {/* Logo Proxy */}
                             <div
@@ -20,15 +20,20 @@ export interface Reel {
     headerHeight?: number
     filename_base?: string
     local_video_path?: string
+    // Kept by hand despite a duplicate match: process_batch flags it but never skips it
+    duplicate_ok?: boolean
+    // Set by process_batch when the clip matches an earlier reel (see scripts/reel_dedup.py)
+    duplicate_of?: { job_id: string, reel_id: string, username?: string, distance: number, action: "flagged" | "skipped" }
 }
 
 interface VideoCardProps {
     reel: Reel
     onStatusChange: (id: string, status: "approved" | "rejected" | "pending") => void
+    onKeepDuplicate?: (id: string) => void
     jobId?: string
 }
 
-export function VideoCard({ reel, onStatusChange, jobId }: VideoCardProps) {
+export function VideoCard({ reel, onStatusChange, onKeepDuplicate, jobId }: VideoCardProps) {
     const videoRef = useRef<HTMLVideoElement>(null)
     const [isPlaying, setIsPlaying] = useState(false)
     const [isHovered, setIsHovered] = useState(false)
@@ -122,6 +127,26 @@ export function VideoCard({ reel, onStatusChange, jobId }: VideoCardProps) {
                         <Check className="w-3 h-3" />
                     </div>
                 )}
+                {reel.duplicate_of && (
+                    <div
+                        className="bg-amber-500 text-black text-[9px] font-bold px-2 py-0.5 rounded-full shadow-lg uppercase tracking-wider"
+                        title={`Same clip as ${reel.duplicate_of.username ? "@" + reel.duplicate_of.username + " " : ""}reel ${reel.duplicate_of.reel_id}`}
+                    >
+                        {reel.duplicate_of.action === "skipped" ? "Repost · skipped" : "Repost"}
+                    </div>
+                )}
+                {reel.duplicate_of?.action === "skipped" && onKeepDuplicate && (
+                    <button
+                        className="bg-black/60 hover:bg-black/80 text-white text-[9px] font-semibold px-2 py-0.5 rounded-full border border-white/10 shadow-lg"
+                        title="Process this reel even though it matches an earlier one"
+                        onClick={(e) => {
+                            e.stopPropagation()
+                            onKeepDuplicate(reel.id)
+                        }}
+                    >
+                        Keep anyway
+                    </button>
+                )}
             </div>
 
             {/* Username Overlay - Always Visible */}
@@ -0,0 +1,149 @@
+import os
+
+try:
+    from PIL import Image, ImageDraw, ImageFont, ImageOps
+except ImportError:
+    pass
+
+from overlay_cache import file_digest
+
+def create_circular_logo(logo_path, size):
+    try:
+        img = Image.open(logo_path).convert("RGBA")
+        img = ImageOps.fit(img, size, centering=(0.5, 0.5))
+
+        mask = Image.new('L', size, 0)
+        draw = ImageDraw.Draw(mask)
+        draw.ellipse((0, 0, size[0], size[1]), fill=255)
+
+        output = Image.new('RGBA', size, (0, 0, 0, 0))
+        output.paste(img, (0, 0), mask)
+
+        # Border thickness: scale_factor * 1.5 roughly equals 1px visual border
+        # We need to pass the scale_factor here or calculate it.
+        # For now, let's use a more subtle relative calculation.
+        border_thickness = max(1, int(size[0] * 0.02))
+        draw_overlay = ImageDraw.Draw(output)
+        draw_overlay.ellipse((0, 0, size[0]-1, size[1]-1), outline="white", width=border_thickness)
+
+        return output
+    except Exception as e:
+        print(f"Error processing logo: {e}")
+        return Image.new('RGBA', size, (100, 100, 100, 255))
+
+def fit_badge(badge_path, size):
+    badge_img = Image.open(badge_path).convert("RGBA")
+    return ImageOps.fit(badge_img, size, centering=(0.5, 0.5))
+
+class AssetRegistry:
+    """
+    Process-wide memo of fonts and fitted images used by the overlay renderer.
+    Font paths are probed once per weight, FreeTypeFont objects are kept per (path, size),
+    and the circular logo / badge per (file hash, size). Returned images are shared:
+    paste them, don't draw on them.
+    """
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self._font_paths = {}
+        self._fonts = {}
+        self._images = {}
+        self._counters = {}
+
+    def _count(self, kind, hit):
+        counter = self._counters.setdefault(kind, {'hits': 0, 'misses': 0})
+        counter['hits' if hit else 'misses'] += 1
+
+    def font_candidates(self, bold=False):
+        return [
+            os.path.join(self.base_dir, "public", "fonts", "Montserrat-Regular.ttf"),
+            os.path.join(self.base_dir, "public", "fonts", "Montserrat-Light.ttf"),
+            "Arial Bold.ttf" if bold else "Arial.ttf",
+            "Helvetica-Bold" if bold else "Helvetica",
+            "/System/Library/Fonts/Supplemental/Arial.ttf"
+        ]
+
+    def font_path(self, bold=False):
+        """First loadable font for the weight, or None if only the PIL default works."""
+        if bold in self._font_paths:
+            return self._font_paths[bold]
+        resolved = None
+        for path in self.font_candidates(bold):
+            try:
+                ImageFont.truetype(path, 12)
+                resolved = path
+                break
+            except:
+                continue
+        self._font_paths[bold] = resolved
+        return resolved
+
+    def font_at_path(self, path, size):
+        """FreeTypeFont for an explicit file, or None if it can't be loaded."""
+        key = (path, size)
+        if key in self._fonts:
+            self._count('font', True)
+            return self._fonts[key]
+        self._count('font', False)
+        try:
+            font = ImageFont.truetype(path, size)
+        except:
+            font = None
+        self._fonts[key] = font
+        return font
+
+    def font(self, size, bold=False):
+        path = self.font_path(bold)
+        font = self.font_at_path(path, size) if path else None
+        if font is not None:
+            return font
+
+        # No usable font file: PIL's bundled default, memoized like the real fonts
+        key = (None, size)
+        if key in self._fonts:
+            self._count('font', True)
+            return self._fonts[key]
+        self._count('font', False)
+        try:
+            # Pillow >= 10.1 can scale the default font; older versions only have the bitmap one
+            font = ImageFont.load_default(size)
+        except TypeError:
+            font = ImageFont.load_default()
+        except:
+            font = None
+        self._fonts[key] = font
+        return font
+
+    def _image(self, kind, path, size, build):
+        key = (kind, file_digest(path), tuple(size))
+        if key in self._images:
+            self._count(kind, True)
+            return self._images[key]
+        self._count(kind, False)
+        img = build(path, tuple(size))
+        self._images[key] = img
+        return img
+
+    def circular_logo(self, logo_path, size):
+        return self._image('logo', logo_path, size, create_circular_logo)
+
+    def badge(self, badge_path, size):
+        return self._image('badge', badge_path, size, fit_badge)
+
+    def stats(self):
+        return {kind: dict(counter) for kind, counter in self._counters.items()}
+
+def merge_stats(snapshots):
+    """Sums stats() snapshots (e.g. one per pool worker)."""
+    total = {}
+    for snapshot in snapshots:
+        for kind, counter in snapshot.items():
+            agg = total.setdefault(kind, {'hits': 0, 'misses': 0})
+            agg['hits'] += counter.get('hits', 0)
+            agg['misses'] += counter.get('misses', 0)
+    return total
+
+def format_stats(stats):
+    if not stats:
+        return "no lookups"
+    return ", ".join(f"{kind} {c['hits']} hit/{c['misses']} miss" for kind, c in sorted(stats.items()))
@@ -0,0 +1,124 @@
+"""
+Regression harness for header detectors.
+
+Runs every detector in header_detect.DETECTORS over a corpus of clips, times them,
+and checks each (y, h, padding) against the 'accurate' reference.
+
+Usage: python3 bench_detect.py <clip_or_dir> [...] [--tolerance PX] [--json OUT]
+Exits non-zero if any detector drifts further than the tolerance.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+
+from header_detect import DETECTORS, OPENCV_AVAILABLE
+
+REFERENCE = 'accurate'
+
+def collect_clips(paths):
+    clips = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(('.mp4', '.mov', '.m4v', '.webm')) and not name.startswith('processed_'):
+                    clips.append(os.path.join(path, name))
+        elif os.path.exists(path):
+            clips.append(path)
+    return clips
+
+def clip_height(path):
+    import cv2
+    cap = cv2.VideoCapture(path)
+    try:
+        return int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    finally:
+        cap.release()
+
+def run_detector(detector, path, height, show_headline):
+    # Detectors narrate to stdout; keep the report readable
+    with open(os.devnull, 'w') as fnull, contextlib.redirect_stdout(fnull):
+        start = time.perf_counter()
+        result = detector(path, height, show_headline=show_headline)
+        elapsed = time.perf_counter() - start
+    return tuple(int(v) for v in result), elapsed
+
+def compare(clips, tolerance, detectors=DETECTORS):
+    rows = []
+    for path in clips:
+        height = clip_height(path)
+        if not height:
+            print(f"Skipping unreadable clip {path}")
+            continue
+        for show_headline in (True, False):
+            results = {name: run_detector(fn, path, height, show_headline) for name, fn in detectors.items()}
+            ref, _ = results[REFERENCE]
+            for name, (layout, elapsed) in results.items():
+                drift = max(abs(a - b) for a, b in zip(layout, ref))
+                rows.append({
+                    'clip': os.path.basename(path),
+                    'show_headline': show_headline,
+                    'detector': name,
+                    'layout': list(layout),
+                    'reference': list(ref),
+                    'drift_px': drift,
+                    'seconds': round(elapsed, 4),
+                    'ok': drift <= tolerance,
+                })
+    return rows
+
+def summarize(rows):
+    summary = {}
+    for row in rows:
+        s = summary.setdefault(row['detector'], {'runs': 0, 'seconds': 0.0, 'max_drift_px': 0, 'failures': 0})
+        s['runs'] += 1
+        s['seconds'] += row['seconds']
+        s['max_drift_px'] = max(s['max_drift_px'], row['drift_px'])
+        s['failures'] += 0 if row['ok'] else 1
+    for s in summary.values():
+        s['mean_ms'] = round(1000 * s['seconds'] / max(1, s['runs']), 1)
+    ref = summary.get(REFERENCE)
+    for s in summary.values():
+        # How many times faster than the reference detector
+        s['speedup'] = round(ref['seconds'] / s['seconds'], 2) if ref and s['seconds'] else None
+        s['agreement'] = round(1 - s['failures'] / max(1, s['runs']), 3)
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--tolerance', type=int, default=4, help="Max allowed drift in pixels (default 4)")
+    parser.add_argument('--json', help="Write per-clip rows and summary to this file")
+    args = parser.parse_args()
+
+    if not OPENCV_AVAILABLE:
+        print("OpenCV is required for the detection harness")
+        sys.exit(2)
+
+    clips = collect_clips(args.paths)
+    if not clips:
+        print("No clips found")
+        sys.exit(2)
+
+    rows = compare(clips, args.tolerance)
+    for row in rows:
+        flag = "ok " if row['ok'] else "BAD"
+        print(f"{flag} {row['clip']:<32} headline={str(row['show_headline']):<5} {row['detector']:<10} "
+              f"{tuple(row['layout'])} ref={tuple(row['reference'])} drift={row['drift_px']}px {row['seconds']*1000:.1f}ms")
+
+    summary = summarize(rows)
+    print()
+    for name, s in summary.items():
+        print(f"{name:<10} runs={s['runs']} mean={s['mean_ms']}ms speedup={s['speedup']}x "
+              f"agreement={s['agreement']:.1%} max_drift={s['max_drift_px']}px failures={s['failures']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'tolerance': args.tolerance, 'rows': rows, 'summary': summary}, f, indent=2)
+
+    sys.exit(1 if any(not row['ok'] for row in rows) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Times each encode profile on sample reels and reports throughput and output size.
+
+Usage: python3 bench_encode.py <clip_or_dir> [...] [--profiles a,b] [--threads N] [--json OUT]
+       python3 bench_encode.py <clip_or_dir> [...] --banner [--profiles fast-preview]
+
+Each clip is transcoded once per profile (video only, audio stream-copied like the real
+pipeline). Reports encode fps, realtime factor, output bitrate and size per profile.
+
+--banner instead compares overlay paths with a synthetic opaque banner over the top 14%:
+  fullframe  full-frame RGBA overlay decoded every frame at 0:0 (the original temp-PNG path)
+  banner     banner-sized single raw frame held with eof_action=repeat
+  banner-roi banner plus addroi hints outside the band (bannerEncode=roi); the run fails
+             if ffmpeg reports it skipped the ROI hints
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+from bench_detect import collect_clips
+from encode_profiles import ENCODE_PROFILES, encoder_args, resolve_profile, roi_supported
+from media_probe import probe_media
+from process_batch import roi_filters
+
+BANNER_SHARE = 0.14
+
+# What ffmpeg logs when an encoder drops addroi side data (e.g. x264 with AQ off)
+ROI_SKIPPED_MARKER = "skipping ROI"
+
+def encode_once(input_path, output_path, video_args, filter_args=(), extra_inputs=(), stdin_bytes=None):
+    """Returns (seconds, stderr text). Warnings are kept so ignored ROI hints can be caught."""
+    cmd = [
+        'ffmpeg', '-y', '-v', 'warning',
+        '-i', input_path,
+        *extra_inputs,
+        *filter_args,
+        '-c:a', 'copy',
+        *video_args,
+        output_path
+    ]
+    start = time.perf_counter()
+    result = subprocess.run(cmd, input=stdin_bytes, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    return time.perf_counter() - start, result.stderr.decode('utf-8', 'replace')
+
+def measure(probe, elapsed, output_path):
+    frames = (probe.get('duration') or 0) * (probe.get('fps') or 0)
+    size = os.path.getsize(output_path)
+    duration = probe.get('duration') or 0
+    return {
+        'seconds': round(elapsed, 3),
+        'fps': round(frames / elapsed, 1) if elapsed and frames else None,
+        'realtime_x': round(duration / elapsed, 2) if elapsed and duration else None,
+        'bytes': size,
+        'kbps': round(size * 8 / duration / 1000, 1) if duration else None,
+    }
+
+def banner_variants(probe, work_dir):
+    """(name, extra_inputs, filter_args, stdin_bytes) for each overlay path."""
+    width, height = probe['width'], probe['height']
+    band_h = int(height * BANNER_SHARE)
+    opaque = b'\x00\x00\x00\xff'
+
+    full_path = os.path.join(work_dir, "fullframe.rgba")
+    with open(full_path, 'wb') as f:
+        f.write(opaque * (width * band_h) + bytes(4 * width * (height - band_h)))
+    full_inputs = ['-stream_loop', '-1', '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f"{width}x{height}", '-i', full_path]
+
+    banner_bytes = opaque * (width * band_h)
+    banner_inputs = ['-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f"{width}x{band_h}", '-i', 'pipe:0']
+    banner_graph = "[0:v][1:v]overlay=0:0:eof_action=repeat"
+
+    return [
+        ('fullframe', full_inputs, ['-filter_complex', "[0:v][1:v]overlay=0:0:shortest=1"], None),
+        ('banner', banner_inputs, ['-filter_complex', banner_graph], banner_bytes),
+        ('banner-roi', banner_inputs, ['-filter_complex', banner_graph + roi_filters('roi', 0, band_h, height)], banner_bytes),
+    ]
+
+def summarize(rows, key):
+    summary = {}
+    for row in rows:
+        s = summary.setdefault(row[key], {'runs': 0, 'seconds': 0.0, 'bytes': 0, 'fps': []})
+        s['runs'] += 1
+        s['seconds'] += row['seconds']
+        s['bytes'] += row['bytes']
+        if row['fps']:
+            s['fps'].append(row['fps'])
+    for s in summary.values():
+        fps = s.pop('fps')
+        s['seconds'] = round(s['seconds'], 3)
+        s['mean_fps'] = round(sum(fps) / len(fps), 1) if fps else None
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--profiles', default=",".join(ENCODE_PROFILES), help="Comma-separated profile names")
+    parser.add_argument('--threads', type=int, default=None, help="Per-encode thread cap (as with --workers)")
+    parser.add_argument('--banner', action='store_true', help="Compare overlay paths instead of profiles")
+    parser.add_argument('--json', help="Write rows and summary to this file")
+    args = parser.parse_args()
+
+    clips = collect_clips(args.paths)
+    if not clips:
+        print("No clips found")
+        sys.exit(2)
+
+    profiles = [p.strip() for p in args.profiles.split(',') if p.strip()]
+    if args.banner:
+        for name in profiles:
+            if not roi_supported(name):
+                print(f"{name}: encoder ignores ROI hints, no banner-roi row")
+    work_dir = tempfile.mkdtemp(prefix="bench_encode_")
+    rows = []
+    try:
+        for clip in clips:
+            probe = probe_media(clip)
+            if not probe:
+                continue
+            for name in profiles:
+                variants = banner_variants(probe, work_dir) if args.banner else [(None, (), (), None)]
+                for variant, extra_inputs, filter_args, stdin_bytes in variants:
+                    label = f"{name}/{variant}" if variant else name
+                    output_path = os.path.join(work_dir, f"{name}_{variant or 'plain'}.mp4")
+                    roi = variant == 'banner-roi'
+                    if roi and not roi_supported(name):
+                        continue
+                    try:
+                        elapsed, log = encode_once(clip, output_path, encoder_args(name, threads=args.threads, roi=roi),
+                                                   filter_args=filter_args, extra_inputs=extra_inputs, stdin_bytes=stdin_bytes)
+                    except subprocess.CalledProcessError as e:
+                        print(f"{label} failed on {clip}: {e.stderr.decode()[-300:]}")
+                        continue
+                    if roi and ROI_SKIPPED_MARKER in log:
+                        # Sizes would be those of a plain banner encode; don't report them as ROI savings
+                        print(f"{label} on {clip}: encoder ignored the ROI hints, result dropped")
+                        continue
+                    row = {'clip': os.path.basename(clip), 'profile': name, 'variant': label, 'resolved': resolve_profile(name)[1]}
+                    row.update(measure(probe, elapsed, output_path))
+                    rows.append(row)
+                    print(f"{row['clip']:<32} {label:<24} {row['seconds']:>7.2f}s {row['fps'] or 0:>7.1f}fps "
+                          f"{row['kbps'] or 0:>8.0f}kbps {row['bytes'] / 1e6:>7.2f}MB")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    summary = summarize(rows, 'variant')
+    print()
+    for name, s in summary.items():
+        print(f"{name:<24} runs={s['runs']} total={s['seconds']}s mean_fps={s['mean_fps']} total_size={s['bytes'] / 1e6:.2f}MB")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'rows': rows, 'summary': summary}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""
+Reproducible benchmark for the render pipeline on synthetic reels.
+
+Usage: python3 bench_pipeline.py [--sizes 720x1280,1080x1920] [--durations 3,8] [--headers 0.06,0.1]
+                                 [--repeat N] [--workers N] [--mode design|upload] [--skip-e2e]
+                                 [--clips-dir DIR] [--json OUT] [--compare BASELINE]
+
+Every size x duration x header position combination becomes one clip: ffmpeg testsrc moving
+below a flat top band, with a fake header drawn into the band as solid "word" boxes (a logo
+square, a name row and a headline row). Boxes instead of drawtext keep the ground truth exact
+and the clips identical on machines without fonts. Clips are named by their spec, so
+--clips-dir reuses them between runs.
+
+Reported per stage (probe, detect per detector, overlay render) and for process_batch.py run
+end to end on a throwaway job: latency percentiles, throughput and peak RSS. Detection
+accuracy is the envelope error against the drawn boxes and whether the final banner covers
+them. --compare prints the change of each headline metric against an earlier --json file.
+"""
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import resource
+import contextlib
+import importlib.util
+import subprocess
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+
+from header_detect import DETECTORS, ENVELOPE_SAMPLERS, OPENCV_AVAILABLE, merge_envelopes
+from media_probe import probe_media
+
+# process_batch imports Pillow itself; the bench only needs to know whether it's there
+PILLOW_AVAILABLE = importlib.util.find_spec("PIL") is not None
+
+# Flat band at the top of every clip; detection only looks at the top 25%
+BAND_SHARE = 0.25
+FPS = 30
+
+def parse_sizes(text):
+    return [tuple(int(v) for v in size.lower().split('x')) for size in text.split(',') if size.strip()]
+
+def parse_floats(text):
+    return [float(v) for v in text.split(',') if v.strip()]
+
+def header_boxes(width, height, header_y):
+    """
+    Fake header as (x, y, w, h) boxes: logo square and name/handle words on the profile row,
+    then a headline row. Returns (boxes, profile_row_bottom).
+    """
+    y0 = int(height * header_y)
+    logo = int(height * 0.05)
+    pad = int(width * 0.04)
+    word_h = max(4, int(height * 0.012))
+    text_x = pad + logo + pad // 2
+    boxes = [(pad, y0, logo, logo)]
+    for i, w in enumerate((0.18, 0.12)):
+        boxes.append((text_x + i * int(width * 0.22), y0 + int(logo * 0.15), int(width * w), word_h))
+    boxes.append((text_x, y0 + int(logo * 0.6), int(width * 0.15), word_h))
+    headline_y = y0 + logo + int(height * 0.015)
+    headline_h = max(6, int(height * 0.02))
+    x = pad
+    for w in (0.16, 0.10, 0.21, 0.13):
+        boxes.append((x, headline_y, int(width * w), headline_h))
+        x += int(width * w) + int(width * 0.03)
+    return boxes, y0 + logo
+
+def ground_truth(boxes, profile_bottom):
+    """Envelopes the detector should find: (top, bottom) with and without the headline row."""
+    top = min(b[1] for b in boxes)
+    return {
+        True: (top, max(b[1] + b[3] for b in boxes)),
+        False: (top, profile_bottom),
+    }
+
+def synthesize_clip(clips_dir, width, height, duration, header_y):
+    """Renders one synthetic reel (cached by spec). Returns (path, ground truth)."""
+    boxes, profile_bottom = header_boxes(width, height, header_y)
+    name = f"synth_{width}x{height}_{duration:g}s_h{int(header_y * 1000):03d}.mp4"
+    path = os.path.join(clips_dir, name)
+    if not os.path.exists(path):
+        band_h = int(height * BAND_SHARE)
+        filters = [f"drawbox=x=0:y=0:w=iw:h={band_h}:color=0x101010:t=fill"]
+        filters += [f"drawbox=x={x}:y={y}:w={w}:h={h}:color=white:t=fill" for x, y, w, h in boxes]
+        cmd = [
+            'ffmpeg', '-y', '-v', 'error',
+            '-f', 'lavfi', '-i', f"testsrc=size={width}x{height}:rate={FPS}:duration={duration:g}",
+            '-f', 'lavfi', '-i', f"sine=frequency=440:duration={duration:g}",
+            '-vf', ",".join(filters),
+            '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p',
+            '-c:a', 'aac', '-shortest',
+            path
+        ]
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+    return path, ground_truth(boxes, profile_bottom)
+
+def percentiles(values):
+    """p50/p90/p99 (nearest rank), mean and count of a list of seconds."""
+    if not values:
+        return {'count': 0}
+    ordered = sorted(values)
+
+    def rank(p):
+        return ordered[max(0, math.ceil(p / 100.0 * len(ordered)) - 1)]
+
+    return {
+        'count': len(ordered),
+        'mean_ms': round(1000 * sum(ordered) / len(ordered), 2),
+        'p50_ms': round(1000 * rank(50), 2),
+        'p90_ms': round(1000 * rank(90), 2),
+        'p99_ms': round(1000 * rank(99), 2),
+    }
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(who).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def timed(fn, *args, **kwargs):
+    # Pipeline functions narrate to stdout; keep the report readable
+    with open(os.devnull, 'w') as fnull, contextlib.redirect_stdout(fnull):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        return result, time.perf_counter() - start
+
+def bench_probe(clips, repeat):
+    samples = []
+    for clip in clips:
+        for _ in range(repeat):
+            samples.append(timed(probe_media, clip['path'])[1])
+    return percentiles(samples)
+
+def bench_detect(clips, repeat):
+    """Latency and accuracy per detector, for both headline settings."""
+    results = {}
+    for name, detector in DETECTORS.items():
+        sampler = ENVELOPE_SAMPLERS.get(name)
+        samples, errors, covered, runs = [], [], 0, 0
+        for clip in clips:
+            for show_headline in (True, False):
+                truth = clip['truth'][show_headline]
+                for _ in range(repeat):
+                    layout, elapsed = timed(detector, clip['path'], clip['height'], show_headline=show_headline)
+                    samples.append(elapsed)
+                runs += 1
+                y, h, _ = (int(v) for v in layout)
+                covered += 1 if y <= truth[0] and y + h >= truth[1] else 0
+                if sampler:
+                    envelope, _ = timed(lambda: merge_envelopes(sampler(clip['path'], show_headline=show_headline)))
+                    if envelope:
+                        errors.append(max(abs(envelope[0] - truth[0]), abs(envelope[1] - truth[1])))
+                    else:
+                        errors.append(None)
+        found = [e for e in errors if e is not None]
+        results[name] = {
+            **percentiles(samples),
+            'banner_covers_truth': f"{covered}/{runs}",
+            'envelope_error_px_mean': round(sum(found) / len(found), 1) if found else None,
+            'envelope_error_px_max': max(found) if found else None,
+            'envelope_missed': len(errors) - len(found),
+        }
+    return results
+
+def bench_overlay(clips, repeat, work_dir):
+    """Design banner render (layout + draw at banner size), uncached."""
+    import process_batch
+    config = design_config()
+    samples = []
+    for clip in clips:
+        layout = (int(clip['height'] * 0.05), int(clip['height'] * 0.15), int(clip['width'] * 0.04))
+        for _ in range(repeat):
+            def render():
+                return process_batch.render_design_overlay(work_dir, config, clip['width'], clip['height'],
+                                                           {'id': 'bench'}, base_dir, layout_override=layout)
+            samples.append(timed(render)[1])
+    return percentiles(samples)
+
+def design_config():
+    return {
+        'mode': 'design', 'designName': 'Bench Account', 'designHandle': 'bench', 'designBgColor': '#000000',
+        'designOpacity': 80, 'logoSize': 12, 'nameFontSize': 18, 'handleFontSize': 14, 'headlineFontSize': 24,
+        'showHeadline': 'true', 'headlineMode': 'manual', 'manualHeadline': 'Benchmark headline for the pipeline',
+        'autoDetectPosition': 'true', 'useLayoutCache': 'false',
+    }
+
+def bench_end_to_end(clips, workers, mode, work_dir):
+    """
+    Runs process_batch.py as a subprocess on a throwaway project dir holding every clip,
+    then reads its event log for per-reel stage latencies.
+    """
+    project = os.path.join(work_dir, "project")
+    job_id = "bench"
+    job_dir = os.path.join(project, "public", "downloads", job_id)
+    os.makedirs(job_dir, exist_ok=True)
+    os.makedirs(os.path.join(project, "data", "jobs"), exist_ok=True)
+    for shared in ("fonts", "Twitter_Verified_Badge_Gold.svg.png"):
+        source = os.path.join(base_dir, "public", shared)
+        if os.path.exists(source):
+            os.symlink(source, os.path.join(project, "public", shared))
+
+    reels = []
+    for i, clip in enumerate(clips):
+        filename = f"reel_{i:03d}.mp4"
+        shutil.copy(clip['path'], os.path.join(job_dir, filename))
+        reels.append({'id': f"reel_{i:03d}", 'status': 'approved', 'local_video_path': filename, 'username': 'bench'})
+    config = design_config() if mode == 'design' else {'mode': 'upload', 'autoDetectPosition': 'true', 'useLayoutCache': 'false'}
+    if mode == 'upload':
+        subprocess.run(['ffmpeg', '-y', '-v', 'error', '-f', 'lavfi', '-i', 'color=c=red:s=1080x200', '-frames:v', '1',
+                        os.path.join(job_dir, "header_overlay.png")], check=True)
+    with open(os.path.join(project, "data", "jobs", f"{job_id}.json"), 'w') as f:
+        json.dump({'id': job_id, 'config': config, 'reels': reels}, f)
+
+    events_path = os.path.join(work_dir, "events.jsonl")
+    cmd = [sys.executable, os.path.join(script_dir, "process_batch.py"), job_id, '--force', '--events', events_path]
+    if workers:
+        cmd += ['--workers', str(workers)]
+    start = time.perf_counter()
+    subprocess.run(cmd, cwd=project, check=True, stdout=subprocess.DEVNULL)
+    wall = time.perf_counter() - start
+
+    stage_samples = {}
+    outcomes = {}
+    with open(events_path) as f:
+        for line in f:
+            event = json.loads(line)
+            if event['event'] != 'reel':
+                continue
+            outcomes[event['outcome']] = outcomes.get(event['outcome'], 0) + 1
+            for record in event['stages']:
+                stage_samples.setdefault(record['stage'], []).append(record['wall_s'])
+            total = sum(record['wall_s'] for record in event['stages'])
+            stage_samples.setdefault('reel_total', []).append(total)
+
+    frames = sum(clip['duration'] * FPS for clip in clips)
+    return {
+        'reels': len(clips),
+        'outcomes': outcomes,
+        'wall_s': round(wall, 3),
+        'reels_per_s': round(len(clips) / wall, 3) if wall else None,
+        'frames_per_s': round(frames / wall, 1) if wall else None,
+        # Largest resident set among waited-for children (the batch parent or one of its workers)
+        'peak_rss_mb': peak_rss_mb(resource.RUSAGE_CHILDREN),
+        'stages': {name: percentiles(samples) for name, samples in stage_samples.items()},
+    }
+
+def environment():
+    def command_output(cmd):
+        try:
+            return subprocess.check_output(cmd, stderr=subprocess.DEVNULL, cwd=base_dir).decode().splitlines()[0].strip()
+        except Exception:
+            return None
+    return {
+        'commit': command_output(['git', 'rev-parse', '--short', 'HEAD']),
+        'ffmpeg': command_output(['ffmpeg', '-version']),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+def headline_metrics(results):
+    """Flat {metric: value} of the numbers worth comparing between runs."""
+    metrics = {'probe p50_ms': results['probe'].get('p50_ms')}
+    for name, r in results.get('detect', {}).items():
+        metrics[f"detect[{name}] p50_ms"] = r.get('p50_ms')
+        metrics[f"detect[{name}] envelope_error_px_mean"] = r.get('envelope_error_px_mean')
+    if 'overlay' in results:
+        metrics['overlay p50_ms'] = results['overlay'].get('p50_ms')
+    e2e = results.get('end_to_end')
+    if e2e:
+        metrics['e2e reels_per_s'] = e2e.get('reels_per_s')
+        metrics['e2e peak_rss_mb'] = e2e.get('peak_rss_mb')
+        for name, r in e2e['stages'].items():
+            metrics[f"e2e {name} p50_ms"] = r.get('p50_ms')
+    return metrics
+
+def print_comparison(current, baseline_path):
+    with open(baseline_path) as f:
+        baseline = headline_metrics(json.load(f)['results'])
+    print(f"\nCompared with {baseline_path}:")
+    for metric, value in headline_metrics(current).items():
+        before = baseline.get(metric)
+        if value is None or before is None:
+            continue
+        change = f"{(value - before) / before * 100:+.1f}%" if before else "n/a"
+        print(f"  {metric:<44} {before:>10} -> {value:<10} {change}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default="720x1280,1080x1920")
+    parser.add_argument('--durations', default="3,8", help="Clip lengths in seconds")
+    parser.add_argument('--headers', default="0.06,0.1", help="Header top as a share of the frame height")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per clip for the per-stage timings")
+    parser.add_argument('--workers', type=int, default=None, help="process_batch --workers for the end-to-end run")
+    parser.add_argument('--mode', choices=['design', 'upload'], default='design')
+    parser.add_argument('--skip-e2e', action='store_true', help="Only time the individual stages")
+    parser.add_argument('--clips-dir', help="Keep synthesized clips here and reuse them")
+    parser.add_argument('--json', help="Write results to this file")
+    parser.add_argument('--compare', help="Earlier --json results to diff against")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    clips_dir = args.clips_dir or os.path.join(work_dir, "clips")
+    os.makedirs(clips_dir, exist_ok=True)
+    try:
+        clips = []
+        for width, height in parse_sizes(args.sizes):
+            for duration in parse_floats(args.durations):
+                for header_y in parse_floats(args.headers):
+                    path, truth = synthesize_clip(clips_dir, width, height, duration, header_y)
+                    clips.append({'path': path, 'width': width, 'height': height, 'duration': duration, 'truth': truth})
+        print(f"{len(clips)} synthetic clips in {clips_dir}")
+
+        results = {'probe': bench_probe(clips, args.repeat)}
+        print(f"probe     {results['probe']}")
+        if OPENCV_AVAILABLE:
+            results['detect'] = bench_detect(clips, args.repeat)
+            for name, r in results['detect'].items():
+                print(f"detect[{name}] {r}")
+        else:
+            print("OpenCV not installed; skipping detection")
+        if PILLOW_AVAILABLE:
+            results['overlay'] = bench_overlay(clips, args.repeat, work_dir)
+            print(f"overlay   {results['overlay']}")
+        else:
+            print("Pillow not installed; skipping overlay render")
+        results['stage_peak_rss_mb'] = peak_rss_mb()
+
+        if not args.skip_e2e:
+            results['end_to_end'] = bench_end_to_end(clips, args.workers, args.mode, work_dir)
+            e2e = results['end_to_end']
+            print(f"end-to-end {e2e['reels']} reels in {e2e['wall_s']}s ({e2e['reels_per_s']} reels/s, "
+                  f"{e2e['frames_per_s']} frames/s, peak RSS {e2e['peak_rss_mb']} MB) {e2e['outcomes']}")
+            for name, r in e2e['stages'].items():
+                print(f"  {name:<10} {r}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = {
+        'environment': environment(),
+        'params': {k: v for k, v in vars(args).items() if k not in ('json', 'compare')},
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(output, f, indent=2)
+    if args.compare:
+        print_comparison(results, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import subprocess
+from functools import lru_cache
+
+# Named x264 settings selectable with config['encodeProfile'].
+# fast-preview reproduces the original hardcoded command (ultrafast, x264 default CRF 23).
+ENCODE_PROFILES = {
+    'fast-preview': {'preset': 'ultrafast', 'crf': 23},
+    'publish': {'preset': 'veryfast', 'crf': 21},
+    'archive': {'preset': 'slow', 'crf': 18, 'tune': 'film'},
+    # First hardware H.264 encoder that passes a test encode, falling back to 'publish'
+    'hardware': {'hardware': True, 'fallback': 'publish'},
+}
+
+DEFAULT_PROFILE = 'fast-preview'
+
+# Hardware encoders in order of preference, with roughly 'publish'-quality settings
+HW_ENCODERS = [
+    ('h264_nvenc', ['-preset', 'p4', '-rc', 'vbr', '-cq', '23', '-b:v', '0']),
+    ('h264_videotoolbox', ['-q:v', '65']),
+    ('h264_qsv', ['-preset', 'veryfast', '-global_quality', '23']),
+]
+
+# x264 only honors addroi hints with adaptive quantization on, and its ultrafast preset
+# (fast-preview) turns AQ off; ROI encodes force this mode back on
+ROI_AQ_MODE = 1
+
+@lru_cache(maxsize=1)
+def available_encoders():
+    """Names of the video encoders this ffmpeg build offers (empty if ffmpeg is missing)."""
+    try:
+        output = subprocess.check_output(['ffmpeg', '-hide_banner', '-encoders'], stderr=subprocess.DEVNULL).decode('utf-8')
+    except Exception:
+        return frozenset()
+    names = set()
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].startswith('V'):
+            names.add(parts[1])
+    return frozenset(names)
+
+@lru_cache(maxsize=None)
+def encoder_works(encoder, args=()):
+    """
+    Whether a listed encoder can actually encode here: distro ffmpeg builds list h264_nvenc
+    and h264_qsv without a GPU or driver. Checked once per process with a one-frame encode.
+    """
+    cmd = [
+        'ffmpeg', '-v', 'error',
+        '-f', 'lavfi', '-i', 'color=c=black:s=256x256:d=0.1',
+        '-frames:v', '1', '-c:v', encoder, *args, '-pix_fmt', 'yuv420p',
+        '-f', 'null', '-'
+    ]
+    try:
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=30)
+        return True
+    except subprocess.CalledProcessError as e:
+        print(f"{encoder} is listed but unusable: {e.stderr.decode('utf-8', 'replace').strip()[-200:]}")
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"{encoder} test encode failed: {e}")
+    return False
+
+def resolve_profile(name):
+    """Returns (profile_name, settings) with unknown names mapped to the default."""
+    if name not in ENCODE_PROFILES:
+        if name:
+            print(f"Unknown encode profile '{name}', using {DEFAULT_PROFILE}")
+        name = DEFAULT_PROFILE
+    settings = ENCODE_PROFILES[name]
+    if settings.get('hardware'):
+        encoders = available_encoders()
+        for encoder, args in HW_ENCODERS:
+            if encoder in encoders and encoder_works(encoder, tuple(args)):
+                return name, {'encoder': encoder, 'args': args}
+        return resolve_profile(settings['fallback'])
+    return name, settings
+
+def roi_supported(name):
+    """Whether the profile's encoder honors addroi hints (libx264 does; the hardware encoders don't)."""
+    _, settings = resolve_profile(name)
+    return 'encoder' not in settings
+
+def encoder_args(name, threads=None, roi=False):
+    """
+    ffmpeg video-encoder arguments for a profile. `threads` caps the encoder when several run
+    side by side; a profile's own 'threads' takes precedence. `roi`: the graph tags frames
+    with addroi (bannerEncode=roi), so x264 needs adaptive quantization. Callers warn once
+    when roi_supported() says the hints will be ignored.
+    """
+    _, settings = resolve_profile(name)
+    if 'encoder' in settings:
+        return ['-c:v', settings['encoder'], *settings['args'], '-pix_fmt', 'yuv420p']
+
+    args = ['-c:v', 'libx264', '-preset', settings['preset']]
+    if settings.get('crf') is not None:
+        args += ['-crf', str(settings['crf'])]
+    if settings.get('tune'):
+        args += ['-tune', settings['tune']]
+    if roi:
+        args += ['-aq-mode', str(ROI_AQ_MODE)]
+    args += ['-pix_fmt', 'yuv420p']
+    threads = settings.get('threads', threads)
+    if threads:
+        args += ['-threads', str(threads)]
+    return args
+
+# Side outputs written by the same ffmpeg run as the publish file (see process_batch.rendition_graph).
+# The preview is what the UI plays: small, low bitrate, moov atom up front so playback starts at once.
+PREVIEW_RENDITION = {'width': 540, 'preset': 'veryfast', 'crf': 28, 'maxrate': '1200k', 'bufsize': '2400k',
+                     'audio_bitrate': '96k'}
+# Poster: one full-size JPEG (ffmpeg qscale, 2 = best) taken POSTER_TIME seconds in, or mid-clip if shorter
+POSTER_QUALITY = 3
+POSTER_TIME = 1.0
+# Optional contact sheet (config['thumbnailSprite']): SPRITE_GRID tiles of SPRITE_TILE_WIDTH px across the clip
+SPRITE_GRID = (5, 5)
+SPRITE_TILE_WIDTH = 160
+
+def preview_args(threads=None):
+    """ffmpeg output arguments (video and audio) for the web preview rendition."""
+    settings = PREVIEW_RENDITION
+    args = ['-c:v', 'libx264', '-preset', settings['preset'], '-crf', str(settings['crf']),
+            '-maxrate', settings['maxrate'], '-bufsize', settings['bufsize'], '-pix_fmt', 'yuv420p']
+    if threads:
+        args += ['-threads', str(threads)]
+    return args + ['-c:a', 'aac', '-b:a', settings['audio_bitrate'], '-movflags', '+faststart']
+
+def image_args():
+    """ffmpeg output arguments for a single JPEG frame (poster or sprite)."""
+    return ['-frames:v', '1', '-c:v', 'mjpeg', '-q:v', str(POSTER_QUALITY), '-f', 'image2', '-update', '1']
@@ -0,0 +1,359 @@
+try:
+    import cv2
+    import numpy as np
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+    print("OpenCV not installed. Auto-detection disabled.")
+
+# Sample timestamps in ms (robust against transitions/animations)
+SAMPLE_TIMESTAMPS = [500, 1500, 2500]
+
+# Fast mode runs the edge pipeline on the ROI shrunk to roughly this width
+FAST_ROI_WIDTH = 360
+
+# Projection mode: a pixel is an edge when the horizontal gray step exceeds this (0-255),
+# and a row counts as UI when its edges touch at least PROJECTION_MIN_SPAN of the
+# PROJECTION_BLOCKS column blocks (the contour pipeline's 5%-of-width rule)
+PROJECTION_EDGE_THRESHOLD = 40
+PROJECTION_BLOCKS = 36
+PROJECTION_MIN_SPAN = 0.05
+# Rows grown on each side of an active row, as a share of frame height; bridges the gap
+# between text lines like the contour pipeline's blur + dilate
+PROJECTION_DILATE = 0.006
+
+def default_layout(total_height):
+    return 0, int(total_height * 0.15), 20
+
+def _odd(n):
+    n = max(1, int(round(n)))
+    return n if n % 2 == 1 else n + 1
+
+def frame_envelope(frame, show_headline=True, scale=1.0):
+    """
+    Runs the edge/contour pipeline on the top 25% of a BGR frame.
+    With scale < 1 the ROI is downscaled first and kernel sizes shrink with it;
+    the result is mapped back to full-resolution rows.
+    Returns (top, bottom) of the UI envelope, or None if nothing qualifies.
+    """
+    h, w, _ = frame.shape
+
+    # Region of Interest: Top 25% (Headers are rarely lower than this)
+    roi_h = int(h * 0.25)
+    roi = frame[0:roi_h, 0:w]
+
+    # Preprocessing
+    gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+    if scale < 1.0:
+        small_w = max(1, int(round(w * scale)))
+        small_h = max(1, int(round(roi_h * scale)))
+        gray = cv2.resize(gray, (small_w, small_h), interpolation=cv2.INTER_AREA)
+        blur_k = _odd(25 * scale)
+        dilate_k = (max(1, int(round(20 * scale))), max(1, int(round(8 * scale))))
+    else:
+        scale = 1.0
+        blur_k = 25
+        dilate_k = (20, 8)
+
+    # Blur to merge text blocks
+    blurred = cv2.GaussianBlur(gray, (blur_k, blur_k), 0)
+    edges = cv2.Canny(blurred, 30, 100)
+
+    # Dilate to connect components
+    # Moderate vertical dilation to bridge text lines without merging status bar
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, dilate_k)
+    dilated = cv2.dilate(edges, kernel, iterations=2)
+
+    contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    # Thresholds for filtering noise (resolution-aware)
+    # 5% of width is enough to catch "Evolving AI" but skip tiny dots
+    min_w = w * 0.05
+    min_h = h * 0.005
+    # Skip top 4% to avoid OS status bar (clock/battery/pill)
+    status_bar_h = h * 0.04
+
+    valid_rects = []
+    for cnt in contours:
+        x, y, w_rect, h_rect = cv2.boundingRect(cnt)
+        if scale != 1.0:
+            y = int(round(y / scale))
+            w_rect = w_rect / scale
+            h_rect = int(round(h_rect / scale))
+
+        # Filter noise
+        if w_rect < min_w: continue
+        if h_rect < min_h: continue
+        if y < status_bar_h: continue # Skips OS status bar
+
+        valid_rects.append((y, y + h_rect))
+
+    if not valid_rects:
+        return None
+
+    if not show_headline:
+        # ULTRA-SLIM: Isolate ONLY the top-most cohesive row (Profile Row)
+        # We sort by Y and only keep the first "cluster"
+        valid_rects.sort(key=lambda r: r[0])
+        first_y = valid_rects[0][0]
+        # Anything starting within 3% of the first element is part of the same "row"
+        row_threshold = h * 0.03
+        profile_rects = [r for r in valid_rects if r[0] < (first_y + row_threshold)]
+
+        return min(r[0] for r in profile_rects), max(r[1] for r in profile_rects)
+
+    # Normal: Take full UI envelope (Name + Headline)
+    return min(r[0] for r in valid_rects), max(r[1] for r in valid_rects)
+
+def banner_from_envelopes(detected_envelopes, total_height, show_headline=True, label="OpenCV (Pass 3)"):
+    """Turns per-frame (top, bottom) envelopes into (final_y, final_h, content_padding)."""
+    if not detected_envelopes:
+        print("No header structure detected in sampled frames. Using default.")
+        return default_layout(total_height)
+
+    # Aggregate: Use min top and max bottom across all frames for full coverage
+    ui_top = min(e[0] for e in detected_envelopes)
+    ui_bottom = max(e[1] for e in detected_envelopes)
+
+    # Scaling Factors (based on 1920p original targets)
+    if not show_headline:
+        # PERFECT-FIT: Balancing slimmness with breathing room
+        rel_shift_up = int(total_height * 0.02) # Balanced at 2%
+        rel_buffer = int(total_height * 0.005)  # 0.5% cushion
+        rel_safety_floor = int(total_height * 0.02) # 2% floor
+        snap_threshold = 0.02 # Only snap if touching top 2%
+    else:
+        rel_shift_up = int(total_height * 0.11)
+        rel_buffer = int(total_height * 0.01)
+        rel_safety_floor = int(total_height * 0.04)
+        snap_threshold = 0.05
+
+    # Final Calculations
+    final_y = max(0, ui_top - rel_shift_up)
+
+    # SELECTIVE SNAP TO TOP
+    if final_y < (total_height * snap_threshold):
+         final_y = 0
+
+    final_h = (ui_bottom - final_y) + rel_buffer
+
+    # Safety Floor
+    if final_h < rel_safety_floor: final_h = rel_safety_floor
+
+    # Strict Cap
+    max_allowed = int(total_height * (0.10 if not show_headline else 0.16))
+    if final_h > max_allowed:
+        final_h = max_allowed
+
+    content_y = 10 # Tight content padding
+
+    print(f"{label}: Detected UI {ui_top}-{ui_bottom}. Banner: y={final_y}, h={final_h}")
+    return final_y, final_h, content_y
+
+def seek_envelopes(video_path, show_headline=True):
+    """Per-frame envelopes from seeking to each sample timestamp at full resolution."""
+    cap = cv2.VideoCapture(video_path)
+    detected_envelopes = []
+
+    for ts in SAMPLE_TIMESTAMPS:
+        cap.set(cv2.CAP_PROP_POS_MSEC, ts)
+        ret, frame = cap.read()
+        if not ret:
+            continue
+
+        envelope = frame_envelope(frame, show_headline)
+        if envelope:
+            detected_envelopes.append(envelope)
+
+    cap.release()
+    return detected_envelopes
+
+def detect_header_height(video_path, total_height, show_headline=True):
+    """
+    Analyzes video at multiple timestamps to find the UI header area.
+    If show_headline is False, it strictly isolates the profile row (name/handle).
+    Returns (final_y, final_h, content_padding)
+    """
+    if not OPENCV_AVAILABLE:
+        print("OpenCV unavailable, using default safe area")
+        return default_layout(total_height)
+
+    try:
+        detected_envelopes = seek_envelopes(video_path, show_headline)
+        return banner_from_envelopes(detected_envelopes, total_height, show_headline)
+
+    except Exception as e:
+        print(f"CV Error: {e}")
+        return default_layout(total_height)
+
+def read_sample_frames(video_path, timestamps=SAMPLE_TIMESTAMPS):
+    """
+    Decodes the frames nearest to `timestamps` in one forward pass: no seeks,
+    and frames in between are only grabbed, never converted to BGR.
+    """
+    cap = cv2.VideoCapture(video_path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0
+        if fps <= 0 or fps > 240:
+            fps = 30.0
+        targets = sorted({int(round(ts / 1000.0 * fps)) for ts in timestamps})
+
+        frames = []
+        index = 0
+        for target in targets:
+            while index < target:
+                if not cap.grab():
+                    return frames
+                index += 1
+            ret, frame = cap.read()
+            index += 1
+            if not ret:
+                break
+            frames.append(frame)
+        return frames
+    finally:
+        cap.release()
+
+def fast_envelopes(video_path, show_headline=True, timestamps=SAMPLE_TIMESTAMPS):
+    """Per-frame envelopes from one sequential decode, computed on a downscaled ROI."""
+    detected_envelopes = []
+    for frame in read_sample_frames(video_path, timestamps):
+        scale = min(1.0, FAST_ROI_WIDTH / float(frame.shape[1]))
+        envelope = frame_envelope(frame, show_headline, scale=scale)
+        if envelope:
+            detected_envelopes.append(envelope)
+    return detected_envelopes
+
+def detect_header_height_fast(video_path, total_height, show_headline=True):
+    """
+    Same contract as detect_header_height, but samples frames in a single sequential
+    decode and runs the edge pipeline on a downscaled ROI.
+    """
+    if not OPENCV_AVAILABLE:
+        print("OpenCV unavailable, using default safe area")
+        return default_layout(total_height)
+
+    try:
+        detected_envelopes = fast_envelopes(video_path, show_headline)
+        return banner_from_envelopes(detected_envelopes, total_height, show_headline, label="OpenCV (fast)")
+
+    except Exception as e:
+        print(f"CV Error: {e}")
+        return default_layout(total_height)
+
+def row_profiles(frames):
+    """
+    Row edge coverage of the top 25% of each frame, stacked as one (frames, rows) array on
+    a ROI downscaled to FAST_ROI_WIDTH. Returns (coverage, scale).
+    """
+    h, w = frames[0].shape[:2]
+    roi_h = int(h * 0.25)
+    scale = min(1.0, FAST_ROI_WIDTH / float(w))
+    size = (max(2, int(round(w * scale))), max(1, int(round(roi_h * scale))))
+    gray = np.stack([
+        cv2.resize(cv2.cvtColor(frame[0:roi_h], cv2.COLOR_BGR2GRAY), size, interpolation=cv2.INTER_AREA)
+        for frame in frames
+    ]).astype(np.int16)
+
+    edges = np.abs(np.diff(gray, axis=2)) > PROJECTION_EDGE_THRESHOLD
+    blocks = min(PROJECTION_BLOCKS, edges.shape[2])
+    cols = edges.shape[2] // blocks * blocks
+    touched = edges[:, :, :cols].reshape(edges.shape[0], edges.shape[1], blocks, -1).any(axis=3)
+    return touched.mean(axis=2), scale
+
+def projection_envelope(coverage, scale, total_height, show_headline=True):
+    """
+    (top, bottom) of the UI band in full-resolution rows from stacked row coverage, or None.
+    Rows active in any frame are unioned, grown by PROJECTION_DILATE and split into runs;
+    the same status-bar, minimum-height and profile-row rules as frame_envelope apply.
+    """
+    active = (coverage >= PROJECTION_MIN_SPAN).any(axis=0)
+    radius = max(1, int(round(PROJECTION_DILATE * total_height * scale)))
+    active = np.convolve(active.astype(np.int32), np.ones(2 * radius + 1, dtype=np.int32), mode='same') > 0
+
+    # Skip top 4% to avoid OS status bar (clock/battery/pill)
+    active[:int(total_height * 0.04 * scale)] = False
+
+    edges = np.diff(np.concatenate(([0], active.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    keep = (ends - starts) >= total_height * 0.005 * scale
+    starts, ends = starts[keep], ends[keep]
+    if not len(starts):
+        return None
+
+    if not show_headline:
+        # Profile row only: runs starting within 3% of the first one
+        in_row = starts < starts[0] + total_height * 0.03 * scale
+        starts, ends = starts[in_row], ends[in_row]
+
+    return int(round(starts[0] / scale)), int(round(ends[-1] / scale))
+
+def projection_envelopes(video_path, show_headline=True, timestamps=SAMPLE_TIMESTAMPS):
+    """Envelope list (empty or one union envelope) from row projections of the sample frames."""
+    frames = read_sample_frames(video_path, timestamps)
+    if not frames:
+        return []
+    coverage, scale = row_profiles(frames)
+    envelope = projection_envelope(coverage, scale, frames[0].shape[0], show_headline)
+    return [envelope] if envelope else []
+
+def detect_header_height_projection(video_path, total_height, show_headline=True):
+    """
+    Same contract as detect_header_height, computed from row-wise edge projections with
+    array ops instead of per-contour filtering. Resolution independent: every threshold
+    is a share of the frame size.
+    """
+    if not OPENCV_AVAILABLE:
+        print("OpenCV unavailable, using default safe area")
+        return default_layout(total_height)
+
+    try:
+        detected_envelopes = projection_envelopes(video_path, show_headline)
+        return banner_from_envelopes(detected_envelopes, total_height, show_headline, label="OpenCV (projection)")
+
+    except Exception as e:
+        print(f"CV Error: {e}")
+        return default_layout(total_height)
+
+def quick_envelope(video_path, show_headline=True):
+    """
+    Envelope of a single mid-sample frame on the downscaled pipeline.
+    Cheap enough to confirm a cached layout; returns None if nothing is found.
+    """
+    cap = cv2.VideoCapture(video_path)
+    try:
+        cap.set(cv2.CAP_PROP_POS_MSEC, SAMPLE_TIMESTAMPS[len(SAMPLE_TIMESTAMPS) // 2])
+        ret, frame = cap.read()
+    finally:
+        cap.release()
+    if not ret:
+        return None
+    scale = min(1.0, FAST_ROI_WIDTH / float(frame.shape[1]))
+    return frame_envelope(frame, show_headline, scale=scale)
+
+def merge_envelopes(detected_envelopes):
+    """Union of per-frame envelopes, or None."""
+    if not detected_envelopes:
+        return None
+    return min(e[0] for e in detected_envelopes), max(e[1] for e in detected_envelopes)
+
+# Selectable via config['detectionMode']
+DETECTORS = {
+    'accurate': detect_header_height,
+    'fast': detect_header_height_fast,
+    'projection': detect_header_height_projection,
+}
+
+ENVELOPE_SAMPLERS = {
+    'accurate': seek_envelopes,
+    'fast': fast_envelopes,
+    'projection': projection_envelopes,
+}
+
+def detect_header(video_path, total_height, show_headline=True, method='accurate'):
+    detector = DETECTORS.get(method)
+    if detector is None:
+        print(f"Unknown detection mode '{method}', using accurate")
+        detector = detect_header_height
+    return detector(video_path, total_height, show_headline=show_headline)
@@ -0,0 +1,133 @@
+"""
+Store-only zip of a job's processed reels, built while the batch runs.
+
+process_batch opens a JobArchive at the start of a run and adds each reel as soon as its
+output is final, so the download exists the moment the last reel completes. Videos are
+stored, not deflated: H.264 doesn't compress further, and each file is read once while it's
+still in the page cache. A manifest.json describing the reels is written last.
+
+Standalone (rebuilds the archive from the outputs on disk):
+
+    python3 scripts/job_archive.py <job_id>
+
+Run from the project root. Prints the archive's public URL.
+"""
+import os
+import sys
+import json
+import zipfile
+from datetime import datetime
+
+from job_store import JobStore
+
+MANIFEST_NAME = "manifest.json"
+
+def archive_name(job_id):
+    # Same name createJobZip has always served
+    return f"batch_output_{job_id[:8]}.zip"
+
+class JobArchive:
+    """
+    Zip being filled as reels finish. Written to <name>.part and renamed on close(), so a
+    crashed or canceled run never leaves a truncated archive behind the real name.
+    Only the batch's parent process writes to it.
+    """
+
+    def __init__(self, job_dir, job_id):
+        self.job_id = job_id
+        self.path = os.path.join(job_dir, archive_name(job_id))
+        self.partial_path = f"{self.path}.part"
+        self.entries = []
+        self._names = set()
+        self._zip = zipfile.ZipFile(self.partial_path, 'w', compression=zipfile.ZIP_STORED, allowZip64=True)
+
+    def add(self, reel, file_path):
+        """Appends a reel's output; a reel already in the archive is skipped."""
+        arcname = os.path.basename(file_path)
+        if arcname in self._names or not os.path.exists(file_path):
+            return False
+        self._zip.write(file_path, arcname)
+        self._names.add(arcname)
+        self.entries.append({
+            'id': reel.get('id'),
+            'file': arcname,
+            'bytes': os.path.getsize(file_path),
+            'username': reel.get('username'),
+            'caption': reel.get('caption'),
+            'headline': reel.get('generated_headline'),
+        })
+        return True
+
+    def close(self, config=None):
+        """Writes the manifest and publishes the archive. Returns a summary for the job record."""
+        manifest = {
+            'job_id': self.job_id,
+            'created_at': datetime.now().isoformat(),
+            'reels': self.entries,
+            'encode_profile': (config or {}).get('encodeProfile'),
+        }
+        self._zip.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2))
+        self._zip.close()
+        os.replace(self.partial_path, self.path)
+        return {
+            'file': os.path.basename(self.path),
+            'reels': len(self.entries),
+            'bytes': os.path.getsize(self.path),
+            'createdAt': manifest['created_at'],
+        }
+
+    def abort(self):
+        self._zip.close()
+        if os.path.exists(self.partial_path):
+            os.remove(self.partial_path)
+
+def discard(job, job_dir):
+    """Drops the job's published archive (file and record); a new run replaces its outputs."""
+    summary = job.pop('archive', None)
+    if summary and summary.get('file'):
+        path = os.path.join(job_dir, os.path.basename(summary['file']))
+        if os.path.exists(path):
+            os.remove(path)
+
+def build_from_outputs(job, job_dir):
+    """Archive of every approved reel whose processed output exists, in job order."""
+    archive = JobArchive(job_dir, job['id'])
+    try:
+        for reel in job.get('reels', []):
+            if reel.get('status') == 'approved' and reel.get('processed_path'):
+                archive.add(reel, os.path.join(job_dir, reel['processed_path']))
+    except Exception:
+        archive.abort()
+        raise
+    if not archive.entries:
+        archive.abort()
+        return None
+    return archive.close(job.get('config'))
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python3 scripts/job_archive.py <job_id>")
+        sys.exit(2)
+    job_id = sys.argv[1]
+    base_dir = os.getcwd()
+    store = JobStore(base_dir)
+    job = store.load_job(job_id)
+    if not job:
+        print(f"Job {job_id} not found", file=sys.stderr)
+        sys.exit(1)
+    job.setdefault('id', job_id)
+    if job.get('status') == 'processing':
+        # The running batch owns the archive and publishes it when it finishes
+        print("Job is still processing", file=sys.stderr)
+        sys.exit(1)
+
+    summary = build_from_outputs(job, os.path.join(base_dir, "public", "downloads", job_id))
+    if not summary:
+        print("No processed videos found", file=sys.stderr)
+        sys.exit(1)
+    job['archive'] = summary
+    store.save_job(job)
+    print(f"/downloads/{job_id}/{summary['file']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import os
+import json
+
+class JobStore:
+    """
+    One JSON file per job under data/jobs/. Writes cost the size of the job at hand, not the
+    whole history, and concurrent jobs never rewrite each other's files. Listings come from
+    load_index(); data/jobs/index.json is only its cache, so savers never touch a shared file.
+
+    Jobs still living in the legacy data/jobs.json are readable; saving one moves it into
+    its own file and drops it from jobs.json (see migrate_jobs.py to move everything at once).
+    Readers always prefer the job file over a legacy entry. app/actions.ts follows the same rules.
+    """
+
+    INDEX_FIELDS = ('id', 'url', 'createdAt', 'status', 'isMock')
+
+    def __init__(self, base_dir):
+        self.data_dir = os.path.join(base_dir, "data")
+        self.jobs_dir = os.path.join(self.data_dir, "jobs")
+        self.index_path = os.path.join(self.jobs_dir, "index.json")
+        self.legacy_path = os.path.join(self.data_dir, "jobs.json")
+        # (stamp, ids) of the legacy file, so saves don't re-read it while it's unchanged
+        self._legacy_ids = (None, frozenset())
+
+    def job_path(self, job_id):
+        # Job ids are UUIDs; refuse anything that could escape the jobs dir
+        if not job_id or os.path.basename(job_id) != job_id or job_id.startswith('.'):
+            raise ValueError(f"Invalid job id: {job_id!r}")
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _read_json(self, path, default):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return default
+
+    @staticmethod
+    def stamp(st):
+        # A string: JSON numbers lose mtime_ns precision in JavaScript
+        return f"{st.st_mtime_ns}:{st.st_size}"
+
+    def job_files(self):
+        """(job_id, path, stamp) of every per-job file; the stamp changes whenever the file does."""
+        if not os.path.isdir(self.jobs_dir):
+            return []
+        files = []
+        for entry in os.scandir(self.jobs_dir):
+            if entry.name.endswith('.json') and entry.path != self.index_path:
+                st = entry.stat()
+                files.append((entry.name[:-len('.json')], entry.path, self.stamp(st)))
+        return files
+
+    def _write_json(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Atomic Write
+        temp_file = f"{path}.tmp.{os.getpid()}"
+        with open(temp_file, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(temp_file, path)
+
+    def load_job(self, job_id):
+        job = self._read_json(self.job_path(job_id), None)
+        if job is None:
+            job = self._read_json(self.legacy_path, {}).get(job_id)
+        return job
+
+    def save_job(self, job):
+        """Writes the job's own file (listings pick the change up from its mtime)."""
+        self._write_json(self.job_path(job['id']), job)
+        self._retire_legacy(job['id'])
+
+    def _retire_legacy(self, job_id):
+        """Drops a job that now has its own file from the legacy jobs.json."""
+        try:
+            stamp = self.stamp(os.stat(self.legacy_path))
+        except OSError:
+            return
+        if self._legacy_ids[0] != stamp:
+            try:
+                self._legacy_ids = (stamp, frozenset(self._read_json(self.legacy_path, {})))
+            except ValueError:
+                return
+        if job_id not in self._legacy_ids[1]:
+            return
+        legacy = self._read_json(self.legacy_path, {})
+        legacy.pop(job_id, None)
+        self._write_json(self.legacy_path, legacy)
+        # A save racing this one may re-add an entry; readers ignore it and the next save retires it
+        self._legacy_ids = (None, frozenset())
+
+    def load_index(self):
+        """
+        Summary per job for listings, legacy jobs included. Cached summaries are reused while
+        their job file is unchanged (mtime and size); the cache is rewritten when anything changed.
+        Losing a race on the cache only costs a re-summarize on the next read.
+        """
+        try:
+            cached = self._read_json(self.index_path, {})
+        except ValueError:
+            cached = {}
+        index = {}
+        changed = False
+        for job_id, path, stamp in self.job_files():
+            entry = cached.get(job_id)
+            if not entry or entry.get('_stamp') != stamp:
+                try:
+                    job = self._read_json(path, None)
+                except ValueError:
+                    continue
+                if not job:
+                    continue
+                job.setdefault('id', job_id)
+                entry = dict(self.summarize(job), _stamp=stamp)
+                changed = True
+            index[job_id] = entry
+        if changed or len(index) != len(cached):
+            self._write_json(self.index_path, index)
+
+        summaries = {job_id: {k: v for k, v in entry.items() if k != '_stamp'} for job_id, entry in index.items()}
+        # Not migrated yet
+        for job_id, job in self._read_json(self.legacy_path, {}).items():
+            if job_id not in summaries:
+                summaries[job_id] = self.summarize(dict(job, id=job.get('id', job_id)))
+        return summaries
+
+    @classmethod
+    def summarize(cls, job):
+        summary = {k: job.get(k) for k in cls.INDEX_FIELDS if job.get(k) is not None}
+        reels = job.get('reels') or []
+        summary['reelCount'] = len(reels)
+        if reels:
+            summary['username'] = reels[0].get('username')
+        return summary
+
+    def rebuild_index(self):
+        """The index is derived data; drop the cache and regenerate it from the job files."""
+        if os.path.exists(self.index_path):
+            os.remove(self.index_path)
+        return self.load_index()
+
+    def migrate_legacy(self, overwrite=False):
+        """
+        Splits data/jobs.json into per-job files and rebuilds the index.
+        Jobs that already have their own file are kept unless overwrite=True.
+        The legacy file is renamed to jobs.json.migrated. Returns (migrated, skipped).
+        """
+        legacy = self._read_json(self.legacy_path, None)
+        if legacy is None:
+            return 0, 0
+        migrated = skipped = 0
+        for job_id, job in legacy.items():
+            job.setdefault('id', job_id)
+            if os.path.exists(self.job_path(job_id)) and not overwrite:
+                skipped += 1
+                continue
+            self._write_json(self.job_path(job_id), job)
+            migrated += 1
+        self.rebuild_index()
+        os.replace(self.legacy_path, f"{self.legacy_path}.migrated")
+        return migrated, skipped
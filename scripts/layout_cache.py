@@ -0,0 +1,99 @@
+import os
+import json
+from datetime import datetime
+
+from header_detect import (
+    OPENCV_AVAILABLE, ENVELOPE_SAMPLERS, banner_from_envelopes,
+    detect_header, merge_envelopes, quick_envelope,
+)
+
+# A single-frame check agrees with the cached envelope if both edges are within this share of the frame height
+AGREEMENT_TOLERANCE = 0.02
+
+class LayoutCache:
+    """
+    Persistent per-creator header envelopes, keyed by (username, width, height, show_headline).
+    Reels from one account nearly always share the UI header position, so a cached envelope
+    confirmed by one quick frame replaces the full multi-frame detection.
+
+    Pool workers only read it; the batch parent records observations and saves.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+        return self
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Atomic Write
+        temp_file = f"{self.path}.tmp.{os.getpid()}"
+        with open(temp_file, 'w') as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(temp_file, self.path)
+
+    @staticmethod
+    def key(username, width, height, show_headline):
+        if not username:
+            return None
+        return f"{username.lower()}|{int(width)}x{int(height)}|{'headline' if show_headline else 'slim'}"
+
+    def lookup(self, key):
+        return self.entries.get(key) if key else None
+
+    def record(self, key, envelope, agreed):
+        """Agreement bumps confidence; a fresh detection replaces the entry."""
+        entry = self.entries.get(key)
+        now = datetime.now().isoformat()
+        if agreed and entry:
+            entry['confidence'] = entry.get('confidence', 1) + 1
+            entry['last_confirmed'] = now
+        else:
+            self.entries[key] = {
+                'envelope': [int(envelope[0]), int(envelope[1])],
+                'confidence': 1,
+                'replaced': (entry or {}).get('replaced', -1) + 1,
+                'detected_at': now,
+                'last_confirmed': now,
+            }
+
+def envelopes_agree(quick, cached, height):
+    tolerance = height * AGREEMENT_TOLERANCE
+    return abs(quick[0] - cached[0]) <= tolerance and abs(quick[1] - cached[1]) <= tolerance
+
+def detect_with_cache(cache_path, username, video_path, width, height, show_headline=True, method='accurate'):
+    """
+    Returns ((final_y, final_h, content_padding), observation).
+    observation is (key, envelope, agreed) for the parent to record, or None.
+    """
+    cache = LayoutCache(cache_path).load()
+    key = cache.key(username, width, height, show_headline)
+    if not OPENCV_AVAILABLE or key is None:
+        return detect_header(video_path, height, show_headline=show_headline, method=method), None
+
+    try:
+        entry = cache.lookup(key)
+        if entry:
+            cached = entry['envelope']
+            quick = quick_envelope(video_path, show_headline)
+            if quick and envelopes_agree(quick, cached, height):
+                layout = banner_from_envelopes([cached], height, show_headline,
+                                               label=f"Layout cache (confidence {entry.get('confidence', 1)})")
+                return layout, (key, cached, True)
+            print(f"Layout cache: {username} disagrees with quick check ({quick} vs {tuple(cached)}), re-detecting")
+
+        envelopes = ENVELOPE_SAMPLERS.get(method, ENVELOPE_SAMPLERS['accurate'])(video_path, show_headline)
+        layout = banner_from_envelopes(envelopes, height, show_headline)
+        merged = merge_envelopes(envelopes)
+        return layout, ((key, merged, False) if merged else None)
+
+    except Exception as e:
+        print(f"CV Error: {e}")
+        return detect_header(video_path, height, show_headline=show_headline, method=method), None
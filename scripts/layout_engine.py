@@ -0,0 +1,188 @@
+"""
+Design-mode banner geometry, computed without drawing anything.
+
+layout_banner places every element of the banner (background block, logo, name, badge,
+handle, wrapped headline) using the real fonts, and returns their positions plus the
+banner's bounding box in the frame. process_batch uses it twice: design_layout asks it how
+tall the content is (auto-height), and the renderer draws exactly what it placed, on a
+canvas the size of that box.
+
+Text is measured with font.getbbox and memoized per (font file, size, text), so checking
+the geometry of a whole batch costs a handful of FreeType calls.
+"""
+import os
+import threading
+
+# Sizes in the design editor are CSS px on a preview this wide
+EDITOR_WIDTH = 380.0
+# Compensates PIL font sizes vs CSS
+FONT_SCALE = 1.35
+HEADLINE_LINE_HEIGHT = 1.3
+# Share of the frame used when auto-detect is off and the config has no headerHeight
+DEFAULT_HEADER_PERCENT = 15
+
+# PIL/FreeType font objects aren't safe to use from several threads at once; measuring and
+# drawing (preview.py renders from a thread pool) both hold this
+FONT_LOCK = threading.RLock()
+
+_MAX_MEMO = 4096
+_text_boxes = {}
+
+def text_box(font, text):
+    """font.getbbox(text) relative to the draw origin, memoized by (font file, size, text)."""
+    key = (getattr(font, 'path', None) or id(font), getattr(font, 'size', None), text)
+    box = _text_boxes.get(key)
+    if box is None:
+        with FONT_LOCK:
+            box = tuple(int(v) for v in font.getbbox(text))
+        if len(_text_boxes) >= _MAX_MEMO:
+            _text_boxes.clear()
+        _text_boxes[key] = box
+    return box
+
+def text_width(font, text):
+    left, _, right, _ = text_box(font, text)
+    return right - left
+
+def design_sizes(config, width):
+    """Pixel sizes and spacing for a frame `width` px wide."""
+    scale = width / EDITOR_WIDTH
+    return {
+        'scale': scale,
+        'logo': int(width * (config.get('logoSize', 15) / 100.0)),
+        'name_fs': int(config.get('nameFontSize', 18) * scale * FONT_SCALE),
+        'badge': int(config.get('badgeSize', 12) * scale),
+        'handle_fs': int(config.get('handleFontSize', 14) * scale * FONT_SCALE),
+        'headline_fs': int(config.get('headlineFontSize', 24) * scale * FONT_SCALE),
+        'padding_left': int(22 * scale),  # pl-[22px]
+        'padding_vertical': int(12 * scale),  # py-3 (0.75rem = 12px)
+        'gap': int(8 * scale),  # gap-2 (0.5rem = 8px)
+        # Logo sits slightly above the padding line for better visual balance
+        'logo_nudge': int(3.5 * scale),
+        'headline_x': int(24 * scale),  # px-6
+    }
+
+def handle_fonts(assets, base_dir, size):
+    """(handle_font, at_font): Montserrat Light (or Regular) if present, else the registry default."""
+    handle_font_path = os.path.join(base_dir, "public", "fonts", "Montserrat-Light.ttf")
+    if not os.path.exists(handle_font_path):
+        handle_font_path = os.path.join(base_dir, "public", "fonts", "Montserrat-Regular.ttf")
+    font_reg = assets.font_at_path(handle_font_path, size)
+    font_at = assets.font_at_path(handle_font_path, size + 2)
+    if font_reg is None or font_at is None:
+        font_reg = assets.font(size, bold=False)
+        font_at = assets.font(size + 2, bold=False)
+    return font_reg, font_at
+
+def wrap_lines(font, text, max_width):
+    """Greedy word wrap by measured width; a word wider than the line gets a line to itself."""
+    lines = []
+    current = ""
+    for word in text.split():
+        candidate = f"{current} {word}" if current else word
+        if current and text_width(font, candidate) > max_width:
+            lines.append(current)
+            current = word
+        else:
+            current = candidate
+    if current:
+        lines.append(current)
+    return lines
+
+def layout_banner(config, width, height, headline_text, assets, base_dir, placement=None, badge=True):
+    """
+    Element positions for one banner, in frame coordinates.
+
+    placement: (start_y, block_height, content_padding) from auto-height, or None for the
+    headerHeight fallback. badge: whether the verified badge will be drawn.
+    Returns a dict with 'block', 'logo', 'name', 'badge', 'handle', 'headline' (each a
+    position tuple, None when absent), 'fonts', 'required_height' (banner height the content
+    needs) and 'box' (x0, y0, x1, y1), the drawn area clipped to the frame.
+    """
+    sizes = design_sizes(config, width)
+    if placement:
+        start_y, block_height = int(placement[0]), int(placement[1])
+    else:
+        header_percent = config.get('headerHeight', DEFAULT_HEADER_PERCENT)
+        if header_percent == 'auto': header_percent = DEFAULT_HEADER_PERCENT # Safety
+        start_y = 0
+        block_height = int(height * (header_percent / 100.0))
+
+    fonts = {'name': assets.font(sizes['name_fs'], bold=True)}
+    # Draw-order boxes (x0, y0, x1, y1); PIL's rectangle includes its end row and column
+    boxes = [(0, start_y, width + 1, start_y + block_height + 1)]
+
+    logo_size = sizes['logo']
+    logo_x = sizes['padding_left']
+    logo_y = start_y + sizes['padding_vertical'] - sizes['logo_nudge']
+    boxes.append((logo_x, logo_y, logo_x + logo_size, logo_y + logo_size))
+
+    # Name column starts after the logo whether or not a logo file exists
+    name_text = config.get('designName', 'User')
+    name_x = logo_x + logo_size + sizes['gap']
+    name_y = logo_y
+    left, top, right, bottom = text_box(fonts['name'], name_text)
+    boxes.append((name_x + left, name_y + top, name_x + right, name_y + bottom))
+
+    badge_pos = None
+    if badge:
+        badge_size = sizes['badge']
+        badge_x = name_x + (right - left) + int(8 * sizes['scale'])
+        badge_y = name_y + (sizes['name_fs'] // 2) - (badge_size // 2)
+        badge_pos = (badge_x, badge_y, badge_size)
+        boxes.append((badge_x, badge_y, badge_x + badge_size, badge_y + badge_size))
+
+    handle = None
+    handle_text = config.get('designHandle', '')
+    if handle_text:
+        if handle_text.startswith('@'): handle_text = handle_text[1:]
+        fonts['handle'], fonts['at'] = handle_fonts(assets, base_dir, sizes['handle_fs'])
+        handle_y = name_y + sizes['name_fs']
+        at_box = text_box(fonts['at'], "@")
+        text_x = name_x + (at_box[2] - at_box[0])
+        handle = (name_x, text_x, handle_y, handle_text)
+        handle_box = text_box(fonts['handle'], handle_text)
+        boxes.append((name_x + at_box[0], handle_y + at_box[1], name_x + at_box[2], handle_y + at_box[3]))
+        boxes.append((text_x + handle_box[0], handle_y + handle_box[1], text_x + handle_box[2], handle_y + handle_box[3]))
+
+    headline = None
+    content_bottom = max(box[3] for box in boxes[1:])
+    if headline_text:
+        fonts['headline'] = assets.font(sizes['headline_fs'], bold=False)
+        text_x = sizes['headline_x']
+        # Below the logo row: its bottom padding plus pt-2
+        text_y = logo_y + logo_size + sizes['padding_vertical'] + sizes['gap']
+        line_height = int(sizes['headline_fs'] * HEADLINE_LINE_HEIGHT)
+        lines = []
+        for line in wrap_lines(fonts['headline'], headline_text, width - (text_x * 2)):
+            left, top, right, bottom = text_box(fonts['headline'], line)
+            boxes.append((text_x + left, text_y + top, text_x + right, text_y + bottom))
+            content_bottom = max(content_bottom, text_y + bottom)
+            lines.append((text_x, text_y, line))
+            text_y += line_height
+        headline = lines
+
+    x0 = max(0, min(box[0] for box in boxes))
+    y0 = max(0, min(box[1] for box in boxes))
+    x1 = min(width, max(box[2] for box in boxes))
+    y1 = min(height, max(box[3] for box in boxes))
+    if x1 <= x0 or y1 <= y0:
+        # Nothing on screen: still hand ffmpeg a valid 2x2 frame
+        x0, y0, x1, y1 = 0, 0, 2, 2
+
+    return {
+        'block': (start_y, block_height),
+        'logo': (logo_x, logo_y, logo_size),
+        'name': (name_x, name_y, name_text),
+        'badge': badge_pos,
+        'handle': handle,
+        'headline': headline,
+        'fonts': fonts,
+        'required_height': content_bottom + sizes['padding_vertical'] - start_y,
+        'box': (x0, y0, x1, y1),
+    }
+
+def required_height(config, width, height, headline_text, assets, base_dir, badge=True):
+    """Banner height the design content needs (top padding to bottom padding)."""
+    layout = layout_banner(config, width, height, headline_text, assets, base_dir, placement=(0, 0, 0), badge=badge)
+    return layout['required_height']
@@ -0,0 +1,154 @@
+"""
+Bounded, rate-limited concurrent downloads over one pooled requests session.
+
+Used by scrape_profile.py for reel videos and thumbnails. Standalone use (e.g. against a
+local `python3 -m http.server` stand-in):
+
+    python3 media_download.py <urls_file> <output_dir> [--workers N] [--rate R] [--retries N]
+
+where each line of urls_file is "<url> <filename>".
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_WORKERS = 4
+# Requests per second across all workers; Instagram's CDN starts throttling well above this
+DEFAULT_RATE = 4.0
+DEFAULT_RETRIES = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class RateLimiter:
+    """Thread-safe token bucket: at most `rate` acquisitions per second, bursts up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def pooled_session(session=None, workers=DEFAULT_WORKERS):
+    """
+    Mounts a connection pool sized for `workers` on an existing session (keeping its
+    cookies and headers, e.g. Instaloader's logged-in session) or a fresh one.
+    """
+    session = session or requests.Session()
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def download_file(session, url, dest, limiter=None, retries=DEFAULT_RETRIES, backoff=1.0, timeout=30):
+    """
+    Streams `url` to `dest` via a .part file. Retries connection errors and 429/5xx with
+    exponential backoff (honouring Retry-After). Returns None on success or the last error.
+    """
+    error = None
+    for attempt in range(retries + 1):
+        if attempt:
+            delay = backoff * (2 ** (attempt - 1)) * (1 + random.random() * 0.25)
+            retry_after = getattr(error, 'retry_after', None)
+            time.sleep(max(delay, retry_after or 0))
+        if limiter:
+            limiter.acquire()
+        partial = f"{dest}.part"
+        try:
+            with session.get(url, stream=True, timeout=timeout) as response:
+                if response.status_code in RETRY_STATUSES:
+                    error = requests.HTTPError(f"HTTP {response.status_code} for {url}")
+                    try:
+                        error.retry_after = float(response.headers.get('Retry-After', 0))
+                    except ValueError:
+                        error.retry_after = None
+                    continue
+                response.raise_for_status()
+                with open(partial, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=1 << 16):
+                        f.write(chunk)
+            os.replace(partial, dest)
+            return None
+        except requests.HTTPError as e:
+            # Non-retryable status (403/404...)
+            error = e
+            break
+        except (requests.RequestException, OSError) as e:
+            error = e
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+    return error
+
+def download_all(session, tasks, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE, retries=DEFAULT_RETRIES, on_done=None,
+                 limiter=None):
+    """
+    Downloads (url, dest) pairs concurrently. Returns {dest: error_or_None}.
+    on_done(url, dest, error) is called from worker threads as each file finishes.
+    Pass a shared `limiter` to hold several concurrent calls to one request budget.
+    """
+    limiter = limiter or RateLimiter(rate)
+    results = {}
+
+    def fetch(task):
+        url, dest = task
+        error = download_file(session, url, dest, limiter=limiter, retries=retries)
+        if on_done:
+            on_done(url, dest, error)
+        return dest, error
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for dest, error in pool.map(fetch, tasks):
+            results[dest] = error
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('urls_file')
+    parser.add_argument('output_dir')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE)
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES)
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    tasks = []
+    with open(args.urls_file) as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            name = parts[1] if len(parts) > 1 else os.path.basename(parts[0].split('?')[0])
+            tasks.append((parts[0], os.path.join(args.output_dir, name)))
+
+    start = time.perf_counter()
+    results = download_all(pooled_session(workers=args.workers), tasks, args.workers, args.rate, args.retries)
+    elapsed = time.perf_counter() - start
+    failed = {dest: err for dest, err in results.items() if err}
+    for dest, err in failed.items():
+        sys.stderr.write(f"Failed {dest}: {err}\n")
+    print(f"Downloaded {len(results) - len(failed)}/{len(results)} files in {elapsed:.2f}s")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
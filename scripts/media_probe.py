@@ -0,0 +1,116 @@
+import os
+import json
+import subprocess
+
+def _parse_rate(rate):
+    try:
+        num, _, den = str(rate).partition('/')
+        value = float(num) / float(den or 1)
+        return round(value, 3) if value > 0 else None
+    except (ValueError, ZeroDivisionError):
+        return None
+
+def _rotation(stream):
+    """Clockwise display rotation in degrees (0, 90, 180, 270) from tags or the display matrix."""
+    rotate = (stream.get('tags') or {}).get('rotate')
+    if rotate is None:
+        for side_data in stream.get('side_data_list') or []:
+            if 'rotation' in side_data:
+                # Display matrix rotation is counter-clockwise
+                rotate = -float(side_data['rotation'])
+                break
+    try:
+        return int(round(float(rotate or 0))) % 360
+    except ValueError:
+        return 0
+
+def ffprobe_media(input_path):
+    cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-show_streams',
+        '-show_format',
+        '-of', 'json',
+        input_path
+    ]
+    data = json.loads(subprocess.check_output(cmd).decode('utf-8'))
+    streams = data.get('streams', [])
+    video = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    if not video:
+        raise ValueError("no video stream")
+
+    duration = video.get('duration') or (data.get('format') or {}).get('duration')
+    return {
+        'coded_width': int(video['width']),
+        'coded_height': int(video['height']),
+        'rotation': _rotation(video),
+        'fps': _parse_rate(video.get('avg_frame_rate')) or _parse_rate(video.get('r_frame_rate')),
+        'duration': round(float(duration), 3) if duration else None,
+        'codec': video.get('codec_name'),
+        'has_audio': any(s.get('codec_type') == 'audio' for s in streams),
+    }
+
+def opencv_probe_media(input_path):
+    """Fallback when ffprobe is unavailable. OpenCV can't see audio or rotation tags."""
+    import cv2
+    cap = cv2.VideoCapture(input_path)
+    try:
+        if not cap.isOpened():
+            raise ValueError("cannot open")
+        # Ask for the stored (un-rotated) size so the result matches ffprobe's fields
+        cap.set(cv2.CAP_PROP_ORIENTATION_AUTO, 0)
+        fps = cap.get(cv2.CAP_PROP_FPS) or None
+        frames = cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+        return {
+            'coded_width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'coded_height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            'rotation': int(cap.get(cv2.CAP_PROP_ORIENTATION_META) or 0) % 360,
+            'fps': round(fps, 3) if fps else None,
+            'duration': round(frames / fps, 3) if fps and frames else None,
+            'codec': "".join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)).strip() or None,
+            'has_audio': None,
+        }
+    finally:
+        cap.release()
+
+def probe_media(input_path):
+    """
+    One probe per file: dimensions, duration, fps, codec, audio presence and rotation.
+    width/height are the *display* size (after rotation), which is what ffmpeg and OpenCV
+    decode to by default and what the overlay must be rendered for.
+    Returns None if the file can't be probed.
+    """
+    try:
+        info = ffprobe_media(input_path)
+    except Exception as e:
+        try:
+            info = opencv_probe_media(input_path)
+        except Exception:
+            print(f"Error probing {input_path}: {e}")
+            return None
+
+    if info['rotation'] in (90, 270):
+        info['width'], info['height'] = info['coded_height'], info['coded_width']
+    else:
+        info['width'], info['height'] = info['coded_width'], info['coded_height']
+
+    st = os.stat(input_path)
+    info['source'] = os.path.basename(input_path)
+    info['size'] = st.st_size
+    info['mtime'] = st.st_mtime
+    return info
+
+def cached_probe(input_path, cached):
+    """Reuses a probe stored on the reel record if the file is unchanged, else probes again."""
+    if cached:
+        try:
+            st = os.stat(input_path)
+            if (cached.get('source') == os.path.basename(input_path)
+                    and cached.get('size') == st.st_size
+                    and cached.get('mtime') == st.st_mtime
+                    and 'width' in cached):
+                return cached
+        except OSError:
+            return None
+    return probe_media(input_path)
@@ -0,0 +1,34 @@
+"""
+Moves data/jobs.json into the per-job store (data/jobs/<id>.json + data/jobs/index.json).
+
+Usage: python3 scripts/migrate_jobs.py [--overwrite] [--reindex]
+Run from the project root.
+"""
+import os
+import argparse
+
+from job_store import JobStore
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--overwrite', action='store_true', help="Replace per-job files that already exist")
+    parser.add_argument('--reindex', action='store_true', help="Only rebuild index.json from the job files")
+    args = parser.parse_args()
+
+    store = JobStore(os.getcwd())
+
+    if args.reindex:
+        index = store.rebuild_index()
+        print(f"Rebuilt index with {len(index)} jobs")
+        return
+
+    if not os.path.exists(store.legacy_path):
+        print(f"Nothing to migrate: {store.legacy_path} not found")
+        return
+
+    migrated, skipped = store.migrate_legacy(overwrite=args.overwrite)
+    print(f"Migrated {migrated} jobs into {store.jobs_dir} ({skipped} already present)")
+    print(f"Legacy file kept as {store.legacy_path}.migrated")
+
+if __name__ == "__main__":
+    main()
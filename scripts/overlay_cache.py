@@ -0,0 +1,174 @@
+import os
+import json
+import hashlib
+from collections import OrderedDict
+
+try:
+    from PIL import Image
+    from PIL.PngImagePlugin import PngInfo
+except ImportError:
+    pass
+
+# Bump whenever render_design_overlay / layout_engine change what is drawn, so stale disk entries are ignored
+CACHE_VERSION = 3
+
+# Config fields that influence the rendered overlay
+DESIGN_CONFIG_KEYS = (
+    'headerHeight',
+    'logoSize',
+    'nameFontSize', 'nameColor',
+    'badgeSize',
+    'handleFontSize', 'handleColor',
+    'headlineFontSize', 'headlineColor',
+    'designName', 'designHandle',
+    'designBgColor', 'designOpacity',
+)
+
+MEMORY_ENTRIES = 32
+# PNGs kept per job dir; least recently used go first (keys from older CACHE_VERSIONs or configs age out)
+DISK_ENTRIES = 256
+CACHE_DIRNAME = ".overlay_cache"
+
+_digests = {}
+
+def file_digest(path):
+    """
+    sha256 of a file's contents, memoized by (path, size, mtime) so unchanged files are hashed once.
+    Returns None if the file doesn't exist.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    stamp = (path, st.st_size, st.st_mtime_ns)
+    digest = _digests.get(stamp)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        digest = h.hexdigest()
+        _digests[stamp] = digest
+    return digest
+
+class OverlayCache:
+    """
+    Two-tier cache of rendered overlays: an in-memory LRU in front of PNGs under the job dir.
+    Entries are the cropped banner image plus its (x, y) position in the frame. Disk hits
+    refresh the PNG's mtime, and every put trims the directory back to max_disk_entries.
+    """
+
+    def __init__(self, cache_dir, max_entries=MEMORY_ENTRIES, max_disk_entries=DISK_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def make_key(self, config, width, height, layout, headline_text, logo_path, badge_path):
+        payload = {
+            'v': CACHE_VERSION,
+            'config': {k: config.get(k) for k in DESIGN_CONFIG_KEYS},
+            'size': [int(width), int(height)],
+            'layout': [int(v) for v in layout] if layout else None,
+            'headline': headline_text or "",
+            'logo': file_digest(logo_path),
+            'badge': file_digest(badge_path),
+        }
+        blob = json.dumps(payload, sort_keys=True).encode('utf-8')
+        return hashlib.sha256(blob).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def get(self, key):
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        path = self._disk_path(key)
+        if os.path.exists(path):
+            try:
+                with Image.open(path) as im:
+                    im.load()
+                    x, y = int(im.text['x']), int(im.text['y'])
+                    banner = im.convert('RGBA')
+                entry = (banner, x, y)
+                self._remember(key, entry)
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                self.disk_hits += 1
+                return entry
+            except Exception as e:
+                print(f"Overlay cache: ignoring unreadable entry {key[:12]}: {e}")
+
+        self.misses += 1
+        return None
+
+    def put(self, key, banner, x, y):
+        entry = (banner, int(x), int(y))
+        self._remember(key, entry)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            info = PngInfo()
+            info.add_text('x', str(int(x)))
+            info.add_text('y', str(int(y)))
+            # Atomic: concurrent workers may render the same key
+            path = self._disk_path(key)
+            temp_path = f"{path}.tmp.{os.getpid()}"
+            banner.save(temp_path, format='PNG', pnginfo=info)
+            os.replace(temp_path, path)
+        except Exception as e:
+            print(f"Overlay cache: failed to persist {key[:12]}: {e}")
+        self.prune_disk()
+
+    def prune_disk(self):
+        """Deletes the least recently used PNGs beyond max_disk_entries. Returns how many went."""
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return 0
+        entries = []
+        for name in names:
+            if not name.endswith('.png'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                entries.append((os.stat(path).st_mtime_ns, path))
+            except OSError:
+                continue  # Another worker pruned it first
+        excess = len(entries) - self.max_disk_entries
+        if excess <= 0:
+            return 0
+        entries.sort()
+        removed = 0
+        for _, path in entries[:excess]:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+_caches = {}
+
+def get_overlay_cache(job_dir):
+    """Process-wide cache instance for a job directory."""
+    cache_dir = os.path.join(job_dir, CACHE_DIRNAME)
+    cache = _caches.get(cache_dir)
+    if cache is None:
+        cache = OverlayCache(cache_dir)
+        _caches[cache_dir] = cache
+    return cache
@@ -0,0 +1,184 @@
+"""
+Still-frame previews of a job's overlay, without encoding anything.
+
+Usage: python3 scripts/preview.py <job_id> [--config JSON|-] [--reels id,id] [--width PX]
+Run from the project root.
+
+For each approved reel, one decoded sample frame gets the banner that process_batch would
+bake (same layout, detection and overlay cache), and is saved as a small JPEG under
+public/downloads/<job_id>/previews/. --config is merged over the job's stored config, so the
+UI can try a design or verticalCorrection change before committing to a full encode.
+Prints a JSON object with one entry per reel on stdout.
+
+Repeat previews are cheap: sample frames are kept under previews/.frames and detection
+results in previews/.detect.json, keyed by the input file, so a correction change only
+re-renders the banner and re-composites.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import contextlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+import process_batch
+from header_detect import SAMPLE_TIMESTAMPS
+from layout_engine import FONT_LOCK
+from job_store import JobStore
+from media_probe import cached_probe
+
+DEFAULT_WIDTH = 360
+JPEG_QUALITY = 80
+MAX_THREADS = 8
+
+def sample_frame(input_path, probe, frames_dir, reel_id):
+    """Decoded middle sample frame (display orientation) as RGB, cached as a JPEG per input."""
+    stat = os.stat(input_path)
+    cache_path = os.path.join(frames_dir, f"{reel_id}_{stat.st_size}_{stat.st_mtime_ns}.jpg")
+    if os.path.exists(cache_path):
+        return Image.open(cache_path).convert('RGB')
+
+    timestamp = SAMPLE_TIMESTAMPS[len(SAMPLE_TIMESTAMPS) // 2] / 1000.0
+    if probe.get('duration'):
+        timestamp = min(timestamp, probe['duration'] / 2)
+    width, height = probe['width'], probe['height']
+    cmd = [
+        'ffmpeg', '-v', 'error',
+        '-ss', f"{timestamp:.3f}", '-i', input_path,
+        '-frames:v', '1',
+        # ffmpeg applies rotation, so the frame already has the probe's display size
+        '-vf', f"scale={width}:{height}",
+        '-f', 'rawvideo', '-pix_fmt', 'rgb24', 'pipe:1'
+    ]
+    raw = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE).stdout
+    frame = Image.frombytes('RGB', (width, height), raw[:width * height * 3])
+
+    for name in os.listdir(frames_dir):
+        # Drop frames of an older version of this input
+        if name.startswith(f"{reel_id}_") and name != os.path.basename(cache_path):
+            os.remove(os.path.join(frames_dir, name))
+    frame.save(cache_path, quality=92)
+    return frame
+
+def composite(frame, reel, ctx, input_path, updates):
+    """Pastes the overlay process_batch would bake onto the frame; returns the layout used."""
+    width, height = frame.size
+    if ctx['mode'] == 'upload':
+        overlay_source = os.path.join(ctx['job_dir'], "header_overlay.png")
+        if not os.path.exists(overlay_source):
+            raise FileNotFoundError("Header overlay missing")
+        y, h = 0, int(height * 0.15)
+        if ctx['auto_detect']:
+            y, h, _ = process_batch.detect_reel_header(input_path, width, height, reel, ctx, updates)
+        # Same cover-and-center-crop as the ffmpeg scale/crop in process_reel
+        header = ImageOps.fit(Image.open(overlay_source).convert('RGBA'), (width, h))
+        frame.paste(header, (0, y), header)
+        return {'y': int(y), 'h': int(h), 'width': width, 'height': height}
+
+    layout_override = process_batch.design_layout(input_path, width, height, reel, ctx, updates)
+    with FONT_LOCK:
+        banner, x, y = process_batch.render_design_banner(ctx['job_dir'], ctx['config'], width, height, reel,
+                                                          ctx['base_dir'], layout_override)
+    frame.paste(banner, (x, y), banner)
+    return updates.get('layout')
+
+def preview_reel(reel, ctx, previews_dir, frames_dir, preview_width):
+    start = time.perf_counter()
+    _, input_path = process_batch.resolve_input(reel, ctx)
+    if not input_path:
+        return {'id': reel['id'], 'error': "Input file missing"}
+    probe = cached_probe(input_path, reel.get('probe'))
+    if not probe:
+        return {'id': reel['id'], 'error': "Unreadable video"}
+
+    frame = sample_frame(input_path, probe, frames_dir, reel['id'])
+    layout = composite(frame, reel, ctx, input_path, {})
+
+    preview_height = max(1, round(frame.height * preview_width / frame.width))
+    frame = frame.resize((preview_width, preview_height), Image.LANCZOS)
+    out_path = os.path.join(previews_dir, f"{reel['id']}.jpg")
+    temp_file = f"{out_path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    frame.save(temp_file, format='JPEG', quality=JPEG_QUALITY)
+    os.replace(temp_file, out_path)
+    return {
+        'id': reel['id'],
+        # Public URL, versioned so the browser doesn't show a stale image
+        'preview': f"/downloads/{os.path.basename(ctx['job_dir'])}/previews/{reel['id']}.jpg?v={os.stat(out_path).st_mtime_ns}",
+        'layout': layout,
+        'ms': round(1000 * (time.perf_counter() - start), 1),
+    }
+
+def load_memo(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_memo(path, memo):
+    # Atomic Write
+    temp_file = f"{path}.tmp.{os.getpid()}"
+    with open(temp_file, 'w') as f:
+        json.dump(memo, f)
+    os.replace(temp_file, path)
+
+def render_previews(job_id, overrides=None, reel_ids=None, preview_width=DEFAULT_WIDTH, base_dir=None):
+    """Renders previews for a job; returns {"previews": [...], "ms": total}."""
+    start = time.perf_counter()
+    base_dir = base_dir or os.getcwd()
+    job = JobStore(base_dir).load_job(job_id)
+    if not job:
+        raise ValueError(f"Job {job_id} not found")
+
+    config = dict(job.get('config') or {}, **(overrides or {}))
+    ctx = process_batch.build_context(job_id, config, base_dir)
+    previews_dir = os.path.join(ctx['job_dir'], "previews")
+    frames_dir = os.path.join(previews_dir, ".frames")
+    os.makedirs(frames_dir, exist_ok=True)
+
+    memo_path = os.path.join(previews_dir, ".detect.json")
+    ctx['detect_memo'] = load_memo(memo_path)
+    memo_size = len(ctx['detect_memo'])
+
+    reels = [r for r in job.get('reels', []) if r.get('status') == 'approved']
+    if reel_ids:
+        reels = [r for r in reels if r.get('id') in reel_ids]
+
+    def run(reel):
+        try:
+            return preview_reel(reel, ctx, previews_dir, frames_dir, preview_width)
+        except Exception as e:
+            return {'id': reel.get('id'), 'error': str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_THREADS, len(reels)))) as pool:
+        results = list(pool.map(run, reels))
+
+    if len(ctx['detect_memo']) != memo_size:
+        save_memo(memo_path, ctx['detect_memo'])
+    return {'previews': results, 'ms': round(1000 * (time.perf_counter() - start), 1)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('job_id')
+    parser.add_argument('--config', help="JSON object merged over the job config, or - to read it from stdin")
+    parser.add_argument('--reels', help="Comma-separated reel ids (default: all approved)")
+    parser.add_argument('--width', type=int, default=DEFAULT_WIDTH, help="Preview width in pixels")
+    args = parser.parse_args()
+
+    overrides = None
+    if args.config:
+        overrides = json.loads(sys.stdin.read() if args.config == '-' else args.config)
+    reel_ids = {r.strip() for r in args.reels.split(',') if r.strip()} if args.reels else None
+
+    # Pipeline functions narrate to stdout; keep it for the JSON result
+    with contextlib.redirect_stdout(sys.stderr):
+        result = render_previews(args.job_id, overrides, reel_ids, args.width)
+    print(json.dumps(result))
+
+if __name__ == "__main__":
+    main()
@@ -1,413 +1,604 @@
-import sys
 import json
 import os
+import argparse
+import hashlib
 import subprocess
-import textwrap
+import time
 import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
 # Base directory for the frontend project
 script_dir = os.path.dirname(os.path.abspath(__file__))
 base_dir = os.path.dirname(script_dir)
 
+# Threads handed to each ffmpeg encode when several reels are baked in parallel
+FFMPEG_THREADS_PER_WORKER = 4
+
 try:
-    from PIL import Image, ImageDraw, ImageFont, ImageOps
+    from PIL import Image, ImageDraw
 except ImportError:
     print("Pillow not installed. Creating without it (will fail for design mode).")
 
-try:
-    import cv2
-    import numpy as np
-    OPENCV_AVAILABLE = True
-except ImportError:
-    OPENCV_AVAILABLE = False
-    print("OpenCV not installed. Auto-detection disabled.")
+from overlay_cache import get_overlay_cache, file_digest, DESIGN_CONFIG_KEYS
+from assets import AssetRegistry, merge_stats, format_stats
+from header_detect import detect_header
+from layout_cache import LayoutCache, detect_with_cache
+from media_probe import probe_media, cached_probe
+from job_store import JobStore
+from encode_profiles import (DEFAULT_PROFILE, POSTER_TIME, PREVIEW_RENDITION, ROI_AQ_MODE, SPRITE_GRID, SPRITE_TILE_WIDTH,
+                             encoder_args, image_args, preview_args, resolve_profile, roi_supported)
+from job_archive import JobArchive, discard as discard_archive
+from reel_dedup import NUMPY_AVAILABLE as DEDUP_AVAILABLE, DedupIndex, cached_fingerprint
+from layout_engine import FONT_LOCK, layout_banner, required_height
+from progress_events import EventLog, StageTotals, StageTrace, format_totals, parse_ffmpeg_progress
+
+# Fonts, logo and badge are loaded once per process and reused across reels
+ASSETS = AssetRegistry(base_dir)
 
 def get_video_dimensions(input_path):
-    """Returns (width, height) of video using ffprobe"""
-    try:
-        cmd = [
-            'ffprobe', 
-            '-v', 'error', 
-            '-select_streams', 'v:0', 
-            '-show_entries', 'stream=width,height', 
-            '-of', 'csv=s=x:p=0', 
-            input_path
-        ]
-        output = subprocess.check_output(cmd).decode('utf-8').strip()
-        parts = output.split('x')
-        return int(parts[0]), int(parts[1])
-    except Exception as e:
-        print(f"Error getting dimensions for {input_path}: {e}")
-        return None
-
-def detect_header_height(video_path, total_height, show_headline=True):
-    """
-    Analyzes video at multiple timestamps to find the UI header area.
-    If show_headline is False, it strictly isolates the profile row (name/handle).
-    Returns (final_y, final_h, content_padding)
-    """
-    if not OPENCV_AVAILABLE:
-        print("OpenCV unavailable, using default safe area")
-        return 0, int(total_height * 0.15), 20
-
-    try:
-        cap = cv2.VideoCapture(video_path)
-        
-        # Sample multiple frames to be more robust against transitions/animations
-        # (Timestamps in ms: 500, 1500, 2500)
-        timestamps = [500, 1500, 2500]
-        detected_envelopes = []
-
-        for ts in timestamps:
-            cap.set(cv2.CAP_PROP_POS_MSEC, ts)
-            ret, frame = cap.read()
-            if not ret:
-                continue
-
-            h, w, _ = frame.shape
-            
-            # Region of Interest: Top 25% (Headers are rarely lower than this)
-            roi_h = int(h * 0.25)
-            roi = frame[0:roi_h, 0:w]
-            
-            # Preprocessing
-            gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
-            # Blur to merge text blocks
-            blurred = cv2.GaussianBlur(gray, (25, 25), 0)
-            edges = cv2.Canny(blurred, 30, 100)
-            
-            # Dilate to connect components
-            # Moderate vertical dilation to bridge text lines without merging status bar
-            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (20, 8))
-            dilated = cv2.dilate(edges, kernel, iterations=2)
-            
-            contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            frame_top = h
-            frame_bottom = 0
-            found_in_frame = False
-            
-            # Thresholds for filtering noise (resolution-aware)
-            # 5% of width is enough to catch "Evolving AI" but skip tiny dots
-            min_w = w * 0.05  
-            min_h = h * 0.005 
-            # Skip top 4% to avoid OS status bar (clock/battery/pill)
-            status_bar_h = h * 0.04 
-            
-            valid_rects = []
-            for cnt in contours:
-                x, y, w_rect, h_rect = cv2.boundingRect(cnt)
-                
-                # Filter noise
-                if w_rect < min_w: continue 
-                if h_rect < min_h: continue 
-                if y < status_bar_h: continue # Skips OS status bar
-                
-                valid_rects.append((y, y + h_rect))
-
-            if valid_rects:
-                if not show_headline:
-                    # ULTRA-SLIM: Isolate ONLY the top-most cohesive row (Profile Row)
-                    # We sort by Y and only keep the first "cluster"
-                    valid_rects.sort(key=lambda r: r[0])
-                    first_y = valid_rects[0][0]
-                    # Anything starting within 3% of the first element is part of the same "row"
-                    row_threshold = h * 0.03
-                    profile_rects = [r for r in valid_rects if r[0] < (first_y + row_threshold)]
-                    
-                    frame_top = min(r[0] for r in profile_rects)
-                    frame_bottom = max(r[1] for r in profile_rects)
-                else:
-                    # Normal: Take full UI envelope (Name + Headline)
-                    frame_top = min(r[0] for r in valid_rects)
-                    frame_bottom = max(r[1] for r in valid_rects)
-                
-                found_in_frame = True
-            
-            if found_in_frame:
-                detected_envelopes.append((frame_top, frame_bottom))
-
-        cap.release()
-
-        if not detected_envelopes:
-            print("No header structure detected in sampled frames. Using default.")
-            return 0, int(total_height * 0.15), 20
-
-        # Aggregate: Use min top and max bottom across all frames for full coverage
-        ui_top = min(e[0] for e in detected_envelopes)
-        ui_bottom = max(e[1] for e in detected_envelopes)
-        
-        # Scaling Factors (based on 1920p original targets)
-        if not show_headline:
-            # PERFECT-FIT: Balancing slimmness with breathing room
-            rel_shift_up = int(total_height * 0.02) # Balanced at 2%
-            rel_buffer = int(total_height * 0.005)  # 0.5% cushion
-            rel_safety_floor = int(total_height * 0.02) # 2% floor
-            snap_threshold = 0.02 # Only snap if touching top 2%
-        else:
-            rel_shift_up = int(total_height * 0.11)
-            rel_buffer = int(total_height * 0.01)
-            rel_safety_floor = int(total_height * 0.04)
-            snap_threshold = 0.05
-
-        # Final Calculations
-        final_y = max(0, ui_top - rel_shift_up) 
-        
-        # SELECTIVE SNAP TO TOP
-        if final_y < (total_height * snap_threshold):
-             final_y = 0
-
-        final_h = (ui_bottom - final_y) + rel_buffer
-        
-        # Safety Floor
-        if final_h < rel_safety_floor: final_h = rel_safety_floor
-            
-        # Strict Cap
-        max_allowed = int(total_height * (0.10 if not show_headline else 0.16))
-        if final_h > max_allowed:
-            final_h = max_allowed
-            
-        content_y = 10 # Tight content padding
-        
-        print(f"OpenCV (Pass 3): Detected UI {ui_top}-{ui_bottom}. Banner: y={final_y}, h={final_h}")
-        return final_y, final_h, content_y
-
-    except Exception as e:
-        print(f"CV Error: {e}")
-        return 0, int(total_height * 0.15), 20
-
-def create_circular_logo(logo_path, size):
-    try:
-        img = Image.open(logo_path).convert("RGBA")
-        img = ImageOps.fit(img, size, centering=(0.5, 0.5))
-        
-        mask = Image.new('L', size, 0)
-        draw = ImageDraw.Draw(mask)
-        draw.ellipse((0, 0, size[0], size[1]), fill=255)
-        
-        output = Image.new('RGBA', size, (0, 0, 0, 0))
-        output.paste(img, (0, 0), mask)
-        
-        # Border thickness: scale_factor * 1.5 roughly equals 1px visual border
-        # We need to pass the scale_factor here or calculate it. 
-        # For now, let's use a more subtle relative calculation.
-        border_thickness = max(1, int(size[0] * 0.02)) 
-        draw_overlay = ImageDraw.Draw(output)
-        draw_overlay.ellipse((0, 0, size[0]-1, size[1]-1), outline="white", width=border_thickness)
-        
-        return output
-    except Exception as e:
-        print(f"Error processing logo: {e}")
-        return Image.new('RGBA', size, (100, 100, 100, 255))
-
-def get_font(size, bold=False):
-    font_paths = [
-        os.path.join(base_dir, "public", "fonts", "Montserrat-Regular.ttf"),
-        os.path.join(base_dir, "public", "fonts", "Montserrat-Light.ttf"),
-        "Arial Bold.ttf" if bold else "Arial.ttf",
-        "Helvetica-Bold" if bold else "Helvetica",
-        "/System/Library/Fonts/Supplemental/Arial.ttf"
-    ]
-    for path in font_paths:
-        try:
-            return ImageFont.truetype(path, size)
-        except:
-            continue
-    try:
-        return ImageFont.load_default() 
-    except:
-        return None
+    """Returns display (width, height) of video, or None"""
+    info = probe_media(input_path)
+    return (info['width'], info['height']) if info else None
 
 def hex_to_rgb(hex_color):
     hex_color = hex_color.lstrip('#')
     return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4)) + (255,)
 
-def generate_design_overlay(job_dir, config, width, height, reel_data, base_dir, layout_override=None):
+def resolve_headline_text(config, reel_data):
+    """Headline that will actually be drawn for this reel ("" when hidden)."""
+    show_headline = str(config.get('showHeadline', True)).lower() == 'true'
+    if not show_headline:
+        return ""
+    headline_mode = config.get('headlineMode', 'manual')
+    if headline_mode == 'manual':
+        return config.get('manualHeadline', "")
+    return reel_data.get('generated_headline') or "AI Headline Pending..."
+
+def badge_path_for(base_dir):
+    return os.path.join(base_dir, "public", "Twitter_Verified_Badge_Gold.svg.png")
+
+def render_design_overlay(job_dir, config, width, height, reel_data, base_dir, layout_override=None):
     """
-    Generates the overlay image. 
+    Draws the design banner on a canvas the size of its bounding box.
     layout_override: (final_y, final_h, content_y) from Auto-Detect
+    Returns (banner_img, x, y): the image and where it goes in the frame.
     """
-    # Create full canvas
-    img = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    badge_path = badge_path_for(base_dir)
+    layout = layout_banner(config, width, height, resolve_headline_text(config, reel_data), ASSETS, base_dir,
+                           placement=layout_override, badge=os.path.exists(badge_path))
+    x0, y0, x1, y1 = layout['box']
+    img = Image.new('RGBA', (x1 - x0, y1 - y0), (0, 0, 0, 0))
     draw = ImageDraw.Draw(img)
-    
-    # Defaults
-    bg_color = (0, 0, 0, 255) # Solid Black default
-    
-    # Resolve position variables
-    if layout_override:
-        start_y, block_height, content_padding_top = layout_override
-        # RE-CENTERING LOGIC: If the banner is significantly taller than the content padding might suggest,
-        # we can adjust content_padding_top to center the content.
-        # But for now, we trust the tight padding from the caller.
-    else:
-        # Manual fallback
-        header_percent = config.get('headerHeight', 15)
-        if header_percent == 'auto': header_percent = 15 # Safety
-        start_y = 0
-        block_height = int(height * (header_percent / 100.0))
-        content_padding_top = int(width * 0.04)
+    fonts = layout['fonts']
+
+    def at(x, y):
+        # Frame coordinates -> canvas coordinates
+        return (x - x0, y - y0)
 
     # Draw Background Banner
-    draw.rectangle(
-        [(0, start_y), (width, start_y + block_height)], 
-        fill=bg_color
-    )
-    
-    # Scale Factors
-    scale_factor = width / 380.0 
-    
-    # compensated scaling for PIL fonts vs CSS
-    FONT_SCALE = 1.35 
-    
-    # Config Values
-    logo_percent = config.get('logoSize', 15)
-    logo_size_px = int(width * (logo_percent / 100.0))
-    
-    name_fs = int(config.get('nameFontSize', 18) * scale_factor * FONT_SCALE)
-    name_color = config.get('nameColor', '#ffffff')
-    
-    badge_size_px = int(config.get('badgeSize', 12) * scale_factor)
-    
-    handle_fs = int(config.get('handleFontSize', 14) * scale_factor * FONT_SCALE)
-    handle_color = config.get('handleColor', '#94a3b8')
-    
-    headline_fs = int(config.get('headlineFontSize', 24) * scale_factor * FONT_SCALE)
-    headline_color = config.get('headlineColor', '#ffffff')
-    
-    padding_left = int(22 * scale_factor) # pl-[22px]
-    padding_vertical = int(12 * scale_factor) # py-3 (0.75rem = 12px)
-    gap_horizontal = int(8 * scale_factor) # gap-2 (0.5rem = 8px)
-    
-    # --- Content Positioning ---
-    
+    bg_color = (0, 0, 0, 255) # Solid Black default
+    start_y, block_height = layout['block']
+    draw.rectangle([at(0, start_y), at(width, start_y + block_height)], fill=bg_color)
+
     # Logo
-    logo_size = (logo_size_px, logo_size_px)
-    logo_x = padding_left
-    # Align content relative to the banner start + vertical padding
-    content_start_y = start_y + padding_vertical
-    
-    # Micro-adjust logo up slightly for better visual balance
-    logo_y = content_start_y - int(3.5 * scale_factor)
-    
+    logo_x, logo_y, logo_size_px = layout['logo']
     logo_path = os.path.join(job_dir, "logo.png")
     if os.path.exists(logo_path):
         # We use a finer border logic in create_circular_logo now
-        logo_img = create_circular_logo(logo_path, logo_size)
-        img.paste(logo_img, (logo_x, logo_y), logo_img)
+        logo_img = ASSETS.circular_logo(logo_path, (logo_size_px, logo_size_px))
+        img.paste(logo_img, at(logo_x, logo_y), logo_img)
     else:
         # Drawing a circular placeholder with an emerald border for consistency
         border_thickness = max(1, int(logo_size_px * 0.02))
         draw.ellipse(
-            (logo_x, logo_y, logo_x + logo_size_px, logo_y + logo_size_px), 
+            (*at(logo_x, logo_y), *at(logo_x + logo_size_px, logo_y + logo_size_px)),
             outline="#10b981", # emerald-500
             width=border_thickness
         )
 
-    # Name
-    name_text = config.get('designName', 'User')
-    font_bold = get_font(name_fs, bold=True)
-    
-    # Standardize name_x to keep layout consistent whether logo exists or not
-    name_x = logo_x + logo_size_px + gap_horizontal
-    name_y = logo_y 
-    
-    draw.text((name_x, name_y), name_text, font=font_bold, fill=name_color)
-    
-    # Badge
-    badge_path = os.path.join(base_dir, "public", "Twitter_Verified_Badge_Gold.svg.png")
-    if os.path.exists(badge_path):
-        try:
-            name_bbox = draw.textbbox((name_x, name_y), name_text, font=font_bold)
-            name_w = name_bbox[2] - name_bbox[0]
-            
-            b_size = (badge_size_px, badge_size_px)
-            badge_img = Image.open(badge_path).convert("RGBA")
-            badge_img = ImageOps.fit(badge_img, b_size, centering=(0.5, 0.5))
-            
-            badge_x = name_x + name_w + int(8 * scale_factor)
-            badge_y_pos = name_y + (name_fs // 2) - (badge_size_px // 2)
-            img.paste(badge_img, (badge_x, badge_y_pos), badge_img)
-        except Exception as e:
-            # print(f"Badge error: {e}")
-            pass
+    with FONT_LOCK:
+        # Name
+        name_x, name_y, name_text = layout['name']
+        draw.text(at(name_x, name_y), name_text, font=fonts['name'], fill=config.get('nameColor', '#ffffff'))
 
-    # Handle
-    handle_text = config.get('designHandle', '')
-    if handle_text:
-        if handle_text.startswith('@'): handle_text = handle_text[1:]
-        
-        # Try Montserrat specifically for the handle if possible
-        handle_font_path = os.path.join(base_dir, "public", "fonts", "Montserrat-Light.ttf")
-        if not os.path.exists(handle_font_path):
-            handle_font_path = os.path.join(base_dir, "public", "fonts", "Montserrat-Regular.ttf")
+        # Badge
+        if layout['badge']:
+            badge_x, badge_y, badge_size_px = layout['badge']
+            try:
+                badge_img = ASSETS.badge(badge_path, (badge_size_px, badge_size_px))
+                img.paste(badge_img, at(badge_x, badge_y), badge_img)
+            except Exception as e:
+                # print(f"Badge error: {e}")
+                pass
+
+        # Handle: "@" one size up, then the name right after it
+        if layout['handle']:
+            at_x, text_x, handle_y, handle_text = layout['handle']
+            handle_color = config.get('handleColor', '#94a3b8')
+            draw.text(at(at_x, handle_y), "@", font=fonts['at'], fill=handle_color)
+            draw.text(at(text_x, handle_y), handle_text, font=fonts['handle'], fill=handle_color)
+
+        # Headline
+        for text_x, text_y, line in layout['headline'] or []:
+            draw.text(at(text_x, text_y), line, font=fonts['headline'], fill=config.get('headlineColor', '#ffffff'))
+
+    return img, x0, y0
+
+def build_overlay_input(banner):
+    """
+    Returns (ffmpeg_inputs, stdin_bytes) for feeding the banner to ffmpeg as one raw RGBA frame.
+    Nothing is written to disk.
+    """
+    ffmpeg_inputs = [
+        '-f', 'rawvideo',
+        '-pix_fmt', 'rgba',
+        '-s', f"{banner.width}x{banner.height}",
+        '-i', 'pipe:0'
+    ]
+    return ffmpeg_inputs, banner.tobytes()
+
+# Quantizer offset for the picture outside the banner in 'roi' mode (addroi range is -1..1).
+# Positive = coarser: the untouched video gets fewer bits, the freshly drawn text keeps full quality.
+ROI_OUTSIDE_QOFFSET = 0.2
+
+def roi_filters(banner_encode, band_y, band_h, frame_h):
+    """
+    Extra filter steps for config['bannerEncode'].
+    'full' (default) encodes every region alike; 'roi' tags everything outside the banner
+    with a region-of-interest hint so x264 spends less on it.
+    """
+    if banner_encode != 'roi':
+        return ""
+    band_y = min(max(0, int(band_y)), frame_h)
+    band_bottom = min(band_y + max(0, int(band_h)), frame_h)
+    filters = ""
+    if band_y > 0:
+        filters += f",addroi=x=0:y=0:w=iw:h={band_y}:qoffset={ROI_OUTSIDE_QOFFSET}"
+    if band_bottom < frame_h:
+        filters += f",addroi=x=0:y={band_bottom}:w=iw:h={frame_h - band_bottom}:qoffset={ROI_OUTSIDE_QOFFSET}"
+    return filters
+
+def rendition_graph(composite, roi, probe, sprite=False):
+    """
+    Splits the composited frames into every output of the one encode: [pub] (with the
+    bannerEncode ROI hints), [pv] for the web preview, [poster] and optionally [sprite].
+    Decoding and overlaying happen once whatever the number of outputs.
+    """
+    duration = probe.get('duration') or 0
+    poster_time = min(POSTER_TIME, duration / 2) if duration else 0
+    labels = ['pub', 'pv', 'poster'] + (['sprite'] if sprite else [])
+    graph = composite + f",split={len(labels)}" + "".join(f"[{label}_in]" for label in labels)
+    graph += f";[pub_in]null{roi}[pub]"
+    graph += f";[pv_in]scale=w=min({PREVIEW_RENDITION['width']}\\,iw):h=-2[pv]"
+    graph += f";[poster_in]select=gte(t\\,{poster_time:.3f})[poster]"
+    if sprite:
+        columns, rows = SPRITE_GRID
+        rate = (columns * rows) / duration if duration else 1
+        graph += f";[sprite_in]fps={rate:.4f},scale={SPRITE_TILE_WIDTH}:-2,tile={columns}x{rows}[sprite]"
+    return graph
+
+def render_design_banner(job_dir, config, width, height, reel, base_dir, layout_override):
+    """
+    Cached wrapper around render_design_overlay.
+    Identical inputs (config, geometry, headline, logo/badge files) reuse the previous render.
+    """
+    overlay_cache = get_overlay_cache(job_dir)
+    cache_key = overlay_cache.make_key(
+        config, width, height, layout_override,
+        resolve_headline_text(config, reel),
+        os.path.join(job_dir, "logo.png"),
+        badge_path_for(base_dir)
+    )
+    cached = overlay_cache.get(cache_key)
+    if cached:
+        return cached
+
+    banner, x, y = render_design_overlay(job_dir, config, width, height, reel, base_dir, layout_override=layout_override)
+    overlay_cache.put(cache_key, banner, x, y)
+    return banner, x, y
+
+def detect_reel_header(input_path, width, height, reel, ctx, updates, show_headline=True):
+    """
+    detect_header, short-circuited by the per-creator layout cache when enabled.
+    Cache observations ride back in `updates` so only the parent writes the cache file.
+    ctx['detect_memo'] (a dict, set by preview.py) memoizes results per input file.
+    """
+    memo = ctx.get('detect_memo')
+    if memo is not None:
+        stat = os.stat(input_path)
+        memo_key = f"{input_path}|{stat.st_size}|{stat.st_mtime_ns}|{show_headline}|{ctx['detection_mode']}"
+        if memo_key not in memo:
+            memo[memo_key] = list(detect_reel_header(input_path, width, height, reel, dict(ctx, detect_memo=None),
+                                                     updates, show_headline=show_headline))
+        return tuple(memo[memo_key])
+
+    if not ctx.get('layout_cache_path'):
+        return detect_header(input_path, height, show_headline=show_headline, method=ctx['detection_mode'])
+
+    layout, observation = detect_with_cache(
+        ctx['layout_cache_path'], reel.get('username'), input_path,
+        width, height, show_headline=show_headline, method=ctx['detection_mode']
+    )
+    if observation:
+        updates['_layout_observation'] = observation
+    return layout
+
+def design_layout(input_path, width, height, reel, ctx, updates, trace=None):
+    """
+    Design-mode banner geometry: (final_y, target_h, content_padding), with auto-height and
+    the vertical correction applied. Also stores the layout in updates for the frontend.
+    """
+    config = ctx['config']
+    auto_detect = ctx['auto_detect']
+    vertical_correction = ctx['vertical_correction']
+    trace = trace or StageTrace()
+
+    # Default / Fallback (if Auto is OFF)
+    final_y = 0
+    target_h = int(height * 0.15) # Default 15%
+    content_padding = int(width * 0.04)
+
+    if auto_detect:
+        show_headline_raw = config.get('showHeadline', True)
+        show_headline = str(show_headline_raw).lower() == 'true'
+        trace.start('detect')
+        detected_y, detected_h, detected_padding = detect_reel_header(input_path, width, height, reel, ctx, updates, show_headline=show_headline)
+        trace.start('overlay')
+
+        # The banner must cover the detected original header and fit the new design content,
+        # measured by the same layout the renderer draws
+        design_min_h = required_height(config, width, height, resolve_headline_text(config, reel), ASSETS,
+                                       ctx['base_dir'], badge=os.path.exists(badge_path_for(ctx['base_dir'])))
+
+        # The Final Height of the Black Bar
+        # Must be at least detected_h (to cover old) and at least design_min_h (to fit new)
+        final_h = max(detected_h, design_min_h)
+
+        # Cap at 35% to be safe? Or trust the inputs?
+        # User asked for "Dependent on header size", so trust max.
+
+        print(f"Auto-Height: Detected Old={detected_h}px, Needed New={int(design_min_h)}px -> Final={int(final_h)}px")
+
+        final_y = detected_y
+        target_h = int(final_h)
+        content_padding = detected_padding # Use the tight padding from detector
+
+    if not auto_detect:
+        trace.start('overlay')
+
+    # APPLY VERTICAL CORRECTION (Global Shift)
+    final_y += vertical_correction
+
+    # Ensure we don't go off-screen (optional, but good safety)
+    # if final_y < 0: final_y = 0 # Allow negative if user wants to push it up? Maybe.
+
+    # Save computed layout to DB for Frontend Preview
+    updates['layout'] = {
+        'y': int(final_y),
+        'h': int(target_h),
+        'correction': vertical_correction,
+        'width': width,
+        'height': height
+    }
+
+    return final_y, target_h, content_padding
+
+def default_worker_count():
+    """Number of reels to bake concurrently: cores divided by the per-encode thread budget."""
+    cores = os.cpu_count() or 1
+    return max(1, cores // FFMPEG_THREADS_PER_WORKER)
+
+# Bump when the encode pipeline changes in a way that should invalidate existing outputs
+FINGERPRINT_VERSION = 4
+
+def render_fingerprint(ctx, reel, probe):
+    """
+    Hash of everything that determines a reel's processed output: the input file (via its
+    probe stamp), the effective config, overlay assets and the headline actually drawn.
+    """
+    config = ctx['config']
+    mode = ctx['mode']
+    payload = {
+        'v': FINGERPRINT_VERSION,
+        'input': [probe.get('source'), probe.get('size'), probe.get('mtime')],
+        'mode': mode,
+        'auto_detect': ctx['auto_detect'],
+        'detection_mode': ctx['detection_mode'] if ctx['auto_detect'] else None,
+        'encode': resolve_profile(ctx['encode_profile']),
+        'banner_encode': ctx['banner_encode'],
+        # AQ mode forced on for ROI encodes (encoder_args)
+        'roi_aq_mode': ROI_AQ_MODE,
+        'renditions': {'preview': PREVIEW_RENDITION, 'sprite': ctx['sprite']},
+    }
+    if mode == 'upload':
+        payload['header'] = file_digest(os.path.join(ctx['job_dir'], "header_overlay.png"))
+    else:
+        payload['design'] = {k: config.get(k) for k in DESIGN_CONFIG_KEYS}
+        payload['show_headline'] = str(config.get('showHeadline', True)).lower() == 'true'
+        payload['headline'] = resolve_headline_text(config, reel)
+        # Only design mode applies the vertical shift
+        payload['correction'] = ctx['vertical_correction']
+        payload['logo'] = file_digest(os.path.join(ctx['job_dir'], "logo.png"))
+        payload['badge'] = file_digest(badge_path_for(ctx['base_dir']))
+    blob = json.dumps(payload, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(blob).hexdigest()
+
+def rendition_files(local_filename, sprite=False):
+    """Reel-record field -> file name of each side output written next to processed_<name>."""
+    stem = os.path.splitext(local_filename)[0]
+    files = {'preview_path': f"preview_{stem}.mp4", 'poster_path': f"poster_{stem}.jpg"}
+    if sprite:
+        files['sprite_path'] = f"sprite_{stem}.jpg"
+    return files
+
+def process_reel(reel, ctx):
+    """
+    Bakes a single reel. Runs inside a pool worker, so it never touches the job store:
+    it returns the fields to merge back into the reel record, plus the reel's stage
+    timings under '_trace' (the only key when the reel couldn't be baked).
+    """
+    trace = StageTrace()
+    updates = bake_reel(reel, ctx, trace)
+    return {**(updates or {}), '_trace': trace.finish()}
+
+def resolve_input(reel, ctx):
+    """(local_filename, input_path) of a reel's source video, or (name, None) if missing."""
+    job_dir = ctx['job_dir']
+    source_dir = ctx['source_dir']
+
+    local_filename = reel.get('local_video_path')
+
+    # Self-healing: If DB says no file, check if {id}.mp4 exists (legacy/manual fix)
+    if not local_filename:
+        guessed_filename = f"{reel['id']}.mp4"
+        if os.path.exists(os.path.join(job_dir, guessed_filename)):
+            print(f"Self-healed: Found {guessed_filename} despite missing DB entry")
+            local_filename = guessed_filename
+
+    if not local_filename:
+        print(f"Skipping {reel['id']} - no local file defined")
+        return None, None
+
+    # Try finding the file
+    input_path = os.path.join(job_dir, local_filename)
+    if not os.path.exists(input_path):
+        # FALLBACK to source
+        fallback_path = os.path.join(source_dir, local_filename)
+        if os.path.exists(fallback_path):
+            print(f"Found input in fallback source: {local_filename}")
+            input_path = fallback_path
+        else:
+            print(f"Input file missing: {input_path}")
+            return local_filename, None
+    return local_filename, input_path
+
+def bake_reel(reel, ctx, trace):
+    """process_reel body; returns updates or None, recording stages on `trace`."""
+    job_dir = ctx['job_dir']
+    base_dir = ctx['base_dir']
+    config = ctx['config']
+    mode = ctx['mode']
+    auto_detect = ctx['auto_detect']
+
+    updates = {}
+
+    local_filename, input_path = resolve_input(reel, ctx)
+    if not input_path:
+        return None
+
+    # Single probe per file, reused from the reel record while the file is unchanged
+    trace.start('probe', bytes_in=os.path.getsize(input_path))
+    probe = cached_probe(input_path, reel.get('probe'))
+    trace.stop(cached=probe is reel.get('probe'))
+    if not probe: return None
+    if probe is not reel.get('probe'):
+        updates['probe'] = probe
+    width, height = probe['width'], probe['height']
+
+    output_filename = f"processed_{local_filename}"
+    output_path = os.path.join(job_dir, output_filename)
+    outputs = rendition_files(local_filename, ctx['sprite'])
+
+    # Skip reels whose inputs haven't changed since their last successful bake
+    fingerprint = render_fingerprint(ctx, reel, probe)
+    up_to_date = os.path.exists(output_path) and all(os.path.exists(os.path.join(job_dir, name)) for name in outputs.values())
+    if not ctx.get('force') and reel.get('render_fingerprint') == fingerprint and up_to_date:
+        print(f"Up to date: {output_filename}")
+        updates['processed_path'] = output_filename
+        updates['_skipped'] = True
+        return updates
+
+    # Prepare Overlay
+    composite = ""
+    roi = ""
+    ffmpeg_inputs = []
+    overlay_stdin = None
+
+    if mode == 'upload':
+        # Check Overlay
+        overlay_source = os.path.join(job_dir, "header_overlay.png")
+        if not os.path.exists(overlay_source):
+            print("Header overlay missing")
+            return None
             
-        try:
-            font_reg = ImageFont.truetype(handle_font_path, handle_fs)
-            font_at = ImageFont.truetype(handle_font_path, handle_fs + 2)
-        except:
-            font_reg = get_font(handle_fs, bold=False)
-            font_at = get_font(handle_fs + 2, bold=False) 
-        
-        handle_y = name_y + name_fs
-        
-        # Draw @ symbol first
-        draw.text((name_x, handle_y), "@", font=font_at, fill=handle_color)
-        
-        # Measure @ width to offset the rest of the handle
-        at_bbox = draw.textbbox((name_x, handle_y), "@", font=font_at)
-        at_width = at_bbox[2] - at_bbox[0]
-        
-        # Draw the rest of the handle name
-        draw.text((name_x + at_width, handle_y), handle_text, font=font_reg, fill=handle_color)
-
-    # Headline
-    show_headline_raw = config.get('showHeadline', True)
-    show_headline = str(show_headline_raw).lower() == 'true'
-    if show_headline:
-        headline_mode = config.get('headlineMode', 'manual')
-        headline_text = config.get('manualHeadline', "") if headline_mode == 'manual' else (reel_data.get('generated_headline') or "AI Headline Pending...")
+        # Determine Geometry
+        final_y = 0
+        if auto_detect:
+             # Auto-Height for Upload Mode? Just use detected header height.
+             trace.start('detect')
+             detected_y, detected_h, _ = detect_reel_header(input_path, width, height, reel, ctx, updates)
+             trace.stop()
+             final_y = detected_y
+             target_h = detected_h
+        else:
+             # Fallback default
+             target_h = int(height * 0.15)
         
-        if headline_text:
-            font_head = get_font(headline_fs, bold=False)
-            text_x = int(24 * scale_factor) # px-6
-            # text_y = header_strip_bottom + pt-2
-            # header_strip_bottom = logo_y + logo_size_px + padding_vertical
-            text_y = logo_y + logo_size_px + padding_vertical + int(8 * scale_factor)
+        # Simple Crop & Scale of the uploaded image
+        composite = (
+            f"[1:v]scale={width}:{target_h}:force_original_aspect_ratio=increase,"
+            f"crop={width}:{target_h}[header];"
+            f"[0:v][header]overlay=0:{final_y}:shortest=1"
+        )
+        roi = roi_filters(ctx['banner_encode'], final_y, target_h, height)
+        ffmpeg_inputs = ['-i', overlay_source]
+        trace.start('overlay', bytes_out=os.path.getsize(overlay_source))
+        trace.stop()
+
+    else: # DESIGN Mode
+        try:
+            layout_override = design_layout(input_path, width, height, reel, ctx, updates, trace)
+                
+            banner, overlay_x, overlay_y = render_design_banner(job_dir, config, width, height, reel, base_dir, layout_override)
             
-            avg_char_width = headline_fs * 0.5
-            max_chars = int((width - (text_x * 2)) / avg_char_width)
-            lines = textwrap.wrap(headline_text, width=max_chars)
+            # Ship only the banner to ffmpeg as a single raw RGBA frame on stdin.
+            # overlay's default eof_action=repeat holds it for the whole clip.
+            ffmpeg_inputs, overlay_stdin = build_overlay_input(banner)
+            trace.stop(bytes_out=len(overlay_stdin))
+            composite = f"[0:v][1:v]overlay={overlay_x}:{overlay_y}:eof_action=repeat"
+            roi = roi_filters(ctx['banner_encode'], overlay_y, banner.height, height)
             
-            for line in lines:
-                draw.text((text_x, text_y), line, font=font_head, fill=headline_color)
-                text_y += int(headline_fs * 1.3)
+        except Exception as e:
+            print(f"Design Generation Error: {e}")
+            traceback.print_exc()
+            return None
+    
+    print(f"Baking {local_filename}...")
+    # Encode next to the targets and rename on success, so a killed job never leaves a
+    # truncated file behind a valid processed_path
+    final_paths = [output_path] + [os.path.join(job_dir, name) for name in outputs.values()]
+    partial_paths = [f"{path}.part" for path in final_paths]
+    threads = ctx.get('ffmpeg_threads')
+
+    cmd = [
+        'ffmpeg', '-y', 
+        # Machine-readable progress on stdout (frame, fps, speed) instead of the stderr stats line
+        '-progress', 'pipe:1', '-nostats',
+        '-i', input_path,
+        *ffmpeg_inputs,
+        '-filter_complex', rendition_graph(composite, roi, probe, ctx['sprite']),
+        # Publish file: audio untouched. When several encodes share the box, cap each one so
+        # they don't oversubscribe the cores
+        '-map', '[pub]', '-map', '0:a?', '-c:a', 'copy',
+        *encoder_args(ctx['encode_profile'], threads=threads, roi=bool(roi)),
+        '-f', 'mp4', partial_paths[0],
+        '-map', '[pv]', '-map', '0:a?', *preview_args(threads), '-f', 'mp4', partial_paths[1],
+        '-map', '[poster]', *image_args(), partial_paths[2],
+    ]
+    if ctx['sprite']:
+        cmd += ['-map', '[sprite]', *image_args(), partial_paths[3]]
+    
+    trace.start('encode', bytes_in=probe.get('size') or os.path.getsize(input_path))
+    try:
+        result = subprocess.run(cmd, input=overlay_stdin, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        for partial_path, final_path in zip(partial_paths, final_paths):
+            os.replace(partial_path, final_path)
+        trace.stop(bytes_out=sum(os.path.getsize(path) for path in final_paths), renditions=len(final_paths),
+                   **parse_ffmpeg_progress(result.stdout.decode('utf-8', 'replace')))
+        print(f"Saved {output_filename} (+{', '.join(outputs.values())})")
+
+        updates['processed_path'] = output_filename
+        updates.update(outputs)
+        if not ctx['sprite']:
+            updates['sprite_path'] = None
+        updates['render_fingerprint'] = fingerprint
             
-    return img
+    except subprocess.CalledProcessError as e:
+        trace.stop(error=f"ffmpeg exit {e.returncode}")
+        print(f"FFmpeg failed: {e.stderr.decode()}")
+    except OSError as e:
+        # An output ffmpeg didn't write (e.g. no frame reached the poster)
+        trace.stop(error=str(e))
+        print(f"Rendition missing: {e}")
+    if not updates.get('processed_path'):
+        for partial_path in partial_paths:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+
+    # Counters are per process; the parent keeps the latest snapshot from each worker
+    updates['_asset_stats'] = (os.getpid(), ASSETS.stats())
+    return updates
+
+def check_duplicates(job_id, reels, ctx, index, workers):
+    """
+    Fingerprints each reel (ffmpeg decodes a few tiny frames, so threads are enough) and
+    matches it against the cross-job index, earlier reels of this job included. Runs in the
+    parent before any encode. Returns ({reel_id: (original_entry, distance)}, {reel_id: [stage]});
+    originals are added to the index.
+    """
+    def fingerprint_reel(reel):
+        trace = StageTrace()
+        _, input_path = resolve_input(reel, ctx)
+        if not input_path:
+            return None, None, []
+        try:
+            probe = cached_probe(input_path, reel.get('probe'))
+            if not probe:
+                return None, None, []
+            trace.start('dedup')
+            fp = cached_fingerprint(input_path, probe, reel.get('fingerprint'))
+            trace.stop(cached=fp is reel.get('fingerprint'))
+            return probe, fp, trace.finish()
+        except Exception as e:
+            trace.stop(error=str(e))
+            print(f"Fingerprint failed for {reel.get('id')}: {e}")
+            return None, None, trace.finish()
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers * 2, len(reels)))) as pool:
+        results = list(pool.map(fingerprint_reel, reels))
+
+    matches = {}
+    stages = {}
+    # Job order decides which copy is the original
+    for reel, (probe, fp, reel_stages) in zip(reels, results):
+        stages[reel['id']] = reel_stages
+        if not fp:
+            continue
+        # Stored so the worker's cached_probe and the next run's fingerprint are free
+        reel['probe'] = probe
+        reel['fingerprint'] = fp
+        key = DedupIndex.key(job_id, reel['id'])
+        match = index.find(fp, job_id, exclude_key=key, reel_id=reel['id'])
+        if match:
+            _, original, distance = match
+            matches[reel['id']] = (original, distance)
+        else:
+            index.add(job_id, reel, fp)
+    return matches, stages
 
-def process_batch(job_id):
-    base_dir = os.getcwd()
-    jobs_file = os.path.join(base_dir, "data", "jobs.json")
+def dedup_savings(duplicates, index, encode_totals):
+    """
+    Job report for config['duplicates']: counts, and the output bytes and encode seconds the
+    skipped reels would have cost (their original's, else this run's mean encode).
+    """
+    encode_totals = encode_totals or {}
+    count = encode_totals.get('count') or 0
+    mean_bytes = encode_totals.get('bytes_out', 0) / count if count else 0
+    mean_s = encode_totals.get('mean_wall_s') or 0
+    bytes_saved = 0
+    encode_s_saved = 0.0
+    skipped = [reel for reel in duplicates if reel['duplicate_of']['action'] == 'skipped']
+    for reel in skipped:
+        original = reel['duplicate_of']
+        entry = index.entries.get(DedupIndex.key(original['job_id'], original['reel_id'])) or {}
+        bytes_saved += entry.get('bytes_out') or mean_bytes
+        encode_s_saved += entry.get('encode_s') or mean_s
+    return {
+        'flagged': len(duplicates) - len(skipped),
+        'skipped': len(skipped),
+        'bytes_saved': int(bytes_saved),
+        'encode_s_saved': round(encode_s_saved, 2),
+    }
+
+def build_context(job_id, config, base_dir, workers=1, force=False):
+    """Per-job settings handed to every process_reel call (also used by preview.py)."""
     job_dir = os.path.join(base_dir, "public", "downloads", job_id)
     
     # Fallback Source Folder (Mock Data ID)
     SOURCE_JOB_ID = "0a4c50d9-b8c5-40ff-8ac4-b0449c6d446d"
     source_dir = os.path.join(base_dir, "public", "downloads", SOURCE_JOB_ID)
 
-    if not os.path.exists(jobs_file):
-        print("jobs.json not found")
-        return
-
-    with open(jobs_file, 'r') as f:
-        db = json.load(f)
-
-    job = db.get(job_id)
-    if not job:
-        print(f"Job {job_id} not found")
-        return
-
     # Parse Config
-    config = job.get('config', {})
     mode = config.get('mode', 'upload')
     
     # headerHeight slider was removed. We use Auto-Height or Default.
@@ -421,227 +612,209 @@ def process_batch(job_id):
     # Parse Vertical Correction
     vertical_correction = int(config.get('verticalCorrection', 0))
 
-    print(f"Processing Job {job_id} | Mode: {mode} | AutoDetect: {auto_detect}")
+    use_layout_cache = str(config.get('useLayoutCache', 'true')).lower() == 'true'
+
+    encode_profile = config.get('encodeProfile', DEFAULT_PROFILE)
+    banner_encode = config.get('bannerEncode', 'full')
+    if banner_encode == 'roi' and not roi_supported(encode_profile):
+        print(f"Encode profile '{encode_profile}' ignores ROI hints; bannerEncode=roi has no effect")
+
+    return {
+        'job_dir': job_dir,
+        'source_dir': source_dir,
+        'base_dir': base_dir,
+        'config': config,
+        'mode': mode,
+        'auto_detect': auto_detect,
+        'vertical_correction': vertical_correction,
+        # 'accurate' (seek + full-res), 'fast' (sequential decode, downscaled ROI) or
+        # 'projection' (vectorized row edge profiles)
+        'detection_mode': config.get('detectionMode', 'accurate'),
+        # Per-creator header envelopes shared across jobs (set useLayoutCache=false to always run full detection)
+        'layout_cache_path': os.path.join(base_dir, "data", "layout_cache.json") if use_layout_cache else None,
+        # Named encoder settings from encode_profiles.ENCODE_PROFILES
+        'encode_profile': encode_profile,
+        # 'full' or 'roi' (spend fewer bits outside the banner, see roi_filters)
+        'banner_encode': banner_encode,
+        # Re-encode even when a reel's fingerprint matches its existing output
+        'force': force,
+        # A single encode may use every core; only cap threads when encodes run side by side
+        'ffmpeg_threads': FFMPEG_THREADS_PER_WORKER if workers > 1 else None,
+        # Also write a thumbnail contact sheet next to the preview and poster
+        'sprite': str(config.get('thumbnailSprite', 'false')).lower() == 'true',
+        # Reposted clips: 'flag' marks them, 'skip' also leaves them out of the encode, 'off'
+        'duplicates': config.get('duplicates', 'flag'),
+    }
+
+def process_batch(job_id, workers=None, force=False, events_path=None):
+    """
+    Bakes every approved reel of a job. Progress goes to a JSON-lines event log
+    (data/jobs/<job_id>.events.jsonl unless `events_path` is given, '-' for stdout):
+    job_start, one 'reel' event per finished reel with its stage timings, and job_done
+    with per-stage totals.
+    """
+    base_dir = os.getcwd()
+    store = JobStore(base_dir)
+    job = store.load_job(job_id)
+    if not job:
+        print(f"Job {job_id} not found")
+        return
+    job.setdefault('id', job_id)
 
-    reels = job.get('reels', [])
-    processed_count = 0
+    layout_cache = LayoutCache(os.path.join(base_dir, "data", "layout_cache.json")).load()
 
-    for reel in reels:
-        # Check Status
-        if reel.get('status') != 'approved':
-            continue
+    if workers is None:
+        workers = default_worker_count()
+    workers = max(1, int(workers))
 
-        local_filename = reel.get('local_video_path')
-        
-        # Self-healing: If DB says no file, check if {id}.mp4 exists (legacy/manual fix)
-        if not local_filename:
-            guessed_filename = f"{reel['id']}.mp4"
-            if os.path.exists(os.path.join(job_dir, guessed_filename)):
-                print(f"Self-healed: Found {guessed_filename} despite missing DB entry")
-                local_filename = guessed_filename
-        
-        if not local_filename:
-            print(f"Skipping {reel['id']} - no local file defined")
-            continue
-            
-        # Try finding the file
-        input_path = os.path.join(job_dir, local_filename)
-        if not os.path.exists(input_path):
-            # FALLBACK to source
-            fallback_path = os.path.join(source_dir, local_filename)
-            if os.path.exists(fallback_path):
-                print(f"Found input in fallback source: {local_filename}")
-                input_path = fallback_path
-            else:
-                print(f"Input file missing: {input_path}")
-                continue
-
-        dims = get_video_dimensions(input_path)
-        if not dims: continue
-        width, height = dims
-        
-        # Prepare Overlay
-        temp_overlay_path = None
-        filter_complex = ""
-        ffmpeg_inputs = []
-        
-        output_filename = f"processed_{local_filename}"
-        output_path = os.path.join(job_dir, output_filename)
-
-        if mode == 'upload':
-            # Check Overlay
-            overlay_source = os.path.join(job_dir, "header_overlay.png")
-            if not os.path.exists(overlay_source):
-                print("Header overlay missing")
-                continue
-                
-            # Determine Geometry
-            final_y = 0
-            if auto_detect:
-                 # Auto-Height for Upload Mode? Just use detected header height.
-                 detected_y, detected_h, _ = detect_header_height(input_path, height)
-                 final_y = detected_y
-                 target_h = detected_h
-            else:
-                 # Fallback default
-                 target_h = int(height * 0.15)
-            
-            # Simple Crop & Scale of the uploaded image
-            filter_complex = (
-                f"[1:v]scale={width}:{target_h}:force_original_aspect_ratio=increase,"
-                f"crop={width}:{target_h}[header];"
-                f"[0:v][header]overlay=0:{final_y}:shortest=1"
-            )
-            ffmpeg_inputs = ['-i', overlay_source]
-
-        else: # DESIGN Mode
-            try:
-                layout_override = None
-                
-                # Default / Fallback (if Auto is OFF)
-                final_y = 0
-                target_h = int(height * 0.15) # Default 15%
-                content_padding = int(width * 0.04)
-                
-                if auto_detect:
-                    show_headline_raw = config.get('showHeadline', True)
-                    show_headline = str(show_headline_raw).lower() == 'true'
-                    detected_y, detected_h, detected_padding = detect_header_height(input_path, height, show_headline=show_headline)
-                    
-                    # LOGIC: 
-                    # 1. We MUST cover the detected original header (detected_h).
-                    # 2. We MUST fit our new design content.
-                    
-                    # Calculate Design Content Height requirements
-                    # (This is rough duplication of logic inside generate_design_overlay, but safest way)
-                    scale_factor = width / 380.0
-                    logo_percent = config.get('logoSize', 15)
-                    logo_size_px = int(width * (logo_percent / 100.0))
-                    name_fs = int(config.get('nameFontSize', 18) * scale_factor)
-                    handle_fs = int(config.get('handleFontSize', 14) * scale_factor)
-                    headline_fs = int(config.get('headlineFontSize', 24) * scale_factor)
-                    padding = int(width * 0.04)
-                    
-                    # Height needed for Logo + Name row
-                    row1_h = max(logo_size_px, int(name_fs * 1.2) + int(handle_fs * 1.2))
-                    
-                    # Height needed for Headline
-                    show_headline_raw = config.get('showHeadline', True)
-                    show_headline = str(show_headline_raw).lower() == 'true'
-                    text_h = 0
-                    if show_headline:
-                        # Account for both manual and AI modes in height calculation
-                        headline_mode = config.get('headlineMode', 'manual')
-                        h_text = config.get('manualHeadline', "") if headline_mode == 'manual' else (reel.get('generated_headline') or "AI Headline Pending...")
-                        
-                        if h_text:
-                             avg_char_width = headline_fs * 0.5
-                             max_chars = int((width - (padding * 2)) / avg_char_width)
-                    # Exact layout math from generate_design_overlay:
-                    # pad_v = 12*scale
-                    # gap = 8*scale
-                    
-                    pad_v = int(12 * scale_factor)
-                    gap_v = int(8 * scale_factor)
-                    
-                    if text_h > 0:
-                        # Top Pad + Logo + Middle Pad + Gap + Text + Bottom Pad
-                        extra_space = (pad_v * 3) + gap_v
-                    else:
-                        # Top Pad + Logo + Bottom Pad
-                        extra_space = (pad_v * 2)
-                        
-                    design_min_h = row1_h + text_h + extra_space
-
-                    # The Final Height of the Black Bar
-                    # Must be at least detected_h (to cover old) and at least design_min_h (to fit new)
-                    final_h = max(detected_h, design_min_h)
-                    
-                    # Cap at 35% to be safe? Or trust the inputs?
-                    # User asked for "Dependent on header size", so trust max.
-                    
-                    print(f"Auto-Height: Detected Old={detected_h}px, Needed New={int(design_min_h)}px -> Final={int(final_h)}px")
-
-                    final_y = detected_y
-                    target_h = int(final_h)
-                    content_padding = detected_padding # Use the tight padding from detector
-
-                # APPLY VERTICAL CORRECTION (Global Shift)
-                final_y += vertical_correction
-                
-                # Ensure we don't go off-screen (optional, but good safety)
-                # if final_y < 0: final_y = 0 # Allow negative if user wants to push it up? Maybe.
-
-                # Save computed layout to DB for Frontend Preview
-                reel['layout'] = {
-                    'y': int(final_y),
-                    'h': int(target_h),
-                    'correction': vertical_correction,
-                    'width': width,
-                    'height': height
-                }
-
-                layout_override = (final_y, target_h, content_padding)
-                    
-                overlay_img = generate_design_overlay(job_dir, config, width, height, reel, base_dir, layout_override=layout_override)
-                
-                temp_overlay_path = os.path.join(job_dir, f"temp_overlay_{reel['id']}.png")
-                overlay_img.save(temp_overlay_path)
-                
-                # Overlay is full frame? No, generate_design_overlay creates full frame image
-                # So we just overlay at 0:0
-                filter_complex = "[0:v][1:v]overlay=0:0:shortest=1"
-                ffmpeg_inputs = ['-loop', '1', '-i', temp_overlay_path]
-                
-            except Exception as e:
-                print(f"Design Generation Error: {e}")
-                traceback.print_exc()
-                continue
-        
-        print(f"Baking {local_filename}...")
-        
-        cmd = [
-            'ffmpeg', '-y', 
-            '-i', input_path,
-            *ffmpeg_inputs,
-            '-filter_complex', filter_complex,
-            '-c:a', 'copy',
-            '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p',
-             output_path
-        ]
-        
-        try:
-            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
-            print(f"Saved {output_filename}")
-            
-            if temp_overlay_path and os.path.exists(temp_overlay_path):
-                os.remove(temp_overlay_path)
+    ctx = build_context(job_id, job.get('config', {}), base_dir, workers=workers, force=force)
+    mode = ctx['mode']
+
+    print(f"Processing Job {job_id} | Mode: {mode} | AutoDetect: {ctx['auto_detect']} | Workers: {workers} | Profile: {ctx['encode_profile']}")
 
-            reel['processed_path'] = output_filename
+    reels = job.get('reels', [])
+    pending = [reel for reel in reels if reel.get('status') == 'approved']
+    processed_count = 0
+    skipped_count = 0
+    failed_count = 0
+    asset_stats = {}
+
+    # Reposts: fingerprint before encoding, flag (or skip) near-identical reels
+    dedup_index = None
+    dedup_stages = {}
+    duplicates = []
+    if ctx['duplicates'] in ('flag', 'skip') and pending:
+        if not DEDUP_AVAILABLE:
+            print("numpy not installed. Duplicate detection disabled.")
+        else:
+            dedup_index = DedupIndex(os.path.join(base_dir, "data", "reel_hashes.json")).load()
+            matches, dedup_stages = check_duplicates(job_id, pending, ctx, dedup_index, workers)
+            for reel in pending:
+                match = matches.get(reel['id'])
+                if not match:
+                    reel.pop('duplicate_of', None)
+                    continue
+                original, distance = match
+                # duplicate_ok: kept by hand despite the match, so it's only flagged
+                action = 'skipped' if ctx['duplicates'] == 'skip' and not reel.get('duplicate_ok') else 'flagged'
+                reel['duplicate_of'] = {'job_id': original['job_id'], 'reel_id': original['reel_id'],
+                                        'username': original.get('username'), 'distance': distance, 'action': action}
+                duplicates.append(reel)
+                print(f"Duplicate: {reel['id']} ~ {original['job_id'][:8]}/{original['reel_id']} (distance {distance}, {action})")
+            dedup_index.save()
+            # Skipped reposts keep the user's approval; they're only left out of the encode
+            pending = [reel for reel in pending if (reel.get('duplicate_of') or {}).get('action') != 'skipped']
+            store.save_job(job)
+
+    # Download zip filled as reels finish (see job_archive.py). The previous one holds outputs
+    # this run replaces, so it goes even if nothing succeeds this time
+    archive = None
+    if pending:
+        discard_archive(job, ctx['job_dir'])
+        store.save_job(job)
+        archive = JobArchive(ctx['job_dir'], job_id)
+
+    events = EventLog(events_path or os.path.join(store.jobs_dir, f"{job_id}.events.jsonl"))
+    totals = StageTotals()
+    job_start = time.perf_counter()
+    job_cpu_start = time.process_time()
+    events.emit('job_start', job_id=job_id, total=len(pending), workers=workers, mode=mode,
+                profile=ctx['encode_profile'])
+
+    def apply_updates(reel, updates):
+        # Only this (parent) process writes the job file, so incremental saves never race
+        nonlocal processed_count, skipped_count, failed_count
+        stages = dedup_stages.get(reel['id'], []) + (updates.pop('_trace', []) if updates else [])
+        if not updates:
+            failed_count += 1
+            report_reel(reel, stages, 'failed')
+            return
+        pid, stats = updates.pop('_asset_stats', (None, None))
+        if pid is not None:
+            asset_stats[pid] = stats
+        observation = updates.pop('_layout_observation', None)
+        if observation:
+            layout_cache.record(*observation)
+            layout_cache.save()
+        skipped = updates.pop('_skipped', False)
+        reel.update(updates)
+        if dedup_index is not None and updates.get('processed_path'):
+            encode = next((record for record in stages if record['stage'] == 'encode'), {})
+            dedup_index.mark_processed(job_id, reel['id'], encode.get('bytes_out'), encode.get('wall_s'))
+        if skipped:
+            skipped_count += 1
+        elif updates.get('processed_path'):
             processed_count += 1
-            
+        else:
+            failed_count += 1
+        if updates.get('processed_path') and archive:
+            archive_start = time.perf_counter()
+            output_path = os.path.join(ctx['job_dir'], updates['processed_path'])
+            if archive.add(reel, output_path):
+                stages.append({'stage': 'archive', 'wall_s': round(time.perf_counter() - archive_start, 4),
+                               'bytes_in': os.path.getsize(output_path)})
+        if updates.get('processed_path'):
             # Save incrementally
-            # Atomic Write
-            temp_file = f"{jobs_file}.tmp.{os.getpid()}"
-            with open(temp_file, 'w') as f:
-                json.dump(db, f, indent=2)
-            os.replace(temp_file, jobs_file)
-                
-        except subprocess.CalledProcessError as e:
-            print(f"FFmpeg failed: {e.stderr.decode()}")
+            save_start = time.perf_counter()
+            store.save_job(job)
+            stages.append({'stage': 'db_write', 'wall_s': round(time.perf_counter() - save_start, 4)})
+        report_reel(reel, stages, 'skipped' if skipped else 'processed' if updates.get('processed_path') else 'failed')
+
+    def report_reel(reel, stages, outcome):
+        totals.add(stages)
+        done = processed_count + skipped_count + failed_count
+        events.emit('reel', reel_id=reel.get('id'), outcome=outcome, done=done, total=len(pending), stages=stages)
+
+    if workers == 1 or len(pending) <= 1:
+        for reel in pending:
+            apply_updates(reel, process_reel(reel, ctx))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+            futures = {pool.submit(process_reel, reel, ctx): reel for reel in pending}
+            for future in as_completed(futures):
+                reel = futures[future]
+                try:
+                    updates = future.result()
+                except Exception as e:
+                    print(f"Worker failed on {reel.get('id')}: {e}")
+                    updates = None
+                apply_updates(reel, updates)
+
+    if archive and archive.entries:
+        job['archive'] = archive.close(ctx['config'])
+        print(f"Archive ready: {job['archive']['file']} ({job['archive']['reels']} reels)")
+    elif archive:
+        archive.abort()
+
+    if dedup_index is not None:
+        dedup_index.save()
+        job['dedup'] = dedup_savings(duplicates, dedup_index, totals.summary().get('encode'))
+        print(f"Duplicates: {job['dedup']['flagged']} flagged, {job['dedup']['skipped']} skipped, "
+              f"saved {job['dedup']['bytes_saved'] / 1e6:.1f} MB / {job['dedup']['encode_s_saved']:.1f}s encode")
 
     # Update Job Status (Global)
     job['status'] = 'completed'
-    # Atomic Write
-    temp_file = f"{jobs_file}.tmp.{os.getpid()}"
-    with open(temp_file, 'w') as f:
-        json.dump(db, f, indent=2)
-    os.replace(temp_file, jobs_file)
+    store.save_job(job)
 
-    print(f"Batch processing complete. {processed_count} videos processed.")
+    summary = totals.summary()
+    events.emit('job_done', job_id=job_id, processed=processed_count, skipped=skipped_count, failed=failed_count,
+                dedup=job.get('dedup') if dedup_index is not None else None,
+                wall_s=round(time.perf_counter() - job_start, 3), parent_cpu_s=round(time.process_time() - job_cpu_start, 3),
+                stages=summary, dominant_stage=totals.dominant())
+    events.close()
+
+    print(f"Batch processing complete. {processed_count} videos processed, {skipped_count} already up to date, {failed_count} failed.")
+    print(f"Asset cache: {format_stats(merge_stats(asset_stats.values()))}")
+    print(f"Stage time: {format_totals(summary)}")
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python3 process_batch.py <job_id>")
-    else:
-        process_batch(sys.argv[1])
+    parser = argparse.ArgumentParser(usage="python3 process_batch.py <job_id> [--workers N] [--force] [--events PATH]")
+    parser.add_argument('job_id')
+    parser.add_argument('--workers', type=int, default=None,
+                        help=f"Reels to bake in parallel (default: cores / {FFMPEG_THREADS_PER_WORKER})")
+    parser.add_argument('--force', action='store_true',
+                        help="Re-encode every approved reel, ignoring stored fingerprints")
+    parser.add_argument('--events', default=None,
+                        help="JSON-lines progress log (default data/jobs/<job_id>.events.jsonl, '-' for stdout)")
+    args = parser.parse_args()
+    process_batch(args.job_id, workers=args.workers, force=args.force, events_path=args.events)
@@ -0,0 +1,135 @@
+import os
+import sys
+import json
+import time
+
+try:
+    import resource
+except ImportError:
+    # Windows: child CPU time isn't available
+    resource = None
+
+# Order of per-reel stages in events and summaries
+STAGES = ['probe', 'dedup', 'detect', 'overlay', 'encode', 'archive', 'db_write']
+
+def children_cpu_time():
+    """CPU seconds used by waited-for child processes (ffmpeg, ffprobe) of this process."""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+class StageTrace:
+    """
+    Wall and CPU time per pipeline stage for one reel. start() closes the previous stage,
+    so early returns only need finish(). Runs in pool workers; the result travels back
+    as plain dicts.
+    """
+
+    def __init__(self):
+        self.stages = []
+        self._open = None
+
+    def start(self, name, **fields):
+        self.stop()
+        self._open = (name, time.perf_counter(), time.process_time(), children_cpu_time(), fields)
+
+    def stop(self, **fields):
+        if not self._open:
+            return
+        name, wall, cpu, child_cpu, open_fields = self._open
+        self._open = None
+        self.stages.append({
+            'stage': name,
+            'wall_s': round(time.perf_counter() - wall, 4),
+            'cpu_s': round(time.process_time() - cpu, 4),
+            'child_cpu_s': round(children_cpu_time() - child_cpu, 4),
+            **open_fields,
+            **fields,
+        })
+
+    def finish(self):
+        self.stop()
+        return self.stages
+
+def parse_ffmpeg_progress(text):
+    """
+    Final values from ffmpeg's `-progress` key=value output: frames, fps, speed and
+    encoded duration. Missing or N/A values are left out.
+    """
+    last = {}
+    for line in text.splitlines():
+        key, sep, value = line.strip().partition('=')
+        if sep:
+            last[key] = value.strip()
+    result = {}
+    for key, name, cast in (('frame', 'frames', int), ('fps', 'fps', float), ('out_time_us', 'out_time_us', int),
+                            ('total_size', 'size', int)):
+        try:
+            result[name] = cast(last[key])
+        except (KeyError, ValueError):
+            pass
+    speed = last.get('speed', '').rstrip('x')
+    try:
+        result['speed'] = float(speed)
+    except ValueError:
+        pass
+    return result
+
+class EventLog:
+    """
+    Append-only JSON-lines event stream for one job (written by the parent process only).
+    path '-' writes to stdout; None disables events.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        if path == '-':
+            self._file = sys.stdout
+        elif path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            # Line buffered so a tailing reader sees each event as it happens
+            self._file = open(path, 'a', buffering=1)
+
+    def emit(self, event, **fields):
+        if not self._file:
+            return
+        self._file.write(json.dumps({'event': event, 'ts': round(time.time(), 3), **fields}) + "\n")
+        self._file.flush()
+
+    def close(self):
+        if self._file and self._file is not sys.stdout:
+            self._file.close()
+        self._file = None
+
+class StageTotals:
+    """Job-level roll-up of reel stage records."""
+
+    def __init__(self):
+        self.totals = {}
+
+    def add(self, stages):
+        for record in stages:
+            total = self.totals.setdefault(record['stage'], {'count': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'child_cpu_s': 0.0,
+                                                             'bytes_in': 0, 'bytes_out': 0})
+            total['count'] += 1
+            for key in ('wall_s', 'cpu_s', 'child_cpu_s', 'bytes_in', 'bytes_out'):
+                total[key] += record.get(key) or 0
+
+    def summary(self):
+        ordered = sorted(self.totals.items(), key=lambda item: STAGES.index(item[0]) if item[0] in STAGES else len(STAGES))
+        result = {}
+        for name, total in ordered:
+            result[name] = {key: round(value, 3) if isinstance(value, float) else value for key, value in total.items()}
+            result[name]['mean_wall_s'] = round(total['wall_s'] / total['count'], 3) if total['count'] else None
+        return result
+
+    def dominant(self):
+        """Stage with the most wall time, or None."""
+        if not self.totals:
+            return None
+        return max(self.totals, key=lambda name: self.totals[name]['wall_s'])
+
+def format_totals(summary):
+    return ", ".join(f"{name} {s['wall_s']:.2f}s/{s['count']}" for name, s in summary.items()) or "no stages"
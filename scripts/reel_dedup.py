@@ -0,0 +1,227 @@
+"""
+Perceptual fingerprints for spotting reposted reels, within a job and across jobs.
+
+A fingerprint is a 64-bit pHash (DCT of a 32x32 grayscale frame) for each of a few frames
+sampled at fixed fractions of the clip, plus its duration. Two reels are duplicates when
+their durations agree and the mean Hamming distance between aligned frame hashes is small;
+re-encodes, rescaling and watermark-free reposts all stay well under the threshold.
+
+process_batch fingerprints the approved reels before encoding (config['duplicates']:
+'flag' (default), 'skip' or 'off') and keeps data/reel_hashes.json up to date. Matches are
+recorded as reel['duplicate_of']; a reel with duplicate_ok set ("Keep anyway" on the job page,
+keepDuplicateReel in app/actions.ts) is only flagged, never skipped.
+
+Standalone (lists duplicates in a job without changing anything):
+
+    python3 scripts/reel_dedup.py <job_id>
+
+Run from the project root.
+"""
+import os
+import sys
+import subprocess
+import json
+from datetime import datetime
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Bump when sampling or hashing changes; older fingerprints are recomputed
+HASH_VERSION = 1
+# Where in the clip frames are sampled (fractions of the duration); avoids intros and end cards
+SAMPLE_POINTS = (0.15, 0.38, 0.62, 0.85)
+HASH_FRAME_SIZE = 32
+# Mean differing bits (of 64) per sampled frame still counted as the same clip
+MAX_DISTANCE = 10
+# Seconds two durations may differ (trims, re-muxing)
+DURATION_TOLERANCE = 0.5
+
+_dct = None
+
+def dct_matrix(n):
+    """Orthonormal DCT-II basis as an n x n matrix."""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+def sample_frames(input_path, duration):
+    """Grayscale HASH_FRAME_SIZE² frames at SAMPLE_POINTS, as an (N, size, size) float array."""
+    size = HASH_FRAME_SIZE
+    frames = []
+    for point in SAMPLE_POINTS:
+        cmd = [
+            'ffmpeg', '-v', 'error',
+            '-ss', f"{(duration or 0) * point:.3f}", '-i', input_path,
+            '-frames:v', '1',
+            '-vf', f"scale={size}:{size}:flags=area,format=gray",
+            '-f', 'rawvideo', 'pipe:1'
+        ]
+        raw = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE).stdout
+        if len(raw) < size * size:
+            raise ValueError(f"no frame at {point:.0%}")
+        frames.append(np.frombuffer(raw[:size * size], dtype=np.uint8))
+    return np.stack(frames).reshape(len(frames), size, size).astype(np.float32)
+
+def phash_frames(frames):
+    """64-bit pHash of every frame at once: 8x8 low-frequency DCT block against its median."""
+    global _dct
+    if _dct is None:
+        _dct = dct_matrix(HASH_FRAME_SIZE).astype(np.float32)
+    coeffs = _dct @ frames @ _dct.T
+    low = coeffs[:, :8, :8].reshape(len(frames), 64)
+    # The DC term only tracks overall brightness; leave it out of the median
+    bits = low > np.median(low[:, 1:], axis=1, keepdims=True)
+    return np.packbits(bits, axis=1).view('>u8').ravel()
+
+def fingerprint(input_path, probe):
+    """Fingerprint for the reel record: hashes as hex strings, stamped with the file's probe."""
+    hashes = phash_frames(sample_frames(input_path, probe.get('duration')))
+    return {
+        'v': HASH_VERSION,
+        'source': probe.get('source'),
+        'size': probe.get('size'),
+        'mtime': probe.get('mtime'),
+        'duration': probe.get('duration'),
+        'hashes': [f"{int(h):016x}" for h in hashes],
+    }
+
+def cached_fingerprint(input_path, probe, cached):
+    """Reuses the fingerprint stored on the reel while the file (per its probe stamp) is unchanged."""
+    if (cached and cached.get('v') == HASH_VERSION
+            and all(cached.get(key) == probe.get(key) for key in ('source', 'size', 'mtime'))):
+        return cached
+    return fingerprint(input_path, probe)
+
+def hash_matrix(hash_lists):
+    return np.array([[int(h, 16) for h in hashes] for hashes in hash_lists], dtype=np.uint64)
+
+def mean_distances(candidates, query):
+    """Mean per-frame Hamming distance of each row of `candidates` (C, N uint64) to `query` (N)."""
+    xor = np.ascontiguousarray(candidates ^ query)
+    return np.unpackbits(xor.view(np.uint8), axis=1).sum(axis=1) / query.shape[0]
+
+class DedupIndex:
+    """
+    Fingerprints of reels from every job, keyed "<job_id>/<reel_id>". An entry only counts
+    as an original for other jobs once it has been encoded ('processed'); within a job the
+    earlier reel wins. Only the batch parent writes it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+        return self
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Atomic Write
+        temp_file = f"{self.path}.tmp.{os.getpid()}"
+        with open(temp_file, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(temp_file, self.path)
+
+    @staticmethod
+    def key(job_id, reel_id):
+        return f"{job_id}/{reel_id}"
+
+    def add(self, job_id, reel, fp):
+        key = self.key(job_id, reel['id'])
+        previous = self.entries.get(key) or {}
+        self.entries[key] = {
+            'job_id': job_id,
+            'reel_id': reel['id'],
+            'username': reel.get('username'),
+            'duration': fp.get('duration'),
+            'hashes': fp['hashes'],
+            # Keep the encode record while the video is the same
+            'processed': previous.get('processed', False) if previous.get('hashes') == fp['hashes'] else False,
+            'bytes_out': previous.get('bytes_out'),
+            'encode_s': previous.get('encode_s'),
+            'indexed_at': datetime.now().isoformat(),
+        }
+
+    def mark_processed(self, job_id, reel_id, bytes_out=None, encode_s=None):
+        entry = self.entries.get(self.key(job_id, reel_id))
+        if entry:
+            entry['processed'] = True
+            # Up-to-date reels weren't encoded this run; keep what the last encode recorded
+            if bytes_out is not None:
+                entry['bytes_out'] = bytes_out
+            if encode_s is not None:
+                entry['encode_s'] = encode_s
+
+    def find(self, fp, job_id, exclude_key=None, reel_id=None):
+        """
+        Closest original within MAX_DISTANCE as (key, entry, distance), or None. reel_id: the
+        query reel's own id; the same reel scraped again into another job is not a repost of itself.
+        """
+        duration = fp.get('duration') or 0
+        candidates = [
+            (key, entry) for key, entry in self.entries.items()
+            if key != exclude_key
+            and (reel_id is None or entry.get('reel_id') != reel_id)
+            and (entry.get('processed') or entry.get('job_id') == job_id)
+            and len(entry.get('hashes') or ()) == len(fp['hashes'])
+            and abs((entry.get('duration') or 0) - duration) <= DURATION_TOLERANCE
+        ]
+        if not candidates:
+            return None
+        distances = mean_distances(hash_matrix([entry['hashes'] for _, entry in candidates]),
+                                   hash_matrix([fp['hashes']])[0])
+        best = int(np.argmin(distances))
+        if distances[best] > MAX_DISTANCE:
+            return None
+        key, entry = candidates[best]
+        return key, entry, round(float(distances[best]), 2)
+
+def main():
+    from job_store import JobStore
+    from media_probe import cached_probe
+
+    if len(sys.argv) != 2:
+        print("Usage: python3 scripts/reel_dedup.py <job_id>")
+        sys.exit(2)
+    if not NUMPY_AVAILABLE:
+        print("numpy not installed", file=sys.stderr)
+        sys.exit(1)
+    job_id = sys.argv[1]
+    base_dir = os.getcwd()
+    job = JobStore(base_dir).load_job(job_id)
+    if not job:
+        print(f"Job {job_id} not found", file=sys.stderr)
+        sys.exit(1)
+
+    # Read-only: compare against a copy of the index, adding this job's reels as we go
+    index = DedupIndex(os.path.join(base_dir, "data", "reel_hashes.json")).load()
+    job_dir = os.path.join(base_dir, "public", "downloads", job_id)
+    for reel in job.get('reels', []):
+        input_path = os.path.join(job_dir, reel.get('local_video_path') or f"{reel['id']}.mp4")
+        if not os.path.exists(input_path):
+            continue
+        probe = cached_probe(input_path, reel.get('probe'))
+        if not probe:
+            continue
+        fp = cached_fingerprint(input_path, probe, reel.get('fingerprint'))
+        key = DedupIndex.key(job_id, reel['id'])
+        match = index.find(fp, job_id, exclude_key=key, reel_id=reel['id'])
+        if match:
+            _, original, distance = match
+            print(f"{reel['id']}: duplicate of {original['job_id']}/{original['reel_id']} "
+                  f"(@{original.get('username')}, distance {distance})")
+        else:
+            index.add(job_id, reel, fp)
+
+if __name__ == "__main__":
+    main()
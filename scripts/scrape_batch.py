@@ -0,0 +1,190 @@
+"""
+Scrapes many profiles in one process over a single logged-in Instaloader session.
+
+Usage: python3 scripts/scrape_batch.py <list_file|-> [--out-dir DIR] [--count N] [--profiles N]
+                                       [--workers N] [--rate R] [--select feed|top] [--ndjson]
+
+Each line of the list is "<username|url> [output_dir] [max_count]" (blank lines and # comments
+are skipped). By default every profile becomes a job in the app, as if it had been scraped from
+the home page: a data/jobs/<job_id>.json record whose media sits in public/downloads/<job_id>,
+ready to review and process. Lines with an output_dir, and every line when --out-dir is given,
+get no job; their reels are written to <output_dir>/reels.json (output_dir defaults to
+<out-dir>/<username>), the same array scrape_profile.py prints.
+
+Interpreter startup, the instaloader import, the Instaloader instance and cookies.txt are paid
+once per batch. Metadata paging is serialized on the shared context while media downloads from
+up to --profiles profiles overlap, all drawing from one --rate budget and connection pool.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import uuid
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from job_store import JobStore
+from media_download import DEFAULT_RATE, DEFAULT_WORKERS, RateLimiter, pooled_session
+from scrape_profile import (DEFAULT_WINDOW, SCORERS, default_serializer, emit_event, make_loader,
+                            normalize_username, scrape_profile)
+
+DEFAULT_PROFILES = 2
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+
+def read_targets(source, out_dir, default_count):
+    """
+    (username, output_dir, max_count) per line, first occurrence of each username only.
+    output_dir is None when the profile should become an app job (no out_dir, none on the line).
+    """
+    lines = sys.stdin if source == '-' else open(source)
+    targets = []
+    seen = set()
+    try:
+        for line in lines:
+            parts = line.split('#', 1)[0].split()
+            if not parts:
+                continue
+            username = normalize_username(parts[0])
+            if not username or username.lower() in seen:
+                continue
+            seen.add(username.lower())
+            output_dir = parts[1] if len(parts) > 1 else os.path.join(out_dir, username) if out_dir else None
+            try:
+                max_count = int(parts[2]) if len(parts) > 2 else default_count
+            except ValueError:
+                max_count = default_count
+            targets.append((username, output_dir, max_count))
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+    return targets
+
+def write_results(output_dir, reels):
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, "reels.json")
+    # Atomic Write
+    temp_file = f"{path}.tmp.{os.getpid()}"
+    with open(temp_file, 'w') as f:
+        json.dump(reels, f, indent=2, default=default_serializer)
+    os.replace(temp_file, path)
+    return path
+
+def new_job(store, username):
+    """Saves an empty job for the profile, shaped like the ones createScrapeJob (app/actions.ts) makes."""
+    job = {
+        'id': str(uuid.uuid4()),
+        'url': f"https://www.instagram.com/{username}/",
+        # Same format as JavaScript's toISOString, so job listings sort these with the rest
+        'createdAt': datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+        'status': 'scraping',
+        'reels': [],
+    }
+    store.save_job(job)
+    return job
+
+def local_reel(reel, job_id):
+    """Points the reel's media at the job's files under /downloads, like createScrapeJob's toLocalReel."""
+    local = dict(reel, status='approved')
+    if reel.get('local_video_path'):
+        local['url'] = local['playable_url'] = f"/downloads/{job_id}/{os.path.basename(reel['local_video_path'])}"
+    if reel.get('local_thumb_path'):
+        local['thumbnail'] = f"/downloads/{job_id}/{os.path.basename(reel['local_thumb_path'])}"
+    return local
+
+def scrape_batch(targets, profiles=DEFAULT_PROFILES, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE, ndjson=False, **options):
+    """
+    Scrapes each (username, output_dir, max_count) target with a shared loader, session and
+    rate limiter; a target without output_dir becomes a job in the app's JobStore. `options`
+    are passed through to scrape_profile. Returns one summary per target.
+    """
+    L = make_loader()
+    session = pooled_session(L.context._session, workers=workers * max(1, profiles))
+    limiter = RateLimiter(rate)
+    metadata_lock = threading.Lock()
+    store = JobStore(base_dir)
+
+    def run(target):
+        username, output_dir, max_count = target
+        start = time.perf_counter()
+        job = None
+        if output_dir is None:
+            job = new_job(store, username)
+            output_dir = os.path.join(base_dir, "public", "downloads", job['id'])
+        try:
+            reels = scrape_profile(username, output_dir, max_count, workers=workers, rate=rate,
+                                   L=L, session=session, limiter=limiter, metadata_lock=metadata_lock, **options)
+            results_path = None if job else write_results(output_dir, reels)
+            error = None if reels else "No reels found"
+        except Exception as e:
+            reels, results_path, error = [], None, str(e)
+        if job:
+            job['reels'] = [local_reel(reel, job['id']) for reel in reels]
+            if error:
+                job['status'] = 'failed'
+                job['error'] = error
+            else:
+                del job['status']
+            store.save_job(job)
+        return {
+            "username": username,
+            "job_id": job['id'] if job else None,
+            "output_dir": output_dir,
+            "results": results_path,
+            "count": len(reels),
+            "seconds": round(time.perf_counter() - start, 2),
+            "error": error,
+        }
+
+    summaries = []
+    with ThreadPoolExecutor(max_workers=max(1, profiles)) as pool:
+        futures = [pool.submit(run, target) for target in targets]
+        for future in as_completed(futures):
+            summary = future.result()
+            summaries.append(summary)
+            if ndjson:
+                emit_event("profile", **summary)
+            else:
+                status = summary["error"] or f"{summary['count']} reels"
+                sys.stderr.write(f"{summary['username']}: {status} in {summary['seconds']}s\n")
+    return summaries
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', help="File with one profile per line, or - for stdin")
+    parser.add_argument('--out-dir', help="Write <out-dir>/<username>/reels.json instead of creating app jobs")
+    parser.add_argument('--count', type=int, default=12, help="Reels per profile unless the line says otherwise")
+    parser.add_argument('--profiles', type=int, default=DEFAULT_PROFILES, help="Profiles in flight at once")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Concurrent media downloads per profile")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help="Max download requests per second, whole batch")
+    parser.add_argument('--no-index', action='store_true', help="Ignore the per-username shortcode index")
+    parser.add_argument('--new-only', action='store_true', help="Only return posts newer than the last scrape")
+    parser.add_argument('--select', choices=['feed', 'top'], default='feed')
+    parser.add_argument('--window', type=int, default=DEFAULT_WINDOW)
+    parser.add_argument('--score', choices=sorted(SCORERS), default='default')
+    parser.add_argument('--ndjson', action='store_true', help="Stream one event per finished profile")
+    args = parser.parse_args()
+
+    targets = read_targets(args.source, args.out_dir, args.count)
+    if not targets:
+        print("No profiles given")
+        sys.exit(2)
+
+    start = time.perf_counter()
+    summaries = scrape_batch(targets, profiles=args.profiles, workers=args.workers, rate=args.rate, ndjson=args.ndjson,
+                             use_index=not args.no_index, new_only=args.new_only,
+                             select=args.select, window=args.window, score=args.score)
+    elapsed = round(time.perf_counter() - start, 2)
+    failed = sum(1 for s in summaries if s["error"])
+
+    if args.ndjson:
+        emit_event("done", profiles=len(summaries), failed=failed, seconds=elapsed)
+    else:
+        print(json.dumps({"profiles": summaries, "failed": failed, "seconds": elapsed}, indent=2))
+    sys.exit(1 if failed == len(summaries) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import os
+import json
+import shutil
+import hashlib
+from datetime import datetime
+
+# Consecutive already-indexed reels before we stop paging (tolerates a few pinned posts)
+STOP_AFTER_KNOWN = 3
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def link_or_copy(src, dest):
+    """Hard-links src to dest (no extra disk, no download), copying across filesystems."""
+    if os.path.abspath(src) == os.path.abspath(dest):
+        return
+    if os.path.exists(dest):
+        os.remove(dest)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
+
+class ScrapeIndex:
+    """
+    Per-username record of scraped shortcodes: where their media lives on disk, the video
+    hash and the reel metadata, so re-scrapes can stop paging early and link existing files
+    into new job dirs instead of downloading them again.
+    Stored as data/scrape_index/<username>.json.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.data = {"shortcodes": {}, "last_scrape": None, "newest_taken_at": None}
+
+    @classmethod
+    def load(cls, index_dir, username):
+        index = cls(os.path.join(index_dir, f"{username.lower()}.json"))
+        try:
+            with open(index.path, 'r') as f:
+                index.data.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+        return index
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Atomic Write
+        temp_file = f"{self.path}.tmp.{os.getpid()}"
+        with open(temp_file, 'w') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(temp_file, self.path)
+
+    @property
+    def last_scrape(self):
+        return self.data.get("last_scrape")
+
+    def lookup(self, shortcode):
+        """Index entry whose video file still exists with the recorded size, else None."""
+        entry = self.data["shortcodes"].get(shortcode)
+        if not entry:
+            return None
+        video = entry.get("video")
+        try:
+            if not video or os.path.getsize(video) != entry.get("video_size"):
+                return None
+        except OSError:
+            return None
+        return entry
+
+    def is_newer(self, taken_at):
+        """True if a post taken at `taken_at` (ISO string) is newer than anything indexed."""
+        newest = self.data.get("newest_taken_at")
+        return newest is None or (taken_at or "") > newest
+
+    def reuse(self, entry, output_dir, video_filename, thumb_filename):
+        """
+        Links the indexed media into output_dir. Returns (video_ok, thumb_ok).
+        """
+        video_ok = thumb_ok = False
+        try:
+            link_or_copy(entry["video"], os.path.join(output_dir, video_filename))
+            video_ok = True
+        except OSError:
+            pass
+        thumb = entry.get("thumb")
+        if thumb and os.path.exists(thumb):
+            try:
+                link_or_copy(thumb, os.path.join(output_dir, thumb_filename))
+                thumb_ok = True
+            except OSError:
+                pass
+        return video_ok, thumb_ok
+
+    def entries_newest_first(self):
+        """(shortcode, entry) pairs with usable media, newest post first."""
+        items = [(sc, self.lookup(sc)) for sc in self.data["shortcodes"]]
+        items = [(sc, e) for sc, e in items if e]
+        items.sort(key=lambda item: item[1].get("taken_at") or "", reverse=True)
+        return items
+
+    def record(self, reel, output_dir, taken_at=None):
+        """Indexes a reel whose video was downloaded into output_dir."""
+        if not reel.get("local_video_path"):
+            return
+        video = os.path.abspath(os.path.join(output_dir, reel["local_video_path"]))
+        thumb = os.path.abspath(os.path.join(output_dir, reel["local_thumb_path"])) if reel.get("local_thumb_path") else None
+        meta = {k: v for k, v in reel.items() if k not in ("local_video_path", "local_thumb_path")}
+        self.data["shortcodes"][reel["id"]] = {
+            "video": video,
+            "video_size": os.path.getsize(video),
+            "video_sha256": sha256_file(video),
+            "thumb": thumb,
+            "taken_at": taken_at,
+            "meta": meta,
+        }
+        if taken_at and self.is_newer(taken_at):
+            self.data["newest_taken_at"] = taken_at
+
+    def mark_scraped(self):
+        self.data["last_scrape"] = datetime.now().isoformat()
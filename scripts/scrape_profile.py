@@ -1,9 +1,28 @@
 import sys
 import json
 import os
+import heapq
+import contextlib
+import argparse
+import threading
 import instaloader
 from datetime import datetime
-import contextlib
+
+from media_download import DEFAULT_RATE, DEFAULT_WORKERS, download_all, pooled_session
+from scrape_index import STOP_AFTER_KNOWN, ScrapeIndex
+
+INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'scrape_index')
+
+# Posts paged (videos or not) when ranking with --select top
+DEFAULT_WINDOW = 200
+
+# Ranking functions for --select top; each takes the post's feed counters
+SCORERS = {
+    'default': lambda m: m["views"] + m["likes"] * 2,
+    'views': lambda m: m["views"],
+    'likes': lambda m: m["likes"],
+    'engagement': lambda m: m["likes"] + m["comments"] * 3,
+}
 
 class StdoutRedirect:
     def __enter__(self):
@@ -21,11 +40,80 @@ def default_serializer(obj):
         return obj.isoformat()
     raise TypeError(f"Type {type(obj)} not serializable")
 
-def scrape_profile(username, output_dir, max_count=12):
+def post_metrics(post):
+    """Counters that come with the feed page itself, so ranking needs no extra requests."""
+    return {
+        "views": post.video_view_count or 0,
+        "likes": post.likes or 0,
+        "comments": post.comments or 0,
+    }
+
+def post_taken_at(post):
+    return post.date_utc.isoformat() if post.date_utc else None
+
+def select_top(posts, count, window=DEFAULT_WINDOW, scorer=SCORERS['default'], keep=None):
     """
-    Scrapes the last N reels from a public profile using Instaloader.
-    Downloads thumbnails and video files.
+    Pages up to `window` posts and keeps the `count` best-scoring videos in a min-heap, so
+    nothing is downloaded until the window is ranked. Returns (posts best first, scanned).
+    Ties go to the newer post.
     """
+    heap = []
+    scanned = 0
+    for post in posts:
+        if scanned >= window:
+            break
+        scanned += 1
+        if not post.is_video or (keep and not keep(post)):
+            continue
+        try:
+            item = (scorer(post_metrics(post)), -scanned, post)
+        except Exception as e:
+            sys.stderr.write(f"Error scoring post {post.shortcode}: {e}\n")
+            continue
+        if len(heap) < count:
+            heapq.heappush(heap, item)
+        elif item[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, item)
+    ranked = sorted(heap, key=lambda item: item[:2], reverse=True)
+    return [post for _, _, post in ranked], scanned
+
+def build_reel(post, username):
+    # Deterministic filename based on shortcode
+    basename = post.shortcode
+    return {
+        "id": post.shortcode,
+        "filename_base": basename, 
+        "url": post.video_url, 
+        "local_video_path": f"{basename}.mp4",
+        "local_thumb_path": f"{basename}.jpg",
+        "thumbnail": post.url, 
+        "username": username,
+        "views": post.video_view_count,
+        "likes": post.likes,
+        "comments": post.comments,
+        "score": SCORERS['default'](post_metrics(post)),
+        "caption": post.caption,
+        "status": "approved",
+        "playable_url": post.video_url
+    }
+
+def reuse_indexed(index, entry, reel, output_dir):
+    """Links indexed media into the job dir instead of downloading. False if the video can't be reused."""
+    video_ok, thumb_ok = index.reuse(entry, output_dir, reel["local_video_path"], reel["local_thumb_path"])
+    if not thumb_ok:
+        reel["local_thumb_path"] = None
+    return video_ok
+
+def normalize_username(username):
+    """Accepts a bare username or a profile URL."""
+    # Simple extraction
+    if "instagram.com" in username:
+        # handle trailing slash or query params
+        username = username.split("instagram.com/")[1].split("/")[0].split("?")[0]
+    return username.strip().lstrip("@")
+
+def make_loader():
+    """Quiet Instaloader with cookies.txt loaded, shared by every profile in a batch."""
     # Quiet mode to prevent stdout pollution
     L = instaloader.Instaloader(
         download_pictures=True,
@@ -48,108 +136,223 @@ def scrape_profile(username, output_dir, max_count=12):
             sys.stderr.write(f"Loaded cookies from {cookie_path}\n")
         except Exception as e:
             sys.stderr.write(f"Failed to load cookies: {e}\n")
-    
-    try:
-        profile = instaloader.Profile.from_username(L.context, username)
-    except Exception as e:
-        # Fallback for user error logging (stderr)
-        sys.stderr.write(json.dumps({"error": str(e)}) + "\n")
-        # Return empty array to trigger fallback in backend if strictly needed, 
-        # or exit with error 
-        print(json.dumps([])) 
-        return
-
-    reels_data = []
-    count = 0
-    
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-
-    # Change to output directory to avoid path issues
-    start_dir = os.getcwd()
-    os.chdir(output_dir)
-
-    # Use shortcode as filename pattern for deterministic matching
-    L.filename_pattern = "{shortcode}"
-    # Force current directory (dot) to avoid subdirectory creation or empty path errors
-    L.dirname_pattern = "."
-
-    # Use iterator - profile already loaded above
-    posts = profile.get_posts()
-    
-    # Iterate posts
-    for post in posts:
-        if count >= max_count:
-            break
-            
-        if post.is_video:
-            try:
-                # Redirect stdout to suppress Instaloader logs
-                with open(os.devnull, 'w') as fnull:
-                    with contextlib.redirect_stdout(fnull):
-                        # Passing target='.' ensures dirname_pattern '.' is used/validated
-                        L.download_post(post, target='.')
-                
-                # Deterministic filename based on shortcode
-                basename = post.shortcode
-                video_filename = f"{basename}.mp4"
-                thumb_filename = f"{basename}.jpg"
-                
-                # Verify file exists (relative check in CWD)
-                local_video_exists = os.path.exists(video_filename)
-                
-                # Debug Check
-                if not local_video_exists:
-                     sys.stderr.write(f"checking {video_filename} in {os.getcwd()}\n")
-                     sys.stderr.write(f"files: {os.listdir('.')}\n")
-
-                local_thumb_exists = os.path.exists(thumb_filename)
-                
-                # Construct data
-                reels_data.append({
-                    "id": post.shortcode,
-                    "filename_base": basename, 
-                    "url": post.video_url, 
-                    "local_video_path": video_filename if local_video_exists else None,
-                    "local_thumb_path": thumb_filename if local_thumb_exists else None,
-                    "thumbnail": post.url, 
-                    "username": profile.username,
-                    "views": post.video_view_count,
-                    "likes": post.likes,
-                    "comments": post.comments,
-                    "score": (post.video_view_count or 0) + ((post.likes or 0) * 2),
-                    "caption": post.caption,
-                    "status": "approved",
-                    "playable_url": post.video_url
-                })
-                
-                count += 1
-            except Exception as e:
-                sys.stderr.write(f"Error processing post {post.shortcode}: {e}\n")
-                continue
-    
-    print(json.dumps(reels_data, default=default_serializer))
+    return L
+
+_emit_lock = threading.Lock()
+
+def emit_event(event_type, **fields):
+    """
+    Writes one NDJSON event to stdout. Lines are written whole under a lock, so events from
+    download threads never interleave; readers skip any line that isn't valid JSON.
+    """
+    line = json.dumps({"type": event_type, **fields}, default=default_serializer)
+    with _emit_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+def scrape_profile(username, output_dir, max_count=12, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE, ndjson=False,
+                   use_index=True, new_only=False, select='feed', window=DEFAULT_WINDOW, score='default',
+                   L=None, session=None, limiter=None, metadata_lock=None):
+    """
+    Scrapes the last N reels from a public profile using Instaloader.
+    Collects post metadata first, then downloads thumbnails and video files concurrently.
+    Returns the reel dicts.
+
+    By default the CLI prints them as one JSON array at the end. With ndjson=True it streams events instead:
+    {"type": "progress"}, {"type": "reel", "reel": {...}} as soon as a reel's files are on disk,
+    {"type": "error"} and a final {"type": "done"}.
+
+    With use_index, reels already scraped for this username (see scrape_index.py) are linked
+    from earlier job dirs instead of downloaded, and paging stops after a run of known posts.
+    new_only returns only posts newer than anything indexed.
+
+    select='feed' takes the first max_count videos in feed order. select='top' ranks the last
+    `window` posts with SCORERS[score] and downloads only the best max_count.
+
+    L, session, limiter and metadata_lock let scrape_batch.py share one logged-in loader,
+    connection pool and download budget across profiles.
+    """
+    L = L or make_loader()
+
+    # Paging is serialized across a batch (Instaloader's context isn't built for concurrent
+    # GraphQL calls); downloads of one profile overlap the next profile's paging
+    with metadata_lock or contextlib.nullcontext():
+        try:
+            profile = instaloader.Profile.from_username(L.context, username)
+        except Exception as e:
+            # Fallback for user error logging (stderr)
+            sys.stderr.write(json.dumps({"error": str(e)}) + "\n")
+            if ndjson:
+                emit_event("error", message=str(e))
+                emit_event("done", count=0)
+            # Empty result triggers the fallback in the backend
+            return []
+
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+        index = ScrapeIndex.load(INDEX_DIR, profile.username) if use_index else None
+
+        # Stage 1: page post metadata only (no media yet)
+        reels_data = []
+        downloads = []
+        reused = []
+        taken = {}
+        scanned = 0
+
+        def add_post(post, taken_at, entry):
+            reel = build_reel(post, profile.username)
+            reels_data.append(reel)
+            taken[reel["id"]] = taken_at
+            if entry and reuse_indexed(index, entry, reel, output_dir):
+                reused.append(reel)
+            else:
+                downloads.append((post.video_url, os.path.join(output_dir, reel["local_video_path"])))
+                downloads.append((post.url, os.path.join(output_dir, reel["local_thumb_path"])))
+            if ndjson:
+                emit_event("progress", stage="metadata", found=len(reels_data), target=max_count)
+
+        # Use iterator - profile already loaded above
+        posts = profile.get_posts()
+
+        if select == 'top':
+            keep = (lambda post: index.is_newer(post_taken_at(post))) if new_only and index else None
+            top_posts, scanned = select_top(posts, max_count, window, SCORERS[score], keep)
+            for post in top_posts:
+                try:
+                    add_post(post, post_taken_at(post), index.lookup(post.shortcode) if index else None)
+                except Exception as e:
+                    sys.stderr.write(f"Error processing post {post.shortcode}: {e}\n")
+                    if ndjson:
+                        emit_event("error", shortcode=post.shortcode, message=str(e))
+        else:
+            known_streak = 0
+            old_streak = 0
+
+            # Iterate posts
+            for post in posts:
+                if len(reels_data) >= max_count:
+                    break
+                scanned += 1
+
+                if post.is_video:
+                    try:
+                        taken_at = post_taken_at(post)
+                        entry = index.lookup(post.shortcode) if index else None
+                        known_streak = known_streak + 1 if entry else 0
+
+                        if new_only and index and not index.is_newer(taken_at):
+                            # Older than the last scrape; pinned posts can precede new ones, so only
+                            # stop after a run of them
+                            old_streak += 1
+                            if old_streak >= STOP_AFTER_KNOWN:
+                                break
+                            continue
+                        old_streak = 0
+
+                        add_post(post, taken_at, entry)
+
+                        if known_streak >= STOP_AFTER_KNOWN:
+                            # Everything from here on is already indexed; fill the rest from the index
+                            break
+                    except Exception as e:
+                        sys.stderr.write(f"Error processing post {post.shortcode}: {e}\n")
+                        if ndjson:
+                            emit_event("error", shortcode=post.shortcode, message=str(e))
+                        continue
+
+        if index and select == 'feed' and not new_only and len(reels_data) < max_count:
+            seen = {r["id"] for r in reels_data}
+            for shortcode, entry in index.entries_newest_first():
+                if len(reels_data) >= max_count:
+                    break
+                if shortcode in seen:
+                    continue
+                reel = dict(entry["meta"], local_video_path=f"{shortcode}.mp4", local_thumb_path=f"{shortcode}.jpg")
+                if reuse_indexed(index, entry, reel, output_dir):
+                    reels_data.append(reel)
+                    reused.append(reel)
+
+    # Stage 2: fetch videos and thumbnails concurrently over Instaloader's session
+    # (cookies from cookies.txt included), bounded and rate limited
+    positions = {reel["id"]: position for position, reel in enumerate(reels_data)}
+    reused_ids = {reel["id"] for reel in reused}
+    if ndjson:
+        for reel in reused:
+            emit_event("reel", reel=reel, position=positions[reel["id"]])
+
+    owners = {}
+    pending = {}
+    for reel in reels_data:
+        if reel["id"] in reused_ids:
+            continue
+        pending[reel["id"]] = 2
+        for key in ("local_video_path", "local_thumb_path"):
+            owners[os.path.join(output_dir, reel[key])] = (reel, key)
+    pending_lock = threading.Lock()
+
+    def on_file_done(url, dest, error):
+        reel, key = owners[dest]
+        if error or not os.path.exists(dest):
+            sys.stderr.write(f"Download failed for {reel[key]}: {error}\n")
+            reel[key] = None
+            if ndjson:
+                emit_event("error", shortcode=reel["id"], file=os.path.basename(dest), message=str(error))
+        with pending_lock:
+            pending[reel["id"]] -= 1
+            finished = pending[reel["id"]] == 0
+        if finished and ndjson:
+            # position = feed order, since reels finish out of order
+            emit_event("reel", reel=reel, position=positions[reel["id"]])
+
+    session = session or pooled_session(L.context._session, workers=workers)
+    download_all(session, downloads, workers=workers, rate=rate, on_done=on_file_done, limiter=limiter)
+
+    if index:
+        for reel in reels_data:
+            if reel["id"] not in reused_ids:
+                index.record(reel, output_dir, taken_at=taken.get(reel["id"]))
+        index.mark_scraped()
+        index.save()
+
+    sys.stderr.write(f"Scanned {scanned} posts, downloaded {len(downloads) // 2} reels, reused {len(reused)}\n")
+    if ndjson:
+        emit_event("done", count=len(reels_data),
+                   videos=sum(1 for r in reels_data if r["local_video_path"]),
+                   scanned=scanned, downloaded=len(downloads) // 2, reused=len(reused))
+    return reels_data
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
+    parser = argparse.ArgumentParser(usage="python3 scrape_profile.py <username|url> <output_dir> [max_count] [--workers N] [--rate R] [--ndjson] [--no-index] [--new-only] [--select feed|top] [--window N] [--score NAME]")
+    parser.add_argument('username', nargs='?')
+    parser.add_argument('output_dir', nargs='?')
+    parser.add_argument('max_count', nargs='?', default="12")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Concurrent media downloads")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help="Max download requests per second")
+    parser.add_argument('--ndjson', action='store_true', help="Stream one JSON event per line instead of a final array")
+    parser.add_argument('--no-index', action='store_true', help="Ignore the per-username shortcode index")
+    parser.add_argument('--new-only', action='store_true', help="Only return posts newer than the last scrape")
+    parser.add_argument('--select', choices=['feed', 'top'], default='feed', help="First N in feed order, or best N by score")
+    parser.add_argument('--window', type=int, default=DEFAULT_WINDOW, help="Posts to rank with --select top")
+    parser.add_argument('--score', choices=sorted(SCORERS), default='default', help="Ranking for --select top")
+    args = parser.parse_args()
+
+    if not args.username or not args.output_dir:
         # Print empty array or error structure
         print(json.dumps([]))
         sys.exit(1)
         
-    username = sys.argv[1]
-    output_dir = sys.argv[2]
-    
-    # Simple extraction
-    if "instagram.com" in username:
-        # handle trailing slash or query params
-        username = username.split("instagram.com/")[1].split("/")[0].split("?")[0]
-        
+    username = normalize_username(args.username)
+    output_dir = args.output_dir
+
     # Parse optional max_count
-    max_count = 12
-    if len(sys.argv) > 3:
-        try:
-            max_count = int(sys.argv[3])
-        except:
-            max_count = 12
+    try:
+        max_count = int(args.max_count)
+    except:
+        max_count = 12
 
-    scrape_profile(username, output_dir, max_count)
+    reels = scrape_profile(username, output_dir, max_count, workers=args.workers, rate=args.rate, ndjson=args.ndjson,
+                           use_index=not args.no_index, new_only=args.new_only,
+                           select=args.select, window=args.window, score=args.score)
+    if not args.ndjson:
+        print(json.dumps(reels, default=default_serializer))
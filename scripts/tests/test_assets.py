@@ -0,0 +1,23 @@
+import pytest
+
+pytest.importorskip("PIL")
+
+from assets import AssetRegistry
+
+def registry_without_fonts(tmp_path):
+    assets = AssetRegistry(str(tmp_path))
+    assets.font_candidates = lambda bold=False: [str(tmp_path / "missing.ttf")]
+    return assets
+
+def test_default_font_is_loaded_once_per_size(tmp_path):
+    assets = registry_without_fonts(tmp_path)
+    first = assets.font(40)
+    assert first is not None
+    assert assets.font(40) is first
+    assert assets.stats()['font'] == {'hits': 1, 'misses': 1}
+
+def test_default_font_follows_requested_size(tmp_path):
+    assets = registry_without_fonts(tmp_path)
+    small = assets.font(20).getbbox("Headline")
+    large = assets.font(80).getbbox("Headline")
+    assert large[2] - large[0] > 2 * (small[2] - small[0])
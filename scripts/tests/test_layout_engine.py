@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+pytest.importorskip("PIL")
+
+from assets import AssetRegistry
+from layout_engine import design_sizes, layout_banner, required_height, text_width, wrap_lines
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ASSETS = AssetRegistry(BASE_DIR)
+
+WIDTH, HEIGHT = 1080, 1920
+LONG_HEADLINE = ("Scientists finally explain why this tiny island has been quietly growing by several "
+                 "meters every single year")
+
+def design_config(**overrides):
+    config = {
+        'mode': 'design', 'designName': 'Layout Test', 'designHandle': '@layout', 'logoSize': 12,
+        'nameFontSize': 18, 'handleFontSize': 14, 'headlineFontSize': 24,
+        'showHeadline': 'true', 'headlineMode': 'manual', 'manualHeadline': LONG_HEADLINE,
+    }
+    config.update(overrides)
+    return config
+
+def test_wrap_lines_fits_measured_width():
+    font = ASSETS.font(80)
+    lines = wrap_lines(font, LONG_HEADLINE, 700)
+    assert len(lines) > 1
+    assert " ".join(lines) == LONG_HEADLINE
+    assert all(text_width(font, line) <= 700 for line in lines)
+
+def test_wrap_lines_keeps_overlong_word_on_its_own_line():
+    font = ASSETS.font(80)
+    lines = wrap_lines(font, "a Supercalifragilisticexpialidocious b", 300)
+    assert lines == ["a", "Supercalifragilisticexpialidocious", "b"]
+
+def test_required_height_grows_with_headline():
+    config = design_config()
+    without = required_height(config, WIDTH, HEIGHT, "", ASSETS, BASE_DIR)
+    short = required_height(config, WIDTH, HEIGHT, "Short", ASSETS, BASE_DIR)
+    long = required_height(config, WIDTH, HEIGHT, LONG_HEADLINE, ASSETS, BASE_DIR)
+    assert without < short < long
+
+def test_required_height_matches_drawn_block_for_long_headline(tmp_path):
+    import process_batch
+
+    config = design_config()
+    start_y = 200
+    needed = required_height(config, WIDTH, HEIGHT, LONG_HEADLINE, ASSETS, BASE_DIR)
+    layout = layout_banner(config, WIDTH, HEIGHT, LONG_HEADLINE, ASSETS, BASE_DIR, placement=(start_y, needed, 0))
+    assert len(layout['headline']) >= 3
+
+    banner, x, y = process_batch.render_design_overlay(str(tmp_path), config, WIDTH, HEIGHT, {'id': 'reel'},
+                                                       BASE_DIR, layout_override=(start_y, needed, 0))
+    block_end = start_y + needed  # last row of the (inclusive) background rectangle
+    assert (x, y) == (0, start_y)
+    # Nothing is drawn past the block: the canvas ends exactly at its last row
+    assert y + banner.height == block_end + 1
+    assert (banner.width, banner.height) == (layout['box'][2] - layout['box'][0], layout['box'][3] - layout['box'][1])
+
+    # The lowest headline pixel sits one bottom padding above the end of the block
+    rgb = banner.convert('RGB')
+    rows = [row for row in range(banner.height)
+            if any(max(rgb.getpixel((col, row))) > 128 for col in range(0, banner.width, 2))]
+    lowest = y + rows[-1]
+    padding = design_sizes(config, WIDTH)['padding_vertical']
+    assert block_end - padding - 2 <= lowest < block_end - padding + 2
@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+pytest.importorskip("PIL")
+
+from PIL import Image
+
+from overlay_cache import OverlayCache
+
+def banner(shade):
+    return Image.new('RGBA', (4, 2), (shade, shade, shade, 255))
+
+def cached_keys(cache_dir):
+    return sorted(name[:-4] for name in os.listdir(cache_dir) if name.endswith('.png'))
+
+def age(cache_dir, key, seconds):
+    os.utime(os.path.join(cache_dir, f"{key}.png"), (seconds, seconds))
+
+def test_disk_tier_is_capped(tmp_path):
+    cache = OverlayCache(str(tmp_path), max_disk_entries=3)
+    for i in range(5):
+        cache.put(f"k{i}", banner(i), 0, 0)
+        age(str(tmp_path), f"k{i}", 1000 + i)
+    assert len(cached_keys(str(tmp_path))) == 3
+
+def test_disk_prune_drops_least_recently_used(tmp_path):
+    cache = OverlayCache(str(tmp_path), max_disk_entries=3)
+    for i in range(3):
+        cache.put(f"k{i}", banner(i), i, 10 * i)
+        age(str(tmp_path), f"k{i}", 1000 + i)
+
+    # A fresh instance (new worker) reads k0 from disk, which makes it the newest file
+    entry = OverlayCache(str(tmp_path), max_disk_entries=3).get("k0")
+    assert entry is not None and entry[1:] == (0, 0)
+
+    cache.put("k3", banner(3), 0, 0)
+    assert cached_keys(str(tmp_path)) == ["k0", "k2", "k3"]
+
+def test_prune_ignores_missing_dir(tmp_path):
+    cache = OverlayCache(str(tmp_path / "absent"), max_disk_entries=1)
+    assert cache.prune_disk() == 0
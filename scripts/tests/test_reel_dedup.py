@@ -0,0 +1,91 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import reel_dedup
+from reel_dedup import DedupIndex, MAX_DISTANCE, DURATION_TOLERANCE, mean_distances, hash_matrix, phash_frames
+
+def smooth_frames(seed, count=len(reel_dedup.SAMPLE_POINTS)):
+    """Low-frequency synthetic frames (8x8 noise blown up to 32x32), like downscaled video."""
+    rng = np.random.default_rng(seed)
+    coarse = rng.uniform(0, 255, size=(count, 8, 8))
+    return np.stack([np.kron(frame, np.ones((4, 4))) for frame in coarse]).astype(np.float32)
+
+def fp(hashes, duration=10.0):
+    return {'duration': duration, 'hashes': [f"{int(h):016x}" for h in hashes]}
+
+def distance(a, b):
+    return mean_distances(hash_matrix([fp(a)['hashes']]), hash_matrix([fp(b)['hashes']])[0])[0]
+
+def test_phash_one_64_bit_hash_per_frame():
+    hashes = phash_frames(smooth_frames(1))
+    assert hashes.shape == (len(reel_dedup.SAMPLE_POINTS),)
+    assert all(0 <= int(h) < 2 ** 64 for h in hashes)
+
+def test_phash_survives_reencode_like_changes():
+    frames = smooth_frames(2)
+    noise = np.random.default_rng(3).normal(0, 4, frames.shape).astype(np.float32)
+    brighter = np.clip(frames * 0.9 + 20 + noise, 0, 255)
+    assert distance(phash_frames(frames), phash_frames(frames)) == 0
+    assert distance(phash_frames(frames), phash_frames(brighter)) <= MAX_DISTANCE
+
+def test_phash_separates_different_clips():
+    assert distance(phash_frames(smooth_frames(4)), phash_frames(smooth_frames(5))) > MAX_DISTANCE
+
+def index_with(job_id, reel_id, hashes, duration=10.0, processed=False, path="unused.json"):
+    index = DedupIndex(path)
+    index.add(job_id, {'id': reel_id, 'username': 'creator'}, fp(hashes, duration))
+    if processed:
+        index.mark_processed(job_id, reel_id, bytes_out=1000, encode_s=2.0)
+    return index
+
+def test_find_matches_processed_reel_from_another_job():
+    hashes = phash_frames(smooth_frames(6))
+    index = index_with('job-a', 'r1', hashes, processed=True)
+    key, entry, dist = index.find(fp(hashes), 'job-b')
+    assert key == 'job-a/r1' and entry['reel_id'] == 'r1' and dist == 0
+
+def test_find_ignores_unencoded_reels_of_other_jobs_but_not_of_this_job():
+    hashes = phash_frames(smooth_frames(7))
+    index = index_with('job-a', 'r1', hashes, processed=False)
+    assert index.find(fp(hashes), 'job-b') is None
+    # Same job: the earlier reel counts as the original before it is encoded
+    assert index.find(fp(hashes), 'job-a', exclude_key='job-a/r2')[0] == 'job-a/r1'
+    # ...but never the reel itself
+    assert index.find(fp(hashes), 'job-a', exclude_key='job-a/r1') is None
+
+def test_same_reel_id_in_another_job_is_not_a_duplicate():
+    hashes = phash_frames(smooth_frames(12))
+    # The same shortcode scraped again into a new job
+    index = index_with('job-a', 'r1', hashes, processed=True)
+    assert index.find(fp(hashes), 'job-b', exclude_key='job-b/r1', reel_id='r1') is None
+    assert index.find(fp(hashes), 'job-b', exclude_key='job-b/r2', reel_id='r2')[0] == 'job-a/r1'
+
+def test_find_duration_gate():
+    hashes = phash_frames(smooth_frames(8))
+    index = index_with('job-a', 'r1', hashes, duration=10.0, processed=True)
+    assert index.find(fp(hashes, 10.0 + DURATION_TOLERANCE * 0.9), 'job-b') is not None
+    assert index.find(fp(hashes, 10.0 + DURATION_TOLERANCE * 2), 'job-b') is None
+
+def test_find_threshold():
+    hashes = phash_frames(smooth_frames(9))
+    index = index_with('job-a', 'r1', hashes, processed=True)
+    # Flip MAX_DISTANCE bits in every frame hash: still a match; one more bit and it isn't
+    at_limit = [int(h) ^ ((1 << MAX_DISTANCE) - 1) for h in hashes]
+    past_limit = [int(h) ^ ((1 << (MAX_DISTANCE + 1)) - 1) for h in hashes]
+    assert index.find(fp(at_limit), 'job-b')[2] == MAX_DISTANCE
+    assert index.find(fp(past_limit), 'job-b') is None
+
+def test_find_picks_closest_original():
+    target = phash_frames(smooth_frames(10))
+    index = index_with('job-a', 'far', [int(h) ^ 0b111 for h in target], processed=True)
+    index.add('job-a', {'id': 'near'}, fp([int(h) ^ 0b1 for h in target]))
+    index.mark_processed('job-a', 'near')
+    assert index.find(fp(target), 'job-b')[0] == 'job-a/near'
+
+def test_index_roundtrip(tmp_path):
+    hashes = phash_frames(smooth_frames(11))
+    path = str(tmp_path / "data" / "reel_hashes.json")
+    index_with('job-a', 'r1', hashes, processed=True, path=path).save()
+    loaded = DedupIndex(path).load()
+    assert loaded.find(fp(hashes), 'job-b')[0] == 'job-a/r1'
@@ -0,0 +1,270 @@
+"""
+Long-lived processing worker fed by a file-based queue.
+
+Usage: python3 scripts/worker_daemon.py [--max-jobs N] [--poll SECONDS]
+
+The daemon imports the pipeline (cv2, numpy, PIL, ffmpeg encoder list, font lookup) once and
+forks one child per job, so each job starts warm. Queue layout under data/queue/:
+
+  pending/<job_id>.json  {"jobId", "priority", "submittedAt", "force"}
+                         lower priority runs first (corrections 0, new batches 10), then oldest;
+                         re-submitting a job replaces its pending request
+  cancel/<job_id>        stop that job (running or pending). Contents "restart" only stop it;
+                         anything else also marks it canceled. Removed once the job's process
+                         group has been reaped, so the app waits for it before writing the job
+  state.json             heartbeat, running and pending jobs, rewritten every poll
+  logs/<job_id>.log      output of the job's last run
+
+At most --max-jobs jobs run at once, and each gets an equal share of the reel workers.
+Every job runs in its own process group, so cancel signals its ffmpeg and pool children
+directly. The daemon writes the 'canceled' status itself after the reap: a job still running
+would otherwise save its in-memory copy over it.
+"""
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+base_dir = os.path.dirname(script_dir)
+
+QUEUE_DIR = os.path.join(base_dir, "data", "queue")
+PENDING_DIR = os.path.join(QUEUE_DIR, "pending")
+CANCEL_DIR = os.path.join(QUEUE_DIR, "cancel")
+LOG_DIR = os.path.join(QUEUE_DIR, "logs")
+STATE_PATH = os.path.join(QUEUE_DIR, "state.json")
+
+DEFAULT_MAX_JOBS = 2
+DEFAULT_POLL = 0.5
+# Seconds between SIGTERM and SIGKILL when stopping a job
+STOP_GRACE = 5.0
+
+def atomic_write_json(path, data):
+    # Atomic Write
+    temp_file = f"{path}.tmp.{os.getpid()}"
+    with open(temp_file, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(temp_file, path)
+
+def read_pending():
+    """Pending requests, highest priority (lowest number) and oldest first."""
+    requests = []
+    for name in os.listdir(PENDING_DIR):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(PENDING_DIR, name)) as f:
+                request = json.load(f)
+        except (OSError, ValueError):
+            # Half-written or foreign file; retried next poll
+            continue
+        request.setdefault('jobId', name[:-len('.json')])
+        requests.append(request)
+    requests.sort(key=lambda r: (int(r.get('priority', 10)), r.get('submittedAt') or ''))
+    return requests
+
+def remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+class WorkerDaemon:
+    def __init__(self, max_jobs=DEFAULT_MAX_JOBS, poll=DEFAULT_POLL):
+        self.max_jobs = max(1, max_jobs)
+        self.poll = poll
+        # job_id -> {"pid", "started", "priority", "stopping": None | deadline, "reason", "request"}
+        self.running = {}
+        self.shutting_down = False
+
+    def warm_up(self):
+        """Imports the pipeline and fills the caches every forked job inherits."""
+        import process_batch
+        from encode_profiles import available_encoders
+        process_batch.ASSETS.font_path(False)
+        process_batch.ASSETS.font_path(True)
+        available_encoders()
+        self.pipeline = process_batch
+        self.job_workers = max(1, process_batch.default_worker_count() // self.max_jobs)
+
+    def start_job(self, request):
+        job_id = request['jobId']
+        log_path = os.path.join(LOG_DIR, f"{job_id}.log")
+        # Unflushed output would otherwise be written again by the child
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            # Child: own process group so cancel reaches ffmpeg and pool workers too
+            os.setpgid(0, 0)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                log_fd = os.open(log_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                os.dup2(log_fd, 1)
+                os.dup2(log_fd, 2)
+                os.close(log_fd)
+                self.pipeline.process_batch(job_id, workers=self.job_workers, force=bool(request.get('force')))
+            except BaseException:
+                import traceback
+                traceback.print_exc()
+                code = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+        try:
+            # Set in the parent as well, so a cancel right after fork can't miss the group
+            os.setpgid(pid, pid)
+        except OSError:
+            pass
+        self.running[job_id] = {"pid": pid, "started": time.time(), "priority": request.get('priority', 10),
+                                "stopping": None, "reason": None, "request": request}
+        print(f"Started job {job_id} (pid {pid}, priority {request.get('priority', 10)})")
+
+    def stop_job(self, job_id, reason):
+        entry = self.running.get(job_id)
+        if not entry or entry["stopping"]:
+            return
+        entry["stopping"] = time.time() + STOP_GRACE
+        entry["reason"] = reason
+        try:
+            os.killpg(entry["pid"], signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        print(f"Stopping job {job_id} ({reason})")
+
+    def escalate(self):
+        now = time.time()
+        for job_id, entry in self.running.items():
+            if entry["stopping"] and now > entry["stopping"]:
+                try:
+                    os.killpg(entry["pid"], signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def reap(self):
+        for job_id, entry in list(self.running.items()):
+            try:
+                pid, status = os.waitpid(entry["pid"], os.WNOHANG)
+            except ChildProcessError:
+                pid, status = entry["pid"], 0
+            if pid == 0:
+                continue
+            del self.running[job_id]
+            # Pool workers or ffmpeg may outlive their parent; take the whole group down
+            try:
+                os.killpg(entry["pid"], signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+            elapsed = time.time() - entry["started"]
+            code = os.waitstatus_to_exitcode(status)
+            print(f"Job {job_id} finished in {elapsed:.1f}s (exit {code}{', ' + entry['reason'] if entry['reason'] else ''})")
+            if code != 0 and not entry["reason"]:
+                self.mark_failed(job_id)
+
+    def mark_failed(self, job_id):
+        from job_store import JobStore
+        store = JobStore(base_dir)
+        job = store.load_job(job_id)
+        if job and job.get('status') == 'processing':
+            job['status'] = 'failed'
+            store.save_job(job)
+
+    def mark_canceled(self, job_id):
+        from job_store import JobStore
+        store = JobStore(base_dir)
+        job = store.load_job(job_id)
+        # Only mark as canceled if it wasn't already completed
+        if job and job.get('status') != 'completed':
+            job['status'] = 'canceled'
+            store.save_job(job)
+
+    def handle_cancels(self):
+        for job_id in os.listdir(CANCEL_DIR):
+            cancel_path = os.path.join(CANCEL_DIR, job_id)
+            try:
+                with open(cancel_path) as f:
+                    restart = f.read().strip() == 'restart'
+            except OSError:
+                continue
+            remove_quietly(os.path.join(PENDING_DIR, f"{job_id}.json"))
+            if job_id in self.running:
+                # Finished on a later poll, after reap has taken the process group down
+                self.stop_job(job_id, "restarting" if restart else "canceled")
+                continue
+            if not restart:
+                self.mark_canceled(job_id)
+            remove_quietly(cancel_path)
+
+    def schedule(self):
+        pending = read_pending()
+        for request in pending:
+            if len(self.running) >= self.max_jobs:
+                break
+            job_id = request['jobId']
+            if job_id in self.running:
+                # Waits for the current run to end
+                continue
+            remove_quietly(os.path.join(PENDING_DIR, f"{job_id}.json"))
+            self.start_job(request)
+        return pending
+
+    def write_state(self, pending):
+        atomic_write_json(STATE_PATH, {
+            "pid": os.getpid(),
+            "heartbeat": time.time(),
+            "maxJobs": self.max_jobs,
+            "running": [{"jobId": job_id, "pid": e["pid"], "priority": e["priority"], "started": e["started"],
+                         "stopping": bool(e["stopping"])} for job_id, e in self.running.items()],
+            "pending": [{"jobId": r["jobId"], "priority": r.get("priority", 10)}
+                        for r in pending if r["jobId"] not in self.running],
+        })
+
+    def shutdown(self, signum, frame):
+        self.shutting_down = True
+
+    def run(self):
+        for path in (PENDING_DIR, CANCEL_DIR, LOG_DIR):
+            os.makedirs(path, exist_ok=True)
+        # process_batch resolves data/ and public/ from the working directory
+        os.chdir(base_dir)
+        start = time.perf_counter()
+        self.warm_up()
+        print(f"Worker ready in {time.perf_counter() - start:.2f}s | max jobs {self.max_jobs} | "
+              f"{self.job_workers} reel workers per job")
+        signal.signal(signal.SIGTERM, self.shutdown)
+        signal.signal(signal.SIGINT, self.shutdown)
+
+        while not self.shutting_down:
+            self.reap()
+            self.handle_cancels()
+            pending = self.schedule()
+            self.escalate()
+            self.write_state(pending)
+            time.sleep(self.poll)
+
+        # Pending requests stay on disk for the next start. Running jobs are stopped and
+        # re-queued; reels they already finished are skipped by fingerprint on resume
+        for job_id, entry in list(self.running.items()):
+            atomic_write_json(os.path.join(PENDING_DIR, f"{job_id}.json"), entry["request"])
+            self.stop_job(job_id, "worker shutdown")
+        while self.running:
+            self.reap()
+            self.escalate()
+            time.sleep(0.1)
+        remove_quietly(STATE_PATH)
+        print("Worker stopped")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-jobs', type=int, default=DEFAULT_MAX_JOBS, help="Jobs processed at once")
+    parser.add_argument('--poll', type=float, default=DEFAULT_POLL, help="Queue poll interval in seconds")
+    args = parser.parse_args()
+    WorkerDaemon(max_jobs=args.max_jobs, poll=args.poll).run()
+
+if __name__ == "__main__":
+    main()